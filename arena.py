@@ -0,0 +1,512 @@
+import array
+import copy
+import enum
+from typing import Callable
+
+from lexer import Token, TokenType, TOKEN_TYPES, TOKEN_CODES
+from symbols import BuiltinTypeSymbol, ProcedureSymbol, SymbolTable
+
+from syntax_tree import (
+	Node,
+	NodeVisitor,
+	Program,
+	Block,
+	VariableDeclaration,
+	Procedure,
+	Param,
+	Variable,
+	Type,
+	Compound,
+	ProcedureCall,
+	AssignmentStatement,
+	BinOp,
+	Unary,
+	Num,
+	NoOp,
+	TypedBinOp,
+	IntAdd,
+	IntSubtract,
+	IntMultiply,
+	IntDivide,
+	RealAdd,
+	RealSubtract,
+	RealMultiply,
+	RealDivide,
+	ToReal
+)
+
+# the handle of an absent node, such as an operand the parser found nothing for
+NO_NODE = -1
+
+
+class NodeKind(enum.IntEnum):
+	PROGRAM = 0
+	BLOCK = 1
+	VARIABLE_DECLARATION = 2
+	PROCEDURE = 3
+	PARAM = 4
+	VARIABLE = 5
+	TYPE = 6
+	COMPOUND = 7
+	ASSIGNMENT_STATEMENT = 8
+	BIN_OP = 9
+	UNARY = 10
+	NUM = 11
+	NOOP = 12
+	PROCEDURE_CALL = 13
+	TO_REAL = 14
+	INT_ADD = 15
+	INT_SUBTRACT = 16
+	INT_MULTIPLY = 17
+	INT_DIVIDE = 18
+	REAL_ADD = 19
+	REAL_SUBTRACT = 20
+	REAL_MULTIPLY = 21
+	REAL_DIVIDE = 22
+
+
+# specialized kind -> the kind it specializes, what visitors without a visit_* for it fall back to
+GENERIC_KINDS: dict[NodeKind, NodeKind] = {
+	NodeKind.TO_REAL: NodeKind.UNARY,
+	NodeKind.INT_ADD: NodeKind.BIN_OP,
+	NodeKind.INT_SUBTRACT: NodeKind.BIN_OP,
+	NodeKind.INT_MULTIPLY: NodeKind.BIN_OP,
+	NodeKind.INT_DIVIDE: NodeKind.BIN_OP,
+	NodeKind.REAL_ADD: NodeKind.BIN_OP,
+	NodeKind.REAL_SUBTRACT: NodeKind.BIN_OP,
+	NodeKind.REAL_MULTIPLY: NodeKind.BIN_OP,
+	NodeKind.REAL_DIVIDE: NodeKind.BIN_OP,
+}
+
+# typed operation kind -> its node class and result type
+TYPED_BIN_OPS: dict[NodeKind, tuple[type[TypedBinOp], str]] = {
+	NodeKind.INT_ADD: (IntAdd, 'integer'),
+	NodeKind.INT_SUBTRACT: (IntSubtract, 'integer'),
+	NodeKind.INT_MULTIPLY: (IntMultiply, 'integer'),
+	NodeKind.INT_DIVIDE: (IntDivide, 'integer'),
+	NodeKind.REAL_ADD: (RealAdd, 'real'),
+	NodeKind.REAL_SUBTRACT: (RealSubtract, 'real'),
+	NodeKind.REAL_MULTIPLY: (RealMultiply, 'real'),
+	NodeKind.REAL_DIVIDE: (RealDivide, 'real'),
+}
+
+
+class Arena:
+	"""
+	struct-of-arrays syntax tree, a node is an int handle indexing one row of the typed columns:
+	
+	kind                  op                    first              second            value
+	PROGRAM               -                     block              -                 name
+	BLOCK                 -                     children offset    count             -
+	VARIABLE_DECLARATION  -                     variable           type              -
+	PROCEDURE             -                     children offset    count             name
+	PARAM                 -                     variable           type              -
+	VARIABLE              -                     scope level        slot              name
+	TYPE                  type token            -                  -                 -
+	COMPOUND              -                     children offset    count             -
+	ASSIGNMENT_STATEMENT  -                     variable           expr              -
+	BIN_OP                operator token        left               right             -
+	INT_*, REAL_*         operator token        left               right             -
+	UNARY                 operator token        expr               -                 -
+	TO_REAL               plus                  expr               -                 -
+	NUM                   literal token         -                  -                 literal
+	PROCEDURE_CALL        -                     children offset    count             name
+	
+	a block's children are its declarations then its compound, a procedure's are its params then its
+	block and a call's are its arguments. the INT_* and REAL_* kinds and TO_REAL are the
+	TypedBinOp subclasses and ToReal of syntax_tree. names and literals are indices into the
+	deduplicated constants list, token types are lexer.TOKEN_CODES. builds nodes through the same
+	methods as syntax_tree.NodeBuilder, so Parser(text=..., arena=Arena()) parses straight into it
+	"""
+	
+	missing = NO_NODE
+	
+	def __init__(self):
+		self.kinds = array.array('B')
+		self.ops = array.array('B')
+		self.firsts = array.array('i')
+		self.seconds = array.array('i')
+		self.values = array.array('i')
+		self.children = array.array('i')
+		self.constants: list[int | float | str] = []
+		self.constant_index: dict[tuple[type, int | float | str], int] = {}
+		# source spans of procedures and compounds, and the scopes of analyzed programs and procedures
+		self.spans: dict[int, tuple[int, int]] = {}
+		self.symbol_tables: dict[int, SymbolTable] = {}
+		self.procedure_symbols: dict[int, ProcedureSymbol] = {}
+		# procedure call -> the PROCEDURE it runs, set with the procedure symbols
+		self.callees: dict[int, int] = {}
+		# procedures the purity classifier found pure
+		self.pure: set[int] = set()
+		self.root: int = NO_NODE
+	
+	def __len__(self):
+		return len(self.kinds)
+	
+	def add(self, kind: NodeKind, op: int = 0, first: int = NO_NODE, second: int = NO_NODE, value: int = NO_NODE) -> int:
+		handle = len(self.kinds)
+		self.kinds.append(kind)
+		self.ops.append(op)
+		self.firsts.append(first)
+		self.seconds.append(second)
+		self.values.append(value)
+		return handle
+	
+	def constant(self, value: int | float | str) -> int:
+		# keyed by type as well, 1 and 1.0 are different literals
+		key = (type(value), value)
+		index = self.constant_index.get(key)
+		if index is None:
+			index = self.constant_index[key] = len(self.constants)
+			self.constants.append(value)
+		return index
+	
+	def items(self, handle: int) -> array.array:
+		offset = self.firsts[handle]
+		return self.children[offset:offset + self.seconds[handle]]
+	
+	def value(self, handle: int) -> int | float | str:
+		return self.constants[self.values[handle]]
+	
+	def op(self, handle: int) -> TokenType:
+		return TOKEN_TYPES[self.ops[handle]]
+	
+	def add_items(self, kind: NodeKind, handles: list[int], value: int = NO_NODE) -> int:
+		offset = len(self.children)
+		self.children.extend(handles)
+		return self.add(kind=kind, first=offset, second=len(handles), value=value)
+	
+	def program(self, name: str, block_node: int) -> int:
+		self.root = self.add(kind=NodeKind.PROGRAM, first=block_node, value=self.constant(value=name))
+		return self.root
+	
+	def block(self, declarations: list[int], compound_node: int) -> int:
+		return self.add_items(kind=NodeKind.BLOCK, handles=declarations + [compound_node])
+	
+	def variable_declaration(self, var_node: int, type_node: int) -> int:
+		return self.add(kind=NodeKind.VARIABLE_DECLARATION, first=var_node, second=type_node)
+	
+	def procedure(self, name: str, params: list[int], block_node: int, start: int, end: int) -> int:
+		handle = self.add_items(kind=NodeKind.PROCEDURE, handles=params + [block_node], value=self.constant(value=name))
+		self.spans[handle] = (start, end)
+		return handle
+	
+	def param(self, var_node: int, type_node: int) -> int:
+		return self.add(kind=NodeKind.PARAM, first=var_node, second=type_node)
+	
+	def variable(self, token: Token) -> int:
+		return self.add(kind=NodeKind.VARIABLE, value=self.constant(value=token.value))
+	
+	def type(self, token: Token) -> int:
+		return self.add(kind=NodeKind.TYPE, op=TOKEN_CODES[token.token_type])
+	
+	def compound(self, children: list[int], start: int, end: int) -> int:
+		handle = self.add_items(kind=NodeKind.COMPOUND, handles=children)
+		self.spans[handle] = (start, end)
+		return handle
+	
+	def procedure_call(self, name: str, args: list[int], token: Token) -> int:
+		return self.add_items(kind=NodeKind.PROCEDURE_CALL, handles=args, value=self.constant(value=name))
+	
+	def assignment_statement(self, variable: int, expr: int) -> int:
+		return self.add(kind=NodeKind.ASSIGNMENT_STATEMENT, first=variable, second=expr)
+	
+	def bin_op(self, left: int, op: Token, right: int, kind: NodeKind = NodeKind.BIN_OP) -> int:
+		return self.add(kind=kind, op=TOKEN_CODES[op.token_type], first=left, second=right)
+	
+	def unary(self, token: Token, expr: int) -> int:
+		return self.add(kind=NodeKind.UNARY, op=TOKEN_CODES[token.token_type], first=expr)
+	
+	def to_real(self, expr: int) -> int:
+		return self.add(kind=NodeKind.TO_REAL, op=TOKEN_CODES[TokenType.ADD], first=expr)
+	
+	def num(self, token: Token) -> int:
+		return self.add(kind=NodeKind.NUM, op=TOKEN_CODES[token.token_type], value=self.constant(value=token.value))
+	
+	def noop(self) -> int:
+		return self.add(kind=NodeKind.NOOP)
+	
+	@classmethod
+	def from_node(cls, program_node: Program) -> 'Arena':
+		arena = cls()
+		ArenaWriter(arena=arena).visit(node=program_node)
+		return arena
+	
+	def to_node(self, handle: int | None = None) -> Node:
+		"""
+		rebuilds node objects for the subtree at handle, the whole program by default
+		"""
+		return NodeReader(arena=self).rebuild(handle=self.root if handle is None else handle)
+
+
+class ArenaWriter(NodeVisitor):
+	"""
+	copies a node tree into an arena, keeping analysis results, spans and shared Type nodes
+	"""
+	
+	def __init__(self, arena: Arena):
+		self.arena = arena
+		self.types: dict[int, int] = {}
+		self.procedures: dict[int, int] = {}
+		# calls written before the procedure they run, a recursive one inside its own body
+		self.pending_calls: list[tuple[int, Procedure]] = []
+	
+	def write(self, node: Node | None) -> int:
+		return NO_NODE if node is None else self.visit(node=node)
+	
+	def visit_program(self, program: Program) -> int:
+		handle = self.arena.program(name=program.name, block_node=self.visit(node=program.block_node))
+		if program.symbol_table is not None: self.arena.symbol_tables[handle] = program.symbol_table
+		for call, procedure in self.pending_calls: self.arena.callees[call] = self.procedures[id(procedure)]
+		return handle
+	
+	def visit_block(self, block: Block) -> int:
+		declarations = [self.visit(node=node) for node in block.declarations]
+		return self.arena.block(declarations=declarations, compound_node=self.visit(node=block.compound))
+	
+	def visit_variable_declaration(self, variable_declaration: VariableDeclaration) -> int:
+		return self.arena.variable_declaration(
+			var_node=self.visit(node=variable_declaration.var_node),
+			type_node=self.visit(node=variable_declaration.type_node)
+		)
+	
+	def visit_procedure(self, procedure: Procedure) -> int:
+		params = [self.visit(node=param) for param in procedure.params]
+		handle = self.arena.procedure(
+			name=procedure.name,
+			params=params,
+			block_node=self.visit(node=procedure.block_node),
+			start=procedure.start,
+			end=procedure.end
+		)
+		if procedure.symbol_table is not None: self.arena.symbol_tables[handle] = procedure.symbol_table
+		if procedure.pure: self.arena.pure.add(handle)
+		self.procedures[id(procedure)] = handle
+		return handle
+	
+	def visit_param(self, param: Param) -> int:
+		return self.arena.param(var_node=self.visit(node=param.var_node), type_node=self.visit(node=param.type_node))
+	
+	def visit_variable(self, variable: Variable) -> int:
+		handle = self.arena.variable(token=variable.token)
+		if variable.scope_level is not None:
+			self.arena.firsts[handle] = variable.scope_level
+			self.arena.seconds[handle] = variable.slot
+		return handle
+	
+	def visit_type(self, type_node: Type) -> int:
+		handle = self.types.get(id(type_node))
+		if handle is None: handle = self.types[id(type_node)] = self.arena.type(token=type_node.token)
+		return handle
+	
+	def visit_compound(self, compound: Compound) -> int:
+		children = [self.visit(node=node) for node in compound.children]
+		return self.arena.compound(children=children, start=compound.start, end=compound.end)
+	
+	def visit_procedure_call(self, procedure_call: ProcedureCall) -> int:
+		args = [self.visit(node=arg) for arg in procedure_call.args]
+		handle = self.arena.procedure_call(name=procedure_call.name, args=args, token=procedure_call.token)
+		if procedure_call.procedure_symbol is not None:
+			self.arena.procedure_symbols[handle] = procedure_call.procedure_symbol
+			self.pending_calls.append((handle, procedure_call.procedure_symbol.procedure_node))
+		return handle
+	
+	def visit_assignment_statement(self, assignment_statement: AssignmentStatement) -> int:
+		return self.arena.assignment_statement(
+			variable=self.visit(node=assignment_statement.variable),
+			expr=self.write(node=assignment_statement.expr)
+		)
+	
+	def visit_bin_op(self, bin_op_node: BinOp) -> int:
+		left = self.write(node=bin_op_node.left)
+		right = self.write(node=bin_op_node.right)
+		# typed operations too, their node types are the names of their kinds
+		kind = NodeKind[bin_op_node.node_type.upper()]
+		return self.arena.bin_op(left=left, op=bin_op_node.op, right=right, kind=kind)
+	
+	def visit_unary(self, unary: Unary) -> int:
+		return self.arena.unary(token=unary.token, expr=self.write(node=unary.expr))
+	
+	def visit_to_real(self, to_real: ToReal) -> int:
+		return self.arena.to_real(expr=self.write(node=to_real.expr))
+	
+	def visit_num(self, num: Num) -> int:
+		return self.arena.num(token=num.token)
+	
+	def visit_noop(self, noop: NoOp) -> int:
+		return self.arena.noop()
+
+
+class NodeReader:
+	"""
+	rebuilds node objects from an arena, the inverse of ArenaWriter
+	"""
+	
+	def __init__(self, arena: Arena):
+		self.arena = arena
+		self.types: dict[int, Type] = {}
+		self.procedures: dict[int, Procedure] = {}
+		# rebuilt calls and the handles of the procedures they run
+		self.calls: list[tuple[ProcedureCall, int]] = []
+		self.readers: dict[NodeKind, Callable[[int], Node]] = {
+			kind: self.read_typed_bin_op if kind in TYPED_BIN_OPS else getattr(self, f'read_{kind.name.lower()}')
+			for kind in NodeKind
+		}
+	
+	def rebuild(self, handle: int) -> Node | None:
+		"""
+		reads the subtree at handle and points its calls at the procedures rebuilt with it. the arena's
+		symbols may still belong to the tree it was written from, so the calls get copies
+		"""
+		node = self.read(handle=handle)
+		symbols: dict[int, ProcedureSymbol] = {}
+		for procedure_call, callee in self.calls:
+			procedure = self.procedures.get(callee)
+			# declared outside the subtree, the call keeps the arena's symbol
+			if procedure is None: continue
+			symbol = symbols.get(callee)
+			if symbol is None:
+				symbol = symbols[callee] = copy.copy(procedure_call.procedure_symbol)
+				symbol.procedure_node = procedure
+			procedure_call.procedure_symbol = symbol
+		return node
+	
+	def read(self, handle: int) -> Node | None:
+		if handle == NO_NODE: return None
+		return self.readers[self.arena.kinds[handle]](handle)
+	
+	def token(self, handle: int) -> Token:
+		arena = self.arena
+		value = arena.value(handle=handle) if arena.values[handle] != NO_NODE else 0
+		return Token(token_type=arena.op(handle=handle), value=value)
+	
+	def read_program(self, handle: int) -> Program:
+		program = Program(name=self.arena.value(handle=handle), block_node=self.read(handle=self.arena.firsts[handle]))
+		program.symbol_table = self.arena.symbol_tables.get(handle)
+		return program
+	
+	def read_block(self, handle: int) -> Block:
+		*declarations, compound = [self.read(handle=item) for item in self.arena.items(handle=handle)]
+		return Block(declarations=declarations, compound_node=compound)
+	
+	def read_variable_declaration(self, handle: int) -> VariableDeclaration:
+		return VariableDeclaration(
+			var_node=self.read(handle=self.arena.firsts[handle]),
+			type_node=self.read(handle=self.arena.seconds[handle])
+		)
+	
+	def read_procedure(self, handle: int) -> Procedure:
+		*params, block = [self.read(handle=item) for item in self.arena.items(handle=handle)]
+		procedure = Procedure(name=self.arena.value(handle=handle), params=params, block_node=block)
+		procedure.start, procedure.end = self.arena.spans[handle]
+		procedure.symbol_table = self.arena.symbol_tables.get(handle)
+		procedure.pure = handle in self.arena.pure
+		self.procedures[handle] = procedure
+		return procedure
+	
+	def read_param(self, handle: int) -> Param:
+		return Param(
+			var_node=self.read(handle=self.arena.firsts[handle]),
+			type_node=self.read(handle=self.arena.seconds[handle])
+		)
+	
+	def read_variable(self, handle: int) -> Variable:
+		variable = Variable(token=Token(token_type=TokenType.ID, value=self.arena.value(handle=handle)))
+		if self.arena.firsts[handle] != NO_NODE:
+			variable.scope_level = self.arena.firsts[handle]
+			variable.slot = self.arena.seconds[handle]
+		return variable
+	
+	def read_type(self, handle: int) -> Type:
+		type_node = self.types.get(handle)
+		if type_node is None: type_node = self.types[handle] = Type(token=self.token(handle=handle))
+		return type_node
+	
+	def read_compound(self, handle: int) -> Compound:
+		compound = Compound()
+		for item in self.arena.items(handle=handle): compound.add_child(self.read(handle=item))
+		compound.start, compound.end = self.arena.spans[handle]
+		return compound
+	
+	def read_procedure_call(self, handle: int) -> ProcedureCall:
+		name = self.arena.value(handle=handle)
+		procedure_call = ProcedureCall(
+			name=name,
+			args=[self.read(handle=item) for item in self.arena.items(handle=handle)],
+			token=Token(token_type=TokenType.ID, value=name)
+		)
+		procedure_call.procedure_symbol = self.arena.procedure_symbols.get(handle)
+		if handle in self.arena.callees: self.calls.append((procedure_call, self.arena.callees[handle]))
+		return procedure_call
+	
+	def read_assignment_statement(self, handle: int) -> AssignmentStatement:
+		return AssignmentStatement(
+			variable=self.read(handle=self.arena.firsts[handle]),
+			expr=self.read(handle=self.arena.seconds[handle])
+		)
+	
+	def read_bin_op(self, handle: int) -> BinOp:
+		return BinOp(
+			left=self.read(handle=self.arena.firsts[handle]),
+			op=self.token(handle=handle),
+			right=self.read(handle=self.arena.seconds[handle])
+		)
+	
+	def read_typed_bin_op(self, handle: int) -> TypedBinOp:
+		node_class, type_name = TYPED_BIN_OPS[self.arena.kinds[handle]]
+		return node_class(
+			left=self.read(handle=self.arena.firsts[handle]),
+			op=self.token(handle=handle),
+			right=self.read(handle=self.arena.seconds[handle]),
+			type_symbol=self.builtin(name=type_name)
+		)
+	
+	def read_unary(self, handle: int) -> Unary:
+		return Unary(token=self.token(handle=handle), expr=self.read(handle=self.arena.firsts[handle]))
+	
+	def read_to_real(self, handle: int) -> ToReal:
+		return ToReal(expr=self.read(handle=self.arena.firsts[handle]), type_symbol=self.builtin(name='real'))
+	
+	def builtin(self, name: str) -> BuiltinTypeSymbol:
+		# typed kinds only come out of analysis, which leaves the global scope in symbol_tables
+		return self.arena.symbol_tables[self.arena.root].lookup(name=name)
+	
+	def read_num(self, handle: int) -> Num:
+		return Num(token=self.token(handle=handle))
+	
+	def read_noop(self, handle: int) -> NoOp:
+		return NoOp()
+
+
+class ArenaVisitor:
+	"""
+	NodeVisitor for arenas: visit(handle) dispatches on the node kind to visit_<kind>(handle),
+	the same method names NodeVisitor uses, without creating node objects
+	"""
+	
+	# node kind -> unbound visit_* function, one table per visitor class
+	dispatch_table: dict[int, Callable] = {}
+	
+	def __init_subclass__(cls, **kwargs):
+		super().__init_subclass__(**kwargs)
+		cls.dispatch_table = {}
+		for kind in NodeKind:
+			visit_method = getattr(cls, f'visit_{kind.name.lower()}', None)
+			if visit_method is None and kind in GENERIC_KINDS:
+				# a specialized kind visitors may treat as the kind it specializes
+				visit_method = getattr(cls, f'visit_{GENERIC_KINDS[kind].name.lower()}', None)
+			if visit_method is not None: cls.dispatch_table[kind] = visit_method
+	
+	def __init__(self, arena: Arena):
+		self.arena = arena
+	
+	def visit(self, handle: int):
+		kind = self.arena.kinds[handle]
+		try:
+			visit_method = self.dispatch_table[kind]
+		except KeyError:
+			raise AttributeError(
+				f"{self.__class__.__name__} has no visit_{NodeKind(kind).name.lower()} "
+				f"for {NodeKind(kind).name} nodes"
+			) from None
+		return visit_method(self, handle)
@@ -0,0 +1,316 @@
+from lexer import TokenType, TOKEN_CODES
+from arena import Arena, ArenaVisitor, NodeKind
+from semantic_analyzer import TYPED_BIN_OPS
+
+from symbols import (
+	Symbol,
+	BuiltinTypeSymbol,
+	VarSymbol,
+	ProcedureSymbol,
+	SymbolTable
+)
+
+ADD = TOKEN_CODES[TokenType.ADD]
+SUBTRACT = TOKEN_CODES[TokenType.SUBTRACT]
+MULTIPLY = TOKEN_CODES[TokenType.MULTIPLY]
+DIVIDE = TOKEN_CODES[TokenType.DIVIDE]
+INT_DIVIDE = TOKEN_CODES[TokenType.INT_DIVIDE]
+INTEGER_TYPE = TOKEN_CODES[TokenType.INTEGER_TYPE]
+REAL_TYPE = TOKEN_CODES[TokenType.REAL_TYPE]
+
+# (result type, operator token code) -> the kind running just that operation
+TYPED_KINDS: dict[tuple[str, int], NodeKind] = {
+	(type_name, TOKEN_CODES[op]): NodeKind[node_class.typed_node_type.upper()]
+	for (type_name, op), node_class in TYPED_BIN_OPS.items()
+}
+
+
+class ArenaAnalyzer(ArenaVisitor):
+	"""
+	SemanticAnalyzer over an arena: same checks and errors, resolved scope levels and slots are
+	written into the VARIABLE rows and scopes into arena.symbol_tables. rows can be rewritten in
+	place, so it also does TypeSpecializer's work as it goes: BIN_OP rows become the typed kinds and
+	an integer stored in a real variable or param gets a TO_REAL row
+	"""
+	
+	def __init__(self, arena: Arena):
+		super().__init__(arena=arena)
+		self.current_scope: SymbolTable | None = None
+		# the PROCEDURE declaring each procedure symbol, what a call of it runs
+		self.procedures: dict[ProcedureSymbol, int] = {}
+	
+	def analyze(self):
+		self.visit(handle=self.arena.root)
+	
+	def visit_program(self, handle: int):
+		self.current_scope = SymbolTable(
+			scope_name='global',
+			scope_level=1,
+			enclosing_scope=self.current_scope
+		)
+		self.current_scope.open()
+		self.arena.symbol_tables[handle] = self.current_scope
+		self.visit(handle=self.arena.firsts[handle])
+		print(self.current_scope)
+		self.current_scope = self.current_scope.close()
+	
+	def visit_block(self, handle: int):
+		for item in self.arena.items(handle=handle): self.visit(handle=item)
+	
+	def visit_variable_declaration(self, handle: int):
+		arena = self.arena
+		type_symbol = self.visit(handle=arena.seconds[handle])
+		variable_name = arena.value(handle=arena.firsts[handle])
+		existing = self.current_scope.local_lookup(variable_name)
+		if existing is not None:
+			raise Exception(f"error: duplicate identifier {variable_name} in {self.current_scope.machine_name()}")
+		self.current_scope.add(VarSymbol(name=variable_name, type_symbol=type_symbol))
+	
+	def visit_type(self, handle: int) -> Symbol:
+		op = self.arena.ops[handle]
+		if op == INTEGER_TYPE: return self.current_scope.lookup('integer')
+		if op == REAL_TYPE: return self.current_scope.lookup('real')
+		raise Exception(
+			f"undefined symbol "
+			f"builtin for {self.arena.op(handle=handle)}"
+		)
+	
+	def visit_procedure(self, handle: int):
+		arena = self.arena
+		procedure_name = arena.value(handle=handle)
+		procedure_symbol = ProcedureSymbol(name=procedure_name, params=[])
+		self.procedures[procedure_symbol] = handle
+		self.current_scope.add(procedure_symbol)
+		self.current_scope = SymbolTable(
+			scope_name=procedure_name,
+			scope_level=self.current_scope.scope_level + 1,
+			enclosing_scope=self.current_scope
+		)
+		self.current_scope.open()
+		arena.symbol_tables[handle] = self.current_scope
+		*params, block = arena.items(handle=handle)
+		for param in params:
+			type_symbol: BuiltinTypeSymbol = self.visit(handle=arena.seconds[param])
+			var_symbol = VarSymbol(name=arena.value(handle=arena.firsts[param]), type_symbol=type_symbol)
+			self.current_scope.add(symbol=var_symbol)
+			procedure_symbol.params.append(var_symbol)
+		
+		self.visit(handle=block)
+		print(self.current_scope)
+		self.current_scope = self.current_scope.close()
+	
+	def visit_compound(self, handle: int):
+		for item in self.arena.items(handle=handle): self.visit(handle=item)
+	
+	def visit_procedure_call(self, handle: int):
+		arena = self.arena
+		name = arena.value(handle=handle)
+		symbol = self.current_scope.lookup(name=name)
+		if symbol is None:
+			raise NameError(f"{name} in {self.current_scope.scope_name}@{self.current_scope.scope_level}")
+		if not isinstance(symbol, ProcedureSymbol):
+			raise Exception(f"error: {name} is not a procedure in {self.current_scope.machine_name()}")
+		args = arena.items(handle=handle)
+		if len(args) != len(symbol.params):
+			raise Exception(
+				f"error: {name} takes {len(symbol.params)} arguments, got {len(args)} "
+				f"in {self.current_scope.machine_name()}"
+			)
+		offset = arena.firsts[handle]
+		for n, (arg, param) in enumerate(zip(args, symbol.params), start=1):
+			arg_type = self.visit(handle=arg)
+			# an integer argument widens to a real parameter, never the other way round
+			if param.type_symbol.name == 'integer' and arg_type.name != 'integer':
+				raise Exception(
+					f"error: argument {n} of {name} is {arg_type.name}, expected {param.type_symbol.name} "
+					f"in {self.current_scope.machine_name()}"
+				)
+			arena.children[offset + n - 1] = self.promote(handle=arg, expr_type=arg_type, type_symbol=param.type_symbol)
+		arena.procedure_symbols[handle] = symbol
+		arena.callees[handle] = self.procedures[symbol]
+	
+	def visit_assignment_statement(self, handle: int):
+		arena = self.arena
+		variable = arena.firsts[handle]
+		var_name = arena.value(handle=variable)
+		symbol = self.current_scope.lookup(name=var_name)
+		if symbol is None:
+			raise NameError(var_name)
+		self.resolve(handle=variable, symbol=symbol)
+		expr = arena.seconds[handle]
+		expr_type = self.visit(handle=expr)
+		if symbol.type_symbol.name == 'integer' and expr_type.name != 'integer':
+			raise Exception(
+				f"error: cannot assign {expr_type.name} to integer {var_name} "
+				f"in {self.current_scope.machine_name()}"
+			)
+		arena.seconds[handle] = self.promote(handle=expr, expr_type=expr_type, type_symbol=symbol.type_symbol)
+	
+	def promote(self, handle: int, expr_type: BuiltinTypeSymbol, type_symbol: BuiltinTypeSymbol) -> int:
+		if type_symbol.name == 'real' and expr_type.name == 'integer': return self.arena.to_real(expr=handle)
+		return handle
+	
+	def visit_bin_op(self, handle: int) -> BuiltinTypeSymbol:
+		arena = self.arena
+		left_type = self.visit(handle=arena.firsts[handle])
+		right_type = self.visit(handle=arena.seconds[handle])
+		op = arena.ops[handle]
+		if op == INT_DIVIDE and (left_type.name != 'integer' or right_type.name != 'integer'):
+			raise Exception(
+				f"error: div takes integers, got {left_type.name} div {right_type.name} "
+				f"in {self.current_scope.machine_name()}"
+			)
+		if op == DIVIDE or left_type.name == 'real' or right_type.name == 'real':
+			type_symbol = self.current_scope.lookup('real')
+		else:
+			type_symbol = left_type
+		arena.kinds[handle] = TYPED_KINDS[type_symbol.name, op]
+		return type_symbol
+	
+	def visit_variable(self, handle: int) -> BuiltinTypeSymbol:
+		var_name = self.arena.value(handle=handle)
+		symbol = self.current_scope.lookup(name=var_name)
+		if symbol is None:
+			raise NameError(f"{var_name} in {self.current_scope.scope_name}@{self.current_scope.scope_level}")
+		self.resolve(handle=handle, symbol=symbol)
+		return symbol.type_symbol
+	
+	def resolve(self, handle: int, symbol: Symbol):
+		if not isinstance(symbol, VarSymbol):
+			raise Exception(f"error: {symbol.name} is not a variable in {self.current_scope.machine_name()}")
+		self.arena.firsts[handle] = symbol.scope_level
+		self.arena.seconds[handle] = symbol.slot
+	
+	def visit_unary(self, handle: int) -> BuiltinTypeSymbol:
+		return self.visit(handle=self.arena.firsts[handle])
+	
+	def visit_to_real(self, handle: int) -> BuiltinTypeSymbol:
+		self.visit(handle=self.arena.firsts[handle])
+		return self.current_scope.lookup('real')
+	
+	def visit_num(self, handle: int) -> BuiltinTypeSymbol:
+		return self.current_scope.lookup('integer' if type(self.arena.value(handle=handle)) is int else 'real')
+	
+	def visit_noop(self, handle: int):
+		pass
+
+
+class ArenaInterpreter(ArenaVisitor):
+	"""
+	Interpreter over an arena analyzed by ArenaAnalyzer
+	"""
+	
+	def __init__(self, arena: Arena):
+		super().__init__(arena=arena)
+		self.frames: list[list[int | float | None]] = []
+		self.global_symbols: list[VarSymbol] = []
+	
+	@property
+	def state(self) -> dict[str, int | float]:
+		if not self.frames: return {}
+		return {
+			symbol.name: value
+			for symbol, value in zip(self.global_symbols, self.frames[0])
+			if value is not None
+		}
+	
+	def interpret(self):
+		self.visit(handle=self.arena.root)
+		print(self.state)
+	
+	def visit_program(self, handle: int):
+		self.global_symbols = self.arena.symbol_tables[handle].slots
+		self.frames = [[None] * len(self.global_symbols)]
+		return self.visit(handle=self.arena.firsts[handle])
+	
+	def visit_block(self, handle: int):
+		for item in self.arena.items(handle=handle): self.visit(handle=item)
+	
+	def visit_variable_declaration(self, handle: int):
+		pass
+	
+	def visit_procedure(self, handle: int):
+		# runs only when called
+		pass
+	
+	def visit_compound(self, handle: int):
+		for item in self.arena.items(handle=handle): self.visit(handle=item)
+	
+	def visit_procedure_call(self, handle: int):
+		arena = self.arena
+		procedure = arena.callees[handle]
+		args = [self.visit(handle=arg) for arg in arena.items(handle=handle)]
+		level = arena.symbol_tables[procedure].scope_level
+		# frames is a display, one frame per scope level: the callee is declared in a scope enclosing
+		# the caller, so the frames below its level are already its static chain
+		frame: list[int | float | None] = [None] * len(arena.symbol_tables[procedure].slots)
+		# params are the first symbols of a procedure's scope
+		frame[:len(args)] = args
+		caller_frames = self.frames[level - 1:]
+		self.frames[level - 1:] = [frame]
+		try:
+			*_, block = arena.items(handle=procedure)
+			self.visit(handle=block)
+		finally:
+			self.frames[level - 1:] = caller_frames
+	
+	def visit_assignment_statement(self, handle: int):
+		arena = self.arena
+		variable = arena.firsts[handle]
+		value = self.visit(handle=arena.seconds[handle])
+		self.frames[arena.firsts[variable] - 1][arena.seconds[variable]] = value
+	
+	def visit_bin_op(self, handle: int) -> int | float:
+		arena = self.arena
+		op = arena.ops[handle]
+		left = self.visit(handle=arena.firsts[handle])
+		right = self.visit(handle=arena.seconds[handle])
+		if op == ADD: return left + right
+		if op == SUBTRACT: return left - right
+		if op == MULTIPLY: return left * right
+		if op == DIVIDE: return left / right
+		if op == INT_DIVIDE: return left // right
+	
+	def visit_int_add(self, handle: int) -> int:
+		return self.visit(handle=self.arena.firsts[handle]) + self.visit(handle=self.arena.seconds[handle])
+	
+	def visit_int_subtract(self, handle: int) -> int:
+		return self.visit(handle=self.arena.firsts[handle]) - self.visit(handle=self.arena.seconds[handle])
+	
+	def visit_int_multiply(self, handle: int) -> int:
+		return self.visit(handle=self.arena.firsts[handle]) * self.visit(handle=self.arena.seconds[handle])
+	
+	def visit_int_divide(self, handle: int) -> int:
+		return self.visit(handle=self.arena.firsts[handle]) // self.visit(handle=self.arena.seconds[handle])
+	
+	def visit_real_add(self, handle: int) -> float:
+		return self.visit(handle=self.arena.firsts[handle]) + self.visit(handle=self.arena.seconds[handle])
+	
+	def visit_real_subtract(self, handle: int) -> float:
+		return self.visit(handle=self.arena.firsts[handle]) - self.visit(handle=self.arena.seconds[handle])
+	
+	def visit_real_multiply(self, handle: int) -> float:
+		return self.visit(handle=self.arena.firsts[handle]) * self.visit(handle=self.arena.seconds[handle])
+	
+	def visit_real_divide(self, handle: int) -> float:
+		return self.visit(handle=self.arena.firsts[handle]) / self.visit(handle=self.arena.seconds[handle])
+	
+	def visit_variable(self, handle: int) -> int | float:
+		arena = self.arena
+		value = self.frames[arena.firsts[handle] - 1][arena.seconds[handle]]
+		if value is None: raise NameError(arena.value(handle=handle))
+		return value
+	
+	def visit_unary(self, handle: int) -> int | float:
+		value = self.visit(handle=self.arena.firsts[handle])
+		if self.arena.ops[handle] == ADD: return +value
+		return -value
+	
+	def visit_to_real(self, handle: int) -> float:
+		return float(self.visit(handle=self.arena.firsts[handle]))
+	
+	def visit_num(self, handle: int) -> int | float:
+		return self.arena.value(handle=handle)
+	
+	def visit_noop(self, handle: int):
+		print('noop')
@@ -0,0 +1,119 @@
+import argparse
+import concurrent.futures
+import contextlib
+import glob
+import io
+import json
+import os
+import sys
+import time
+
+from parser import Parser
+from semantic_analyzer import SemanticAnalyzer
+from optimizer import ConstantFolder
+from program_cache import ProgramCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_SIZE
+from main import ENGINES
+
+ORDERS = ('submission', 'completion')
+
+
+def collect(sources: list[str]) -> list[str]:
+	"""
+	expands each source into program paths: a directory gives its .pas files, @file reads a manifest
+	of one path per line, anything else is a glob pattern
+	"""
+	paths = []
+	for source in sources:
+		if source.startswith('@'):
+			with open(source[1:]) as fp:
+				paths.extend(line.strip() for line in fp if line.strip() and not line.startswith('#'))
+		elif os.path.isdir(source):
+			paths.extend(sorted(glob.glob(os.path.join(source, '*.pas'))))
+		else:
+			paths.extend(sorted(glob.glob(source)))
+	return paths
+
+
+def run_file(path: str, engine: str, optimize: bool, cache: ProgramCache | None) -> dict:
+	"""
+	parses, analyzes and executes one program, any error is reported in the result rather than raised
+	"""
+	start = time.perf_counter()
+	result = {'file': path}
+	try:
+		# the analyzer and engines print as they go, only the result line is wanted
+		with contextlib.redirect_stdout(io.StringIO()):
+			with open(path) as fp:
+				text = fp.read()
+			result['bytes'] = len(text)
+			program_node = cache.load(text=text) if cache is not None else None
+			if program_node is None:
+				program_node = Parser(text=text).parse()
+				SemanticAnalyzer().analyze(program_node=program_node)
+				if cache is not None: cache.store(text=text, program_node=program_node)
+			if optimize: ConstantFolder().optimize(program_node=program_node)
+			interpreter = ENGINES[engine]()
+			interpreter.interpret(program_node=program_node)
+		result['state'] = interpreter.state
+	except Exception as e:
+		result['error'] = f'{type(e).__name__} {str(e)}'
+	result['seconds'] = time.perf_counter() - start
+	return result
+
+
+def run_batch(
+	paths: list[str], engine: str, optimize: bool, cache: ProgramCache | None,
+	workers: int | None, order: str
+):
+	"""
+	yields one result per path from a process pool, in submission or completion order
+	"""
+	with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+		futures = {executor.submit(run_file, path, engine, optimize, cache): path for path in paths}
+		ordered = futures if order == 'submission' else concurrent.futures.as_completed(futures)
+		for future in ordered:
+			try:
+				yield future.result()
+			except Exception as e:
+				# the worker process itself died, which breaks the pool for every file still pending
+				yield {'file': futures[future], 'error': f'{type(e).__name__} {str(e)}'}
+
+
+def main():
+	arg_parser = argparse.ArgumentParser(description='run many programs across a process pool, one json result per line')
+	arg_parser.add_argument('sources', nargs='+', help='directories, glob patterns or @manifest files')
+	arg_parser.add_argument('--engine', choices=ENGINES.keys(), default='tree')
+	arg_parser.add_argument('--workers', type=int, default=os.cpu_count(), help='defaults to the cpu count')
+	arg_parser.add_argument('--order', choices=ORDERS, default='submission', help='order results are written in')
+	arg_parser.add_argument('--no-optimize', action='store_true', help='skip constant folding')
+	arg_parser.add_argument('--no-cache', action='store_true', help='neither read nor write the program cache')
+	arg_parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+	arg_parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_SIZE, help='cache size limit in bytes')
+	args = arg_parser.parse_args()
+	cache = None if args.no_cache else ProgramCache(cache_dir=args.cache_dir, max_size=args.cache_size)
+	
+	paths = collect(sources=args.sources)
+	start = time.perf_counter()
+	failed = 0
+	total_bytes = 0
+	results = run_batch(
+		paths=paths, engine=args.engine, optimize=not args.no_optimize, cache=cache,
+		workers=args.workers, order=args.order
+	)
+	for result in results:
+		if 'error' in result: failed += 1
+		total_bytes += result.get('bytes', 0)
+		sys.stdout.write(json.dumps(result) + '\n')
+	elapsed = time.perf_counter() - start
+	
+	# the summary goes to stderr so stdout stays valid json lines
+	print(
+		f'{len(paths)} programs, {len(paths) - failed} ok, {failed} failed in {elapsed:.3f}s '
+		f'({len(paths) / elapsed if elapsed else 0:.1f} programs/s, '
+		f'{total_bytes / 1024 / elapsed if elapsed else 0:.1f} KiB/s) with {args.workers} workers',
+		file=sys.stderr
+	)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,146 @@
+import operator
+from typing import Callable
+
+from lexer import TokenType
+
+from syntax_tree import (
+	NodeVisitor,
+	Program,
+	Block,
+	VariableDeclaration,
+	Procedure,
+	Variable,
+	Compound,
+	AssignmentStatement,
+	BinOp,
+	Num,
+	Unary,
+	ToReal,
+	NoOp
+)
+
+from interpreter import Interpreter, calls_procedures
+
+State = dict[str, int | float]
+Statement = Callable[[State], None]
+Expression = Callable[[State], int | float]
+
+BINARY_OPERATORS: dict[TokenType, Callable] = {
+	TokenType.ADD: operator.add,
+	TokenType.SUBTRACT: operator.sub,
+	TokenType.MULTIPLY: operator.mul,
+	TokenType.DIVIDE: operator.truediv,
+	TokenType.INT_DIVIDE: operator.floordiv,
+}
+
+UNARY_OPERATORS: dict[TokenType, Callable] = {
+	TokenType.ADD: operator.pos,
+	TokenType.SUBTRACT: operator.neg,
+}
+
+
+class ClosureCompiler(NodeVisitor):
+	"""
+	compiles a program once into nested closures over the runtime state;
+	operators, variable names and constants are bound at compile time. procedure calls are not
+	compiled, ClosureInterpreter always runs programs with calls on the tree engine
+	"""
+	
+	def compile(self, program_node: Program) -> Statement:
+		return self.visit(node=program_node)
+	
+	def visit_program(self, program: Program) -> Statement:
+		return self.visit(node=program.block_node)
+	
+	def visit_block(self, block: Block) -> Statement:
+		for node in block.declarations:
+			self.visit(node=node)
+		return self.visit(node=block.compound)
+	
+	def visit_variable_declaration(self, variable_declaration: VariableDeclaration):
+		pass
+	
+	def visit_procedure(self, procedure: Procedure):
+		# runs only when called, and ClosureInterpreter never compiles a program with calls
+		pass
+	
+	def visit_compound(self, compound: Compound) -> Statement:
+		statements = tuple(
+			self.visit(node=node) for node in compound.children
+			if not isinstance(node, NoOp)
+		)
+		if len(statements) == 1: return statements[0]
+		
+		def run_compound(state: State):
+			for statement in statements:
+				statement(state)
+		
+		return run_compound
+	
+	def visit_assignment_statement(self, assignment_statement: AssignmentStatement) -> Statement:
+		variable_name = assignment_statement.variable.token.value
+		expr = self.visit(node=assignment_statement.expr)
+		
+		def run_assignment(state: State):
+			state[variable_name] = expr(state)
+		
+		return run_assignment
+	
+	def visit_bin_op(self, bin_op_node: BinOp) -> Expression:
+		op = BINARY_OPERATORS[bin_op_node.op.token_type]
+		left = bin_op_node.left
+		right = bin_op_node.right
+		if isinstance(right, Num):
+			right_value = right.value
+			left_expr = self.visit(node=left)
+			return lambda state: op(left_expr(state), right_value)
+		if isinstance(left, Num):
+			left_value = left.value
+			right_expr = self.visit(node=right)
+			return lambda state: op(left_value, right_expr(state))
+		left_expr = self.visit(node=left)
+		right_expr = self.visit(node=right)
+		return lambda state: op(left_expr(state), right_expr(state))
+	
+	def visit_variable(self, variable: Variable) -> Expression:
+		var_name = variable.token.value
+		
+		def load_variable(state: State) -> int | float:
+			try:
+				return state[var_name]
+			except KeyError:
+				raise NameError(var_name) from None
+		
+		return load_variable
+	
+	def visit_unary(self, unary: Unary) -> Expression:
+		op = UNARY_OPERATORS[unary.token.token_type]
+		expr = self.visit(node=unary.expr)
+		return lambda state: op(expr(state))
+	
+	def visit_to_real(self, to_real: ToReal) -> Expression:
+		expr = self.visit(node=to_real.expr)
+		return lambda state: float(expr(state))
+	
+	def visit_num(self, num: Num) -> Expression:
+		value = num.value
+		return lambda state: value
+	
+	def visit_noop(self, noop: NoOp) -> Statement:
+		return lambda state: None
+
+
+class ClosureInterpreter:
+	def __init__(self):
+		self.state: State = {}
+	
+	def interpret(self, program_node: Program):
+		if calls_procedures(program_node=program_node):
+			# the state is one flat dict, calls need the activation records of the tree engine
+			interpreter = Interpreter()
+			interpreter.visit(node=program_node)
+			self.state = interpreter.state
+		else:
+			run = ClosureCompiler().compile(program_node=program_node)
+			run(self.state)
+		print(self.state)
@@ -0,0 +1,212 @@
+from lexer import TokenType
+from parser import Parser
+from semantic_analyzer import SemanticAnalyzer, TypeSpecializer, PurityClassifier
+
+from symbols import (
+	ProcedureSymbol,
+	SymbolTable
+)
+
+from syntax_tree import (
+	Node,
+	Program,
+	Procedure,
+	Block,
+	Compound,
+	ProcedureCall
+)
+
+
+class ReparseTarget:
+	"""
+	the innermost Procedure or Compound strictly containing an edit, where it hangs in the tree,
+	the scope its statements resolve against and the procedure they belong to, None for the main block
+	"""
+	
+	def __init__(
+			self,
+			node: Procedure | Compound,
+			parent: Block | list[Node],
+			index: int,
+			scope: SymbolTable,
+			owner: Procedure | None):
+		self.node = node
+		self.parent = parent
+		self.index = index
+		self.scope = scope
+		self.owner = owner
+	
+	def replace(self, node: Procedure | Compound):
+		if isinstance(self.parent, Block):
+			self.parent.compound = node
+		else:
+			self.parent[self.index] = node
+
+
+class IncrementalParser:
+	"""
+	keeps an analyzed program in sync with its source under text edits. an edit strictly inside a
+	Procedure or Compound re-lexes and re-parses only that node's source span, re-analyzes it against
+	its existing enclosing scope and reuses the rest of the tree. anything it cannot handle locally,
+	including errors, falls back to a full parse so the result is always that of a full parse
+	"""
+	
+	def __init__(self, text: str):
+		self.text = text
+		self.purity = PurityClassifier()
+		self.program: Program = self.full_parse(text=text)
+		# length of the source the last parse covered
+		self.reparsed_length = len(text)
+	
+	def full_parse(self, text: str) -> Program:
+		program_node = Parser(text=text).parse()
+		analyzer = SemanticAnalyzer()
+		analyzer.analyze(program_node=program_node)
+		self.purity = analyzer.purity
+		return program_node
+	
+	def edit(self, start: int, end: int, replacement: str) -> Program:
+		"""
+		replaces text[start:end] with replacement and returns the updated program
+		"""
+		text = self.text[:start] + replacement + self.text[end:]
+		target = self.find_target(start=start, end=end)
+		if target is None or not self.reparse(target=target, text=text, end=end, delta=len(replacement) - (end - start)):
+			self.program = self.full_parse(text=text)
+			self.reparsed_length = len(text)
+		self.text = text
+		return self.program
+	
+	def find_target(self, start: int, end: int) -> ReparseTarget | None:
+		def contains(node: Procedure | Compound) -> bool:
+			return node.start < start and end < node.end
+		
+		target = None
+		owner = None
+		scope = self.program.symbol_table
+		block = self.program.block_node
+		while True:
+			procedures = [
+				(index, node) for index, node in enumerate(block.declarations)
+				if isinstance(node, Procedure) and contains(node)
+			]
+			if not procedures: break
+			index, procedure = procedures[0]
+			target = ReparseTarget(node=procedure, parent=block.declarations, index=index, scope=scope, owner=owner)
+			owner = procedure
+			scope = procedure.symbol_table
+			block = procedure.block_node
+		if not contains(block.compound): return target
+		target = ReparseTarget(node=block.compound, parent=block, index=0, scope=scope, owner=owner)
+		while True:
+			compounds = [
+				(index, node) for index, node in enumerate(target.node.children)
+				if isinstance(node, Compound) and contains(node)
+			]
+			if not compounds: return target
+			index, compound = compounds[0]
+			target = ReparseTarget(node=compound, parent=target.node.children, index=index, scope=scope, owner=owner)
+	
+	def reparse(self, target: ReparseTarget, text: str, end: int, delta: int) -> bool:
+		"""
+		returns False without touching the tree when the edit needs a full parse
+		"""
+		old_node = target.node
+		parser = Parser(text=text, start=old_node.start, end=old_node.end + delta)
+		try:
+			if isinstance(old_node, Procedure):
+				new_node = parser.procedure()
+			else:
+				new_node = parser.compound_statement()
+		except SyntaxError:
+			return False
+		if parser.ct.token_type != TokenType.EOF: return False
+		if not self.reanalyze(target=target, new_node=new_node): return False
+		TypeSpecializer().visit(node=new_node)
+		self.shift_spans(block=self.program.block_node, end=end, delta=delta)
+		target.replace(node=new_node)
+		# the edit may change what the reparsed procedure and its callers reach, nothing else
+		if isinstance(old_node, Procedure):
+			self.purity.replace(old=old_node, new=new_node)
+		elif target.owner is not None:
+			self.purity.reclassify(procedure=target.owner)
+		self.reparsed_length = new_node.end - new_node.start
+		return True
+	
+	@staticmethod
+	def reanalyze(target: ReparseTarget, new_node: Procedure | Compound) -> bool:
+		analyzer = SemanticAnalyzer()
+		analyzer.current_scope = target.scope
+		# the target's scope was closed when the full analysis left it
+		target.scope.open()
+		if isinstance(new_node, Compound):
+			# statements only read the scope, nothing in it changes
+			try:
+				analyzer.visit(node=new_node)
+			except Exception:
+				return False
+			return declared_before(node=new_node)
+		old_node: Procedure = target.node
+		if new_node.name != old_node.name: return False
+		old_symbol = target.scope.local_lookup(old_node.name)
+		try:
+			# rebuilds the procedure's own scope and replaces its symbol in the enclosing one
+			analyzer.visit(node=new_node)
+		except Exception:
+			target.scope.add(symbol=old_symbol)
+			return False
+		new_symbol = target.scope.local_lookup(new_node.name)
+		if not declared_before(node=new_node) or signature(symbol=new_symbol) != signature(symbol=old_symbol):
+			# the enclosing scope sees a different procedure now
+			target.scope.add(symbol=old_symbol)
+			return False
+		# calls analyzed before the edit still hold the old symbol, they must run the new body too
+		old_symbol.procedure_node = new_node
+		return True
+	
+	def shift_spans(self, block: Block, end: int, delta: int):
+		for node in block.declarations:
+			if isinstance(node, Procedure):
+				shift_span(node=node, end=end, delta=delta)
+				self.shift_spans(block=node.block_node, end=end, delta=delta)
+		self.shift_compound_spans(compound=block.compound, end=end, delta=delta)
+	
+	def shift_compound_spans(self, compound: Compound, end: int, delta: int):
+		shift_span(node=compound, end=end, delta=delta)
+		for node in compound.children:
+			if isinstance(node, Compound):
+				self.shift_compound_spans(compound=node, end=end, delta=delta)
+
+
+def shift_span(node: Procedure | Compound, end: int, delta: int):
+	if node.start >= end: node.start += delta
+	if node.end >= end: node.end += delta
+
+
+def declared_before(node: Procedure | Compound) -> bool:
+	"""
+	whether every call in a reanalyzed node runs a procedure declared before it or inside it. the
+	enclosing scopes already hold all their declarations, so a local analysis also finds procedures
+	declared after the node, which a full parse rejects or resolves to another procedure
+	"""
+	procedures = set()
+	calls = []
+	pending: list[Node] = [node]
+	while pending:
+		current = pending.pop()
+		if isinstance(current, Procedure):
+			procedures.add(current)
+			pending.extend(current.block_node.declarations)
+			pending.append(current.block_node.compound)
+		elif isinstance(current, Compound):
+			pending.extend(current.children)
+		elif isinstance(current, ProcedureCall):
+			calls.append(current)
+	for call in calls:
+		callee = call.procedure_symbol.procedure_node
+		if callee not in procedures and callee.start >= node.start: return False
+	return True
+
+
+def signature(symbol: ProcedureSymbol) -> tuple:
+	return symbol.name, [(param.name, param.type_symbol.name) for param in symbol.params]
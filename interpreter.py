@@ -1,6 +1,9 @@
+from collections import OrderedDict
+
 from lexer import TokenType
 
 from syntax_tree import (
+	Node,
 	NodeVisitor,
 	Program,
 	Block,
@@ -9,29 +12,122 @@ from syntax_tree import (
 	Variable,
 	Type,
 	Compound,
+	ProcedureCall,
 	AssignmentStatement,
 	BinOp,
 	Num,
 	Unary,
-	NoOp
+	NoOp,
+	IntAdd,
+	IntSubtract,
+	IntMultiply,
+	IntDivide,
+	RealAdd,
+	RealSubtract,
+	RealMultiply,
+	RealDivide,
+	ToReal
 )
 
 from symbols import (
 	SymbolTable,
 	VarSymbol,
+	ProcedureSymbol,
 	BuiltinTypeSymbol
 )
 
+# an activation record is [static link, slot 0, slot 1, ...], the static link being the record
+# of the lexically enclosing scope's activation
+ActivationRecord = list
+
+DEFAULT_MEMO_SIZE = 1024
+
+
+class ActivationPool:
+	"""
+	free list of activation records for one procedure, sized from its symbol table, so a call
+	reuses a released record instead of building a new one
+	"""
+	
+	def __init__(self, size: int):
+		self.free: list[ActivationRecord] = []
+		self.size = size
+		self.blank = (None,) * size
+	
+	def acquire(self, static_link: ActivationRecord) -> ActivationRecord:
+		if self.free:
+			record = self.free.pop()
+		else:
+			record = [None] * (self.size + 1)
+		record[0] = static_link
+		return record
+	
+	def release(self, record: ActivationRecord):
+		# unassigned locals must read as None again on the next call
+		record[0] = None
+		record[1:] = self.blank
+		self.free.append(record)
+
+
+class MemoTable:
+	"""
+	argument tuples a pure procedure already ran with to the end, least recently used first. a pure
+	call leaves nothing behind, so a hit has nothing to restore and simply skips the body. calls that
+	raised are not remembered, running them again raises the same error
+	"""
+	
+	def __init__(self, size: int):
+		self.entries: OrderedDict[tuple, None] = OrderedDict()
+		self.size = size
+		self.hits = 0
+		self.misses = 0
+	
+	def lookup(self, key: tuple) -> bool:
+		if key in self.entries:
+			self.entries.move_to_end(key)
+			self.hits += 1
+			return True
+		self.misses += 1
+		return False
+	
+	def add(self, key: tuple):
+		self.entries[key] = None
+		if len(self.entries) > self.size: self.entries.popitem(last=False)
+
 
 class Interpreter(NodeVisitor):
-	def __init__(self):
-		self.state: dict[str, int] = {}
+	pool_class: type[ActivationPool] = ActivationPool
+	
+	def __init__(self, memoize: bool = True, memo_size: int = DEFAULT_MEMO_SIZE):
+		# the record of the scope running now and its scope level
+		self.record: ActivationRecord | None = None
+		self.level = 0
+		self.global_symbols: list[VarSymbol] = []
+		self.pools: dict[ProcedureSymbol, ActivationPool] = {}
+		self.memoize = memoize
+		self.memo_size = memo_size
+		self.memos: dict[ProcedureSymbol, MemoTable] = {}
+	
+	@property
+	def state(self) -> dict[str, int | float]:
+		if self.record is None: return {}
+		record = self.record
+		for _ in range(self.level - 1): record = record[0]
+		return {
+			symbol.name: value for symbol, value in zip(self.global_symbols, record[1:])
+			if value is not None
+		}
 	
 	def interpret(self, program_node: Program):
 		self.visit(node=program_node)
 		print(self.state)
 	
 	def visit_program(self, program: Program):
+		self.global_symbols = program.symbol_table.slots
+		self.record = [None] * (len(self.global_symbols) + 1)
+		self.level = 1
+		self.pools = {}
+		self.memos = {}
 		return self.visit(node=program.block_node)
 	
 	def visit_block(self, block: Block):
@@ -40,12 +136,8 @@ class Interpreter(NodeVisitor):
 		return self.visit(node=block.compound)
 	
 	def visit_variable_declaration(self, variable_declaration: VariableDeclaration):
-		built_in_symbol = self.visit(variable_declaration.type_node)
-		var_symbol = VarSymbol(
-			name=variable_declaration.var_node.token.value,
-			type_symbol=built_in_symbol
-		)
-		
+		pass
+	
 	def visit_type(self, type_node: Type) -> BuiltinTypeSymbol:
 		raise Exception(
 			f"undefined symbol "
@@ -53,17 +145,51 @@ class Interpreter(NodeVisitor):
 		)
 	
 	def visit_procedure(self, procedure: Procedure):
-		print('visiting procedure')
+		# runs only when called
 		pass
 	
+	def visit_procedure_call(self, procedure_call: ProcedureCall):
+		symbol = procedure_call.procedure_symbol
+		procedure = symbol.procedure_node
+		args = [self.visit(node=arg) for arg in procedure_call.args]
+		memo = None
+		if self.memoize and procedure.pure:
+			memo = self.memos.get(symbol)
+			if memo is None: memo = self.memos[symbol] = MemoTable(size=self.memo_size)
+			# 1 and 1.0 are equal keys but may not behave alike, so the types are part of the key
+			key = (*args, *map(type, args))
+			if memo.lookup(key=key): return
+		pool = self.pools.get(symbol)
+		if pool is None: pool = self.pools[symbol] = self.pool_class(size=len(procedure.symbol_table.slots))
+		level = procedure.symbol_table.scope_level
+		# the callee is declared in a scope enclosing the caller, its static link is that scope's record
+		static_link = self.record
+		for _ in range(self.level - level + 1): static_link = static_link[0]
+		record = pool.acquire(static_link=static_link)
+		# params are the first symbols of a procedure's scope
+		record[1:len(args) + 1] = args
+		caller_record, caller_level = self.record, self.level
+		self.record, self.level = record, level
+		try:
+			self.visit(node=procedure.block_node)
+		finally:
+			self.record, self.level = caller_record, caller_level
+			pool.release(record=record)
+		if memo is not None: memo.add(key=key)
+	
 	def visit_compound(self, compound: Compound):
 		for node in compound.children:
 			self.visit(node=node)
 	
 	def visit_assignment_statement(self, assignment_statement: AssignmentStatement):
-		variable_name = assignment_statement.variable.token.value
+		variable = assignment_statement.variable
 		variable_val = self.visit(node=assignment_statement.expr)
-		self.state[variable_name] = variable_val
+		record = self.record
+		hops = self.level - variable.scope_level
+		while hops:
+			record = record[0]
+			hops -= 1
+		record[variable.slot + 1] = variable_val
 	
 	def visit_bin_op(self, bin_op_node: BinOp) -> int:
 		match bin_op_node.op.token_type:
@@ -78,10 +204,44 @@ class Interpreter(NodeVisitor):
 			case TokenType.INT_DIVIDE:
 				return self.visit(bin_op_node.left) // self.visit(bin_op_node.right)
 	
+	# the analyzer's typed nodes, one operation each and no operator match
+	
+	def visit_int_add(self, int_add: IntAdd) -> int:
+		return self.visit(int_add.left) + self.visit(int_add.right)
+	
+	def visit_int_subtract(self, int_subtract: IntSubtract) -> int:
+		return self.visit(int_subtract.left) - self.visit(int_subtract.right)
+	
+	def visit_int_multiply(self, int_multiply: IntMultiply) -> int:
+		return self.visit(int_multiply.left) * self.visit(int_multiply.right)
+	
+	def visit_int_divide(self, int_divide: IntDivide) -> int:
+		return self.visit(int_divide.left) // self.visit(int_divide.right)
+	
+	def visit_real_add(self, real_add: RealAdd) -> float:
+		return self.visit(real_add.left) + self.visit(real_add.right)
+	
+	def visit_real_subtract(self, real_subtract: RealSubtract) -> float:
+		return self.visit(real_subtract.left) - self.visit(real_subtract.right)
+	
+	def visit_real_multiply(self, real_multiply: RealMultiply) -> float:
+		return self.visit(real_multiply.left) * self.visit(real_multiply.right)
+	
+	def visit_real_divide(self, real_divide: RealDivide) -> float:
+		# integer operands divide exactly before rounding, as they would not through float()
+		return self.visit(real_divide.left) / self.visit(real_divide.right)
+	
+	def visit_to_real(self, to_real: ToReal) -> float:
+		return float(self.visit(to_real.expr))
+	
 	def visit_variable(self, variable: Variable) -> int:
-		var_name = variable.token.value
-		val = self.state.get(var_name)
-		if not val: raise NameError(var_name)
+		record = self.record
+		hops = self.level - variable.scope_level
+		while hops:
+			record = record[0]
+			hops -= 1
+		val = record[variable.slot + 1]
+		if val is None: raise NameError(variable.token.value)
 		return val
 	
 	def visit_unary(self, unary: Unary) -> int:
@@ -95,3 +255,16 @@ class Interpreter(NodeVisitor):
 	
 	def visit_noop(self, noop: NoOp):
 		print(noop.node_type)
+
+
+def calls_procedures(program_node: Program) -> bool:
+	"""
+	whether running the program calls any procedure. calls are statements, so only the compounds of
+	the main block need searching
+	"""
+	statements: list[Node] = [program_node.block_node.compound]
+	while statements:
+		statement = statements.pop()
+		if isinstance(statement, ProcedureCall): return True
+		if isinstance(statement, Compound): statements.extend(statement.children)
+	return False
@@ -1,4 +1,12 @@
+import array
+import codecs
+import collections
+import concurrent.futures
 import enum
+import os
+import re
+import sys
+from typing import BinaryIO, Iterator, TextIO
 
 
 class TokenType(enum.Enum):
@@ -44,109 +52,353 @@ class Token:
 		return self.__str__()
 
 
+KEYWORDS: dict[str, TokenType] = {
+	'program': TokenType.PROGRAM,
+	'procedure': TokenType.PROCEDURE,
+	'var': TokenType.VAR,
+	'integer': TokenType.INTEGER_TYPE,
+	'real': TokenType.REAL_TYPE,
+	'begin': TokenType.BEGIN,
+	'end': TokenType.END,
+	'div': TokenType.INT_DIVIDE,
+}
+
+SYMBOLS: dict[str, TokenType] = {
+	':=': TokenType.ASSIGNMENT,
+	':': TokenType.COLON,
+	'.': TokenType.DOT,
+	';': TokenType.SEMI,
+	',': TokenType.COMMA,
+	'+': TokenType.ADD,
+	'-': TokenType.SUBTRACT,
+	'*': TokenType.MULTIPLY,
+	'/': TokenType.DIVIDE,
+	'(': TokenType.LPAREN,
+	')': TokenType.RPAREN,
+}
+
+# skips any run of whitespace and {...} comments, then matches at most one token: a word, a number
+# or a symbol. when group 1 does not match the lexer is either at EOF or at a bad character.
+TOKEN_PATTERN = re.compile(r"""
+	(?:\s+|\{[^}]*\}?)*
+	([^\W\d_][^\W_]*|\d+(?:\.\d*)?|:=|[:.;,+\-*/()])?
+""", re.VERBOSE)
+
+
+def classify(lexeme: str) -> tuple[TokenType, int | float | str]:
+	"""
+	token type and value of a lexeme TOKEN_PATTERN matched
+	"""
+	if lexeme[0].isdigit():
+		if '.' in lexeme: return TokenType.REAL_CONST, float(lexeme)
+		return TokenType.INTEGER_CONST, int(lexeme)
+	token_type = SYMBOLS.get(lexeme) or KEYWORDS.get(lexeme.lower())
+	if token_type is not None: return token_type, 0
+	# identifiers are interned once here so every later symbol table hit compares by identity
+	return TokenType.ID, sys.intern(lexeme)
+
+
+def scan(text: str, pos: int, end_pos: int) -> tuple[TokenType, int | float | str, int, int]:
+	"""
+	scans one token of text[:end_pos] starting at pos, returns (token_type, value, start, end)
+	"""
+	match = TOKEN_PATTERN.match(text, pos, end_pos)
+	start, end = match.span(1)
+	if start < 0:
+		end = match.end()
+		if end >= end_pos: return TokenType.EOF, 0, end, end
+		raise SyntaxError(f"unhandled character in lexer: {text[end]}")
+	return *classify(text[start:end]), start, end
+
+
 class Lexer:
-	def __init__(self, text: str):
+	def __init__(self, text: str, pos: int = 0, end_pos: int | None = None):
 		self.text = text
-		self.pos = 0
-		self.pos_before_peak = 0
+		self.pos = pos
+		self.end_pos = len(text) if end_pos is None else end_pos
+		self.lookahead: collections.deque[tuple[Token, int, int]] = collections.deque()
+		self.peak_depth = 0
+		# source span of the token last returned by next_token
+		self.token_start = pos
+		self.token_end = pos
+		# start of the token scan_token last scanned, it ends at pos
+		self.scan_start = pos
+		self.match = TOKEN_PATTERN.match
+		# tokens are never mutated, so one per distinct lexeme serves every occurrence
+		self.lexemes: dict[str, Token] = dict(LEXEME_TOKENS)
 	
 	def rewind(self):
-		self.pos = self.pos_before_peak
+		self.peak_depth = 0
 	
 	def pos_valid(self):
-		return self.pos < len(self.text)
+		return self.pos < self.end_pos
 	
 	def peak(self) -> Token:
-		return self._next_token()
+		token = self.peak_at(depth=self.peak_depth)
+		self.peak_depth += 1
+		return token
+	
+	def peak_at(self, depth: int) -> Token:
+		while len(self.lookahead) <= depth:
+			self.lookahead.append(self._next_token())
+		return self.lookahead[depth][0]
 	
 	def next_token(self) -> Token:
-		self.pos = self.pos_before_peak
-		token = self._next_token()
-		self.pos_before_peak = self.pos
+		self.peak_depth = 0
+		if self.lookahead:
+			token, self.token_start, self.token_end = self.lookahead.popleft()
+			return token
+		token = self.scan_token()
+		self.token_start = self.scan_start
+		self.token_end = self.pos
+		return token
+	
+	def _next_token(self) -> tuple[Token, int, int]:
+		token = self.scan_token()
+		return token, self.scan_start, self.pos
+	
+	def scan_token(self) -> Token:
+		"""
+		scans the token at pos and moves pos past it
+		"""
+		match = self.match(self.text, self.pos, self.end_pos)
+		start, end = match.span(1)
+		if start < 0:
+			end = match.end()
+			if end < self.end_pos: raise SyntaxError(f"unhandled character in lexer: {self.text[end]}")
+			self.scan_start = self.pos = end
+			return EOF_TOKEN
+		self.scan_start = start
+		self.pos = end
+		lexeme = self.text[start:end]
+		token = self.lexemes.get(lexeme)
+		if token is None:
+			token_type, value = classify(lexeme)
+			token = self.lexemes[lexeme] = Token(token_type=token_type, value=value)
+		return token
+
+
+STREAM_CHUNK_SIZE = 1 << 16
+
+
+def scan_stream(
+		source: TextIO | BinaryIO,
+		chunk_size: int = STREAM_CHUNK_SIZE
+) -> Iterator[tuple[TokenType, int | float | str, int, int]]:
+	"""
+	yields (token_type, value, start, end) like scan() while reading source chunk by chunk.
+	source is anything with read(): a text file, a binary file or an mmap, bytes are decoded as utf-8.
+	the window holds one chunk plus the unconsumed tail, so memory stays bounded by the chunk size
+	and the longest single token or comment. EOF is yielded forever once the source is exhausted
+	"""
+	decoder = codecs.getincrementaldecoder('utf-8')()
+	buffer = ''
+	base = 0
+	pos = 0
+	exhausted = False
+	while True:
+		token_type, value, start, end = scan(buffer, pos, len(buffer))
+		if end == len(buffer) and not exhausted:
+			# the token, whitespace or comment may continue in the next chunk, rescan with more text
+			chunk = source.read(chunk_size)
+			exhausted = not chunk
+			if isinstance(chunk, bytes): chunk = decoder.decode(chunk, final=exhausted)
+			buffer = buffer[pos:] + chunk
+			base += pos
+			pos = 0
+			continue
+		pos = end
+		yield token_type, value, base + start, base + end
+
+
+class StreamLexer(Lexer):
+	"""
+	Lexer over a file object or mmap instead of a str, see scan_stream
+	"""
+	
+	def __init__(self, source: TextIO | BinaryIO, chunk_size: int = STREAM_CHUNK_SIZE):
+		super().__init__(text='')
+		self.tokens = scan_stream(source=source, chunk_size=chunk_size)
+	
+	def scan_token(self) -> Token:
+		token_type, value, self.scan_start, self.pos = next(self.tokens)
+		return Token(token_type=token_type, value=value)
+
+
+TOKEN_TYPES: list[TokenType] = list(TokenType)
+TOKEN_CODES: dict[TokenType, int] = {t: code for code, t in enumerate(TOKEN_TYPES)}
+ID_CODE = TOKEN_CODES[TokenType.ID]
+# keyword and symbol tokens carry no value, so one immutable instance per type is shared
+SHARED_TOKENS: dict[TokenType, Token] = {t: Token(token_type=t, value=0) for t in TOKEN_TYPES}
+EOF_TOKEN = SHARED_TOKENS[TokenType.EOF]
+# the lexemes every Lexer starts out knowing, keywords in lower case
+LEXEME_TOKENS: dict[str, Token] = {
+	lexeme: SHARED_TOKENS[token_type] for lexeme, token_type in (*KEYWORDS.items(), *SYMBOLS.items())
+}
+
+
+class TokenStream:
+	"""
+	struct-of-arrays token list: type code, start offset and length per token,
+	literal values in a side table and identifier text sliced from the source on demand
+	"""
+	
+	def __init__(self, text: str):
+		self.text = text
+		self.types = array.array('B')
+		self.starts = array.array('q')
+		self.lengths = array.array('I')
+		self.values: dict[int, int | float] = {}
+	
+	def __len__(self):
+		return len(self.types)
+	
+	def append(self, token_type: TokenType, value: int | float | str, start: int, end: int):
+		if token_type == TokenType.INTEGER_CONST or token_type == TokenType.REAL_CONST:
+			self.values[len(self.types)] = value
+		self.types.append(TOKEN_CODES[token_type])
+		self.starts.append(start)
+		self.lengths.append(end - start)
+	
+	def token_type(self, index: int) -> TokenType:
+		return TOKEN_TYPES[self.types[index]]
+	
+	def value(self, index: int) -> int | float | str:
+		if index in self.values: return self.values[index]
+		if self.types[index] == ID_CODE:
+			start = self.starts[index]
+			return sys.intern(self.text[start:start + self.lengths[index]])
+		return 0
+	
+	def token(self, index: int) -> Token:
+		token_type = TOKEN_TYPES[self.types[index]]
+		if token_type == TokenType.ID or index in self.values:
+			return Token(token_type=token_type, value=self.value(index))
+		return SHARED_TOKENS[token_type]
+	
+	def cursor(self) -> 'TokenCursor':
+		return TokenCursor(stream=self)
+
+
+class TokenCursor:
+	"""
+	Lexer-compatible reader over a TokenStream, so a parser can re-parse without re-lexing
+	"""
+	
+	def __init__(self, stream: TokenStream):
+		self.stream = stream
+		self.index = 0
+		self.last = len(stream) - 1
+		self.peak_depth = 0
+		self.token_start = 0
+		self.token_end = 0
+	
+	def rewind(self):
+		self.peak_depth = 0
+	
+	def peak(self) -> Token:
+		token = self.peak_at(depth=self.peak_depth)
+		self.peak_depth += 1
 		return token
 	
-	def _next_token(self) -> Token:
-		if not self.pos_valid(): return Token(token_type=TokenType.EOF, value=0)
-		c = self.text[self.pos]
-		if c.isalpha():
-			word = ''
-			while self.pos_valid() and (self.text[self.pos].isalpha() or self.text[self.pos].isdigit()):
-				word += self.text[self.pos]
-				self.pos += 1
-			if word.lower() == 'begin':
-				return Token(token_type=TokenType.BEGIN, value=0)
-			if word.lower() == 'end':
-				return Token(token_type=TokenType.END, value=0)
-			if word.lower() == 'program':
-				return Token(token_type=TokenType.PROGRAM, value=0)
-			if word.lower() == 'var':
-				return Token(token_type=TokenType.VAR, value=0)
-			if word.lower() == 'integer':
-				return Token(token_type=TokenType.INTEGER_TYPE, value=0)
-			if word.lower() == 'real':
-				return Token(token_type=TokenType.REAL_TYPE, value=0)
-			if word.lower() == 'div':
-				return Token(token_type=TokenType.INT_DIVIDE, value=0)
-			if word.lower() == 'procedure':
-				return Token(token_type=TokenType.PROCEDURE, value=0)
-			return Token(token_type=TokenType.ID, value=word)
-		if c.isdigit():
-			num = ''
-			is_float = False
-			while self.pos_valid() and self.text[self.pos].isdigit():
-				num += self.text[self.pos]
-				self.pos += 1
-			if self.text[self.pos] == '.':
-				is_float = True
-				num += self.text[self.pos]
-				self.pos += 1
-			while self.pos_valid() and self.text[self.pos].isdigit():
-				num += self.text[self.pos]
-				self.pos += 1
-			if is_float:
-				return Token(token_type=TokenType.REAL_CONST, value=float(num))
-			else:
-				return Token(token_type=TokenType.INTEGER_CONST, value=int(num))
-		if c == ':' and self.text[self.pos + 1] == '=':
-			self.pos += 2
-			return Token(token_type=TokenType.ASSIGNMENT, value=0)
-		if c == ':':
-			self.pos += 1
-			return Token(token_type=TokenType.COLON, value=0)
-		if c == '.':
-			self.pos += 1
-			return Token(token_type=TokenType.DOT, value=0)
-		if c == ';':
-			self.pos += 1
-			return Token(token_type=TokenType.SEMI, value=0)
-		if c == ',':
-			self.pos += 1
-			return Token(token_type=TokenType.COMMA, value=0)
-		if c == '+':
-			self.pos += 1
-			return Token(token_type=TokenType.ADD, value=0)
-		if c == '-':
-			self.pos += 1
-			return Token(token_type=TokenType.SUBTRACT, value=0)
-		if c == '*':
-			self.pos += 1
-			return Token(token_type=TokenType.MULTIPLY, value=0)
-		if c == '/':
-			self.pos += 1
-			return Token(token_type=TokenType.DIVIDE, value=0)
-		if c == '(':
-			self.pos += 1
-			return Token(token_type=TokenType.LPAREN, value=0)
-		if c == ')':
-			self.pos += 1
-			return Token(token_type=TokenType.RPAREN, value=0)
-		if c == '{':
-			self.pos += 1
-			while self.pos_valid() and self.text[self.pos] != '}': self.pos += 1
-			self.pos += 1
-			return self._next_token()
-		if c.isspace():
-			while self.pos_valid() and self.text[self.pos].isspace(): self.pos += 1
-			return self._next_token()
-		
-		raise SyntaxError(f"unhandled character in lexer: {c}")
+	def peak_at(self, depth: int) -> Token:
+		return self.stream.token(min(self.index + depth, self.last))
+	
+	def next_token(self) -> Token:
+		self.peak_depth = 0
+		index = self.index
+		token = self.stream.token(index)
+		self.token_start = self.stream.starts[index]
+		self.token_end = self.token_start + self.stream.lengths[index]
+		if index < self.last: self.index += 1
+		return token
+
+
+def tokenize(text: str) -> TokenStream:
+	stream = TokenStream(text=text)
+	match = TOKEN_PATTERN.match
+	end_pos = len(text)
+	types, starts, lengths, values = stream.types, stream.starts, stream.lengths, stream.values
+	# lexeme -> type code and literal value, None for the tokens the stream keeps no value for
+	lexemes: dict[str, tuple[int, int | float | None]] = {}
+	pos = 0
+	while True:
+		token = match(text, pos, end_pos)
+		start, pos = token.span(1)
+		if start < 0:
+			pos = token.end()
+			if pos < end_pos: raise SyntaxError(f"unhandled character in lexer: {text[pos]}")
+			stream.append(TokenType.EOF, 0, pos, pos)
+			return stream
+		lexeme = text[start:pos]
+		known = lexemes.get(lexeme)
+		if known is None:
+			token_type, value = classify(lexeme)
+			literal = token_type == TokenType.INTEGER_CONST or token_type == TokenType.REAL_CONST
+			known = lexemes[lexeme] = TOKEN_CODES[token_type], value if literal else None
+		code, value = known
+		if value is not None: values[len(types)] = value
+		types.append(code)
+		starts.append(start)
+		lengths.append(pos - start)
+
+
+PARALLEL_THRESHOLD = 1 << 20
+WHITESPACE_PATTERN = re.compile(r'\s')
+
+
+def split_points(text: str, chunk_count: int) -> list[int]:
+	"""
+	offsets that cut text into roughly equal chunks, each one on whitespace outside a
+	{...} comment so no token or comment straddles two chunks
+	"""
+	points = [0]
+	target_size = len(text) // chunk_count
+	for n in range(1, chunk_count):
+		pos = max(points[-1] + 1, n * target_size)
+		while pos < len(text):
+			match = WHITESPACE_PATTERN.search(text, pos)
+			if match is None:
+				pos = len(text)
+				break
+			pos = match.start()
+			comment_start = text.rfind('{', points[-1], pos)
+			if comment_start == -1 or comment_start < text.rfind('}', points[-1], pos): break
+			comment_end = text.find('}', pos)
+			pos = len(text) if comment_end == -1 else comment_end + 1
+		if pos >= len(text): break
+		points.append(pos)
+	points.append(len(text))
+	return points
+
+
+def _tokenize_chunk(chunk: str) -> tuple[array.array, array.array, array.array, dict[int, int | float]]:
+	stream = tokenize(chunk)
+	return stream.types, stream.starts, stream.lengths, stream.values
+
+
+def tokenize_parallel(text: str, workers: int | None = None, threshold: int = PARALLEL_THRESHOLD) -> TokenStream:
+	"""
+	same result as tokenize(text), with the lexing of large sources spread over a process pool
+	"""
+	workers = workers or os.cpu_count() or 1
+	if len(text) < threshold or workers < 2: return tokenize(text)
+	points = split_points(text, chunk_count=workers)
+	chunks = [text[start:end] for start, end in zip(points, points[1:])]
+	stream = TokenStream(text=text)
+	try:
+		with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+			results = list(executor.map(_tokenize_chunk, chunks))
+	except SyntaxError:
+		# re-lex serially so the error is reported exactly as the serial lexer reports it
+		return tokenize(text)
+	for offset, (types, starts, lengths, values) in zip(points, results):
+		base = len(stream.types)
+		# every chunk ends with its own EOF token, only the last one is kept
+		count = len(types) - 1
+		stream.types.extend(types[:count])
+		stream.starts.extend(start + offset for start in starts[:count])
+		stream.lengths.extend(lengths[:count])
+		stream.values.update((base + index, value) for index, value in values.items())
+	stream.append(TokenType.EOF, 0, len(text), len(text))
+	return stream
@@ -1,30 +1,102 @@
-import sys
+import argparse
+import mmap
+import os
 import traceback
+from lexer import StreamLexer
 from parser import Parser
 from semantic_analyzer  import SemanticAnalyzer
 from interpreter import Interpreter
+from closure_compiler import ClosureInterpreter
+from python_compiler import PythonInterpreter
+from register_vm import RegisterInterpreter
+from optimizer import ConstantFolder
+from program_cache import ProgramCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_SIZE
+from profiler import Profiler
+from syntax_tree import NodeVisitor
+
+STREAM_THRESHOLD = 64 * 1024 * 1024
+
+ENGINES = {
+	'tree': Interpreter,
+	'closure': ClosureInterpreter,
+	'python': PythonInterpreter,
+	'register': RegisterInterpreter,
+}
 
 
 def main():
+	arg_parser = argparse.ArgumentParser()
+	arg_parser.add_argument('filename', nargs='?')
+	arg_parser.add_argument('--engine', choices=ENGINES, default='tree')
+	arg_parser.add_argument('--no-optimize', action='store_true', help='skip constant folding')
+	arg_parser.add_argument('--no-cache', action='store_true', help='neither read nor write the program cache')
+	arg_parser.add_argument('--clear-cache', action='store_true', help='empty the program cache first')
+	arg_parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+	arg_parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_SIZE, help='cache size limit in bytes')
+	arg_parser.add_argument(
+		'--stream-threshold', type=int, default=STREAM_THRESHOLD,
+		help='files larger than this many bytes are lexed from a memory map instead of being read whole'
+	)
+	arg_parser.add_argument(
+		'--profile', action='store_true',
+		help='report visits and time per node type and procedure for analysis and the tree engine'
+	)
+	arg_parser.add_argument(
+		'--no-memo', action='store_true',
+		help='run every call of a pure procedure instead of skipping repeats with the same arguments'
+	)
+	arg_parser.add_argument('--profile-stacks', help='write collapsed stacks for flame graphs to this file')
+	args = arg_parser.parse_args()
+	cache = ProgramCache(cache_dir=args.cache_dir, max_size=args.cache_size)
+	if args.clear_cache: cache.clear()
+	if args.filename is None:
+		if not args.clear_cache: arg_parser.error('filename is required')
+		return
 	try:
-		filename = sys.argv[1]
-		fp = open(filename)
-		text = fp.read()
-		fp.close()
+		profiler = Profiler() if args.profile or args.profile_stacks else None
+		i = ENGINES[args.engine]()
+		if args.no_memo and isinstance(i, Interpreter): i.memoize = False
+		if isinstance(i, NodeVisitor): i.profile(profiler=profiler)
 		
-		p = Parser(text=text)
-		i = Interpreter()
-		s = SemanticAnalyzer()
-		
-		program_node = p.parse()
-		s.analyze(program_node=program_node)
-		print('passed symantic analysis')
-		exit()
+		if os.path.getsize(args.filename) > args.stream_threshold:
+			# too big to hold as one str: lex straight off a memory map, the cache is bypassed
+			with open(args.filename, 'rb') as fp, mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as source:
+				p = Parser(text='', tokens=StreamLexer(source=source))
+				program_node = p.parse()
+			s = SemanticAnalyzer()
+			s.profile(profiler=profiler)
+			s.analyze(program_node=program_node)
+			print('passed symantic analysis')
+		else:
+			fp = open(args.filename)
+			text = fp.read()
+			fp.close()
+			
+			program_node = None if args.no_cache else cache.load(text=text)
+			if program_node is None:
+				p = Parser(text=text)
+				s = SemanticAnalyzer()
+				s.profile(profiler=profiler)
+				program_node = p.parse()
+				s.analyze(program_node=program_node)
+				print('passed symantic analysis')
+				if not args.no_cache: cache.store(text=text, program_node=program_node)
+		if not args.no_optimize:
+			removed = ConstantFolder().optimize(program_node=program_node)
+			print(f'constant folding removed {removed} nodes')
 		i.interpret(program_node=program_node)
+		if args.profile:
+			print(profiler.format_report())
+			for symbol, memo in getattr(i, 'memos', {}).items():
+				print(f'memo {symbol.name}: {memo.hits} hits, {memo.misses} misses, {len(memo.entries)} kept')
+		if args.profile_stacks:
+			with open(args.profile_stacks, 'w') as fp:
+				fp.write(profiler.collapsed_stacks())
 	except Exception as e:
 		print(traceback.print_exc())
 		print(f"error: {type(e).__name__} {str(e)}")
 		exit()
 
 
-main()
+if __name__ == '__main__':
+	main()
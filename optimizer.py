@@ -0,0 +1,139 @@
+from lexer import Token, TokenType
+
+from syntax_tree import (
+	Node,
+	NodeVisitor,
+	Program,
+	Block,
+	VariableDeclaration,
+	Procedure,
+	Variable,
+	Compound,
+	ProcedureCall,
+	AssignmentStatement,
+	BinOp,
+	Num,
+	Unary,
+	ToReal,
+	NoOp
+)
+
+from symbols import BuiltinTypeSymbol
+
+FOLDABLE_OPERATIONS = {
+	TokenType.ADD: lambda left, right: left + right,
+	TokenType.SUBTRACT: lambda left, right: left - right,
+	TokenType.MULTIPLY: lambda left, right: left * right,
+	TokenType.DIVIDE: lambda left, right: left / right,
+	TokenType.INT_DIVIDE: lambda left, right: left // right,
+}
+
+
+def is_integer_constant(node: Node, value: int) -> bool:
+	return isinstance(node, Num) and type(node.value) is int and node.value == value
+
+
+def make_num(value: int | float, type_symbol: BuiltinTypeSymbol | None) -> Num:
+	token_type = TokenType.INTEGER_CONST if isinstance(value, int) else TokenType.REAL_CONST
+	num = Num(token=Token(token_type=token_type, value=value))
+	num.type_symbol = type_symbol
+	return num
+
+
+class ConstantFolder(NodeVisitor):
+	"""
+	folds BinOp/Unary subtrees of Num nodes into a single Num and applies identities that hold
+	for integers and reals alike (x * 1, 1 * x, x - 0, +x, - -x). folding computes with the same
+	python operators as the interpreter, so integer/real results and div vs / match execution.
+	divisions by zero and overflows are left in place to fail at runtime.
+	"""
+	
+	def __init__(self):
+		self.removed = 0
+	
+	def optimize(self, program_node: Program) -> int:
+		"""
+		rewrites program_node in place, returns the number of nodes removed
+		"""
+		self.visit(node=program_node)
+		return self.removed
+	
+	def visit_program(self, program: Program):
+		self.visit(node=program.block_node)
+	
+	def visit_block(self, block: Block):
+		for node in block.declarations:
+			self.visit(node=node)
+		self.visit(node=block.compound)
+	
+	def visit_variable_declaration(self, variable_declaration: VariableDeclaration):
+		pass
+	
+	def visit_procedure(self, procedure: Procedure):
+		self.visit(node=procedure.block_node)
+	
+	def visit_compound(self, compound: Compound):
+		for node in compound.children:
+			self.visit(node=node)
+	
+	def visit_procedure_call(self, procedure_call: ProcedureCall):
+		procedure_call.args = [self.visit(node=arg) for arg in procedure_call.args]
+	
+	def visit_assignment_statement(self, assignment_statement: AssignmentStatement):
+		assignment_statement.expr = self.visit(node=assignment_statement.expr)
+	
+	def visit_bin_op(self, bin_op_node: BinOp) -> Node:
+		left = bin_op_node.left = self.visit(node=bin_op_node.left)
+		right = bin_op_node.right = self.visit(node=bin_op_node.right)
+		op = bin_op_node.op.token_type
+		if isinstance(left, Num) and isinstance(right, Num):
+			try:
+				value = FOLDABLE_OPERATIONS[op](left.value, right.value)
+			except ArithmeticError:
+				return bin_op_node
+			self.removed += 2
+			return make_num(value=value, type_symbol=bin_op_node.type_symbol)
+		if op == TokenType.MULTIPLY and is_integer_constant(node=right, value=1):
+			self.removed += 2
+			return left
+		if op == TokenType.MULTIPLY and is_integer_constant(node=left, value=1):
+			self.removed += 2
+			return right
+		if op == TokenType.SUBTRACT and is_integer_constant(node=right, value=0):
+			self.removed += 2
+			return left
+		return bin_op_node
+	
+	def visit_variable(self, variable: Variable) -> Node:
+		return variable
+	
+	def visit_unary(self, unary: Unary) -> Node:
+		expr = unary.expr = self.visit(node=unary.expr)
+		if unary.token.token_type == TokenType.ADD:
+			self.removed += 1
+			return expr
+		if isinstance(expr, Num):
+			self.removed += 1
+			return make_num(value=-expr.value, type_symbol=expr.type_symbol)
+		if type(expr) is Unary:
+			# inner plus signs are already gone, so this is - -x. a ToReal is a unary plus that converts
+			# and must stay
+			self.removed += 2
+			return expr.expr
+		return unary
+	
+	def visit_to_real(self, to_real: ToReal) -> Node:
+		expr = to_real.expr = self.visit(node=to_real.expr)
+		if not isinstance(expr, Num): return to_real
+		try:
+			value = float(expr.value)
+		except OverflowError:
+			return to_real
+		self.removed += 1
+		return make_num(value=value, type_symbol=to_real.type_symbol)
+	
+	def visit_num(self, num: Num) -> Node:
+		return num
+	
+	def visit_noop(self, noop: NoOp):
+		pass
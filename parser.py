@@ -1,11 +1,16 @@
 from lexer import (
 	Token,
 	Lexer,
-	TokenType
+	TokenType,
+	TokenStream,
+	TokenCursor
 )
 
+from arena import Arena
+
 from syntax_tree import (
 	Node,
+	NodeBuilder,
 	Program,
 	Procedure,
 	Param,
@@ -14,19 +19,54 @@ from syntax_tree import (
 	Variable,
 	Type,
 	Compound,
-	AssignmentStatement,
-	BinOp,
-	Unary,
-	Num,
-	NoOp,
+	ProcedureCall,
 )
 
+BINARY_PRECEDENCE: dict[TokenType, int] = {
+	TokenType.ADD: 1,
+	TokenType.SUBTRACT: 1,
+	TokenType.MULTIPLY: 2,
+	TokenType.DIVIDE: 2,
+	TokenType.INT_DIVIDE: 2,
+}
+UNARY_OPERATORS = {TokenType.ADD, TokenType.SUBTRACT}
+OPERAND_TYPES = {TokenType.INTEGER_CONST, TokenType.REAL_CONST, TokenType.ID}
+
+
+def reduce(nodes: NodeBuilder, operands: list[Node | None], operators: list[Token], precedence: int):
+	"""
+	folds pending operators binding at least as tightly as precedence into BinOps, left to right
+	"""
+	while operators and BINARY_PRECEDENCE[operators[-1].token_type] >= precedence:
+		right = operands.pop()
+		left = operands.pop()
+		operands.append(nodes.bin_op(left=left, op=operators.pop(), right=right))
+
 
 class Parser:
-	def __init__(self, text: str):
+	def __init__(
+			self,
+			text: str,
+			tokens: TokenStream | Lexer | None = None,
+			start: int = 0,
+			end: int | None = None,
+			arena: Arena | None = None):
+		"""
+		tokens replaces lexing text: a TokenStream to re-parse, or a ready lexer such as a StreamLexer.
+		start and end limit parsing to text[start:end], source spans stay absolute offsets into text.
+		with an arena the parser appends nodes to it and returns int handles instead of node objects
+		"""
 		self.text: str = text
-		self.lexer: Lexer = Lexer(text=text)
+		self.nodes: NodeBuilder = NodeBuilder() if arena is None else arena
+		if tokens is None:
+			self.lexer: Lexer | TokenCursor = Lexer(text=text, pos=start, end_pos=end)
+		elif isinstance(tokens, TokenStream):
+			self.lexer = tokens.cursor()
+		else:
+			self.lexer = tokens
 		self.ct: Token = self.lexer.next_token()
+		# end offset of the token eat() consumed last
+		self.last_end: int = start
 	
 	def parse(self) -> Program:
 		return self.prog()
@@ -40,7 +80,7 @@ class Parser:
 		self.eat(self.ct, token_types=[TokenType.ID])
 		self.eat(self.ct, token_types=[TokenType.SEMI])
 		block_node = self.block()
-		program_node = Program(name=program_name, block_node=block_node)
+		program_node = self.nodes.program(name=program_name, block_node=block_node)
 		self.eat(self.ct, token_types=[TokenType.DOT])
 		return program_node
 	
@@ -53,16 +93,16 @@ class Parser:
 			self.eat(self.ct, token_types=[TokenType.VAR])
 			declarations = self.block_declarations()
 			compound_node = self.compound_statement()
-			return Block(declarations=declarations, compound_node=compound_node)
+			return self.nodes.block(declarations=declarations, compound_node=compound_node)
 		else:
 			compound_node = self.compound_statement()
-			return Block(declarations=[], compound_node=compound_node)
+			return self.nodes.block(declarations=[], compound_node=compound_node)
 	
 	def block_declarations(self) -> list[VariableDeclaration | Procedure]:
 		declarations: list[VariableDeclaration | Procedure] = []
 		var_type_list = self.variable_type_list()
 		for tup in var_type_list:
-			declarations.append(VariableDeclaration(
+			declarations.append(self.nodes.variable_declaration(
 				var_node=tup[0], type_node=tup[1]))
 		while self.ct.token_type == TokenType.PROCEDURE:
 			declarations.append(self.procedure())
@@ -78,7 +118,7 @@ class Parser:
 				if self.ct.token_type == TokenType.COMMA:
 					self.eat(self.ct, token_types=[TokenType.COMMA])
 			self.eat(self.ct, token_types=[TokenType.COLON])
-			type_node = Type(token=self.ct)
+			type_node = self.nodes.type(token=self.ct)
 			self.eat(self.ct, token_types=[TokenType.INTEGER_TYPE, TokenType.REAL_TYPE])
 			for var_node in variables:
 				var_type_list.append((var_node, type_node))
@@ -87,6 +127,7 @@ class Parser:
 		return var_type_list
 	
 	def procedure(self) -> Procedure:
+		start = self.lexer.token_start
 		self.eat(self.ct, token_types=[TokenType.PROCEDURE])
 		procedure_name = self.ct.value
 		self.eat(self.ct, token_types=[TokenType.ID])
@@ -95,10 +136,12 @@ class Parser:
 			params = self.params()
 		self.eat(self.ct, token_types=[TokenType.SEMI])
 		block_node = self.block()
-		return Procedure(
+		return self.nodes.procedure(
 			name=procedure_name,
 			params=params,
-			block_node=block_node
+			block_node=block_node,
+			start=start,
+			end=self.last_end
 		)
 	
 	def params(self) -> list[Param]:
@@ -107,19 +150,18 @@ class Parser:
 		variable_type_list = self.variable_type_list()
 		self.eat(self.ct, token_types=[TokenType.RPAREN])
 		for tup in variable_type_list:
-			params.append(Param(
+			params.append(self.nodes.param(
 				var_node=tup[0],
 				type_node=tup[1]
 			))
 		return params
 	
 	def compound_statement(self) -> Compound:
+		start = self.lexer.token_start
 		self.eat(self.ct, token_types=[TokenType.BEGIN])
 		nodes = self.statement_list()
 		self.eat(self.ct, token_types=[TokenType.END])
-		cp = Compound()
-		for node in nodes: cp.add_child(node)
-		return cp
+		return self.nodes.compound(children=nodes, start=start, end=self.last_end)
 	
 	def statement_list(self) -> list[Node]:
 		statements: list[Node] = [self.statement()]
@@ -129,17 +171,39 @@ class Parser:
 		return statements
 	
 	def statement(self) -> Node:
+		"""
+		statement: compound_statement | assignment_statement | procedure_call | empty
+		"""
 		if self.ct.token_type == TokenType.BEGIN:
 			return self.compound_statement()
 		if self.ct.token_type == TokenType.ID:
-			return self.assignment_statement()
+			if self.lexer.peak_at(depth=0).token_type == TokenType.ASSIGNMENT:
+				return self.assignment_statement()
+			return self.procedure_call()
 		return self.empty()
 	
+	def procedure_call(self) -> ProcedureCall:
+		"""
+		procedure_call: ID (LPAREN (expr (COMMA expr)*)? RPAREN)?
+		"""
+		token = self.ct
+		self.eat(token, [TokenType.ID])
+		args: list[Node] = []
+		if self.ct.token_type == TokenType.LPAREN:
+			self.eat(self.ct, [TokenType.LPAREN])
+			if self.ct.token_type != TokenType.RPAREN:
+				args.append(self.expr())
+				while self.ct.token_type == TokenType.COMMA:
+					self.eat(self.ct, [TokenType.COMMA])
+					args.append(self.expr())
+			self.eat(self.ct, [TokenType.RPAREN])
+		return self.nodes.procedure_call(name=token.value, args=args, token=token)
+	
 	def assignment_statement(self) -> Node:
 		variable: Variable = self.variable()
 		self.eat(self.ct, [TokenType.ASSIGNMENT])
 		expr_node = self.expr()
-		return AssignmentStatement(
+		return self.nodes.assignment_statement(
 			variable=variable,
 			expr=expr_node
 		)
@@ -147,68 +211,65 @@ class Parser:
 	def variable(self) -> Variable:
 		token = self.ct
 		self.eat(token, [TokenType.ID])
-		return Variable(token=token)
+		return self.nodes.variable(token=token)
 	
 	def empty(self) -> Node:
-		return NoOp()
+		return self.nodes.noop()
 	
 	def expr(self) -> Node:
-		return self.term()
-	
-	def term(self) -> Node:
-		node = self.factor()
-		while self.ct.token_type in {TokenType.ADD, TokenType.SUBTRACT}:
-			op = self.term_op()
-			node = BinOp(left=node, op=op, right=self.factor())
-		return node
-	
-	def factor(self) -> Node:
-		node = self.paren_expr()
-		while self.ct.token_type in {TokenType.MULTIPLY, TokenType.DIVIDE, TokenType.INT_DIVIDE}:
-			op = self.factor_op()
-			node = BinOp(left=node, op=op, right=self.paren_expr())
-		return node
-	
-	def paren_expr(self) -> Node:
-		if self.ct.token_type in {TokenType.ADD, TokenType.SUBTRACT}:
-			return self.unary()
-		if self.ct.token_type == TokenType.INTEGER_CONST:
-			return self.num()
-		if self.ct.token_type == TokenType.REAL_CONST:
-			return self.num()
-		if self.ct.token_type == TokenType.LPAREN:
-			self.left_paren()
-			result = self.expr()
-			self.right_paren()
-			return result
-		if self.ct.token_type == TokenType.ID:
-			return self.variable()
-	
-	def left_paren(self):
-		self.eat(self.ct, [TokenType.LPAREN])
-	
-	def right_paren(self):
-		self.eat(self.ct, [TokenType.RPAREN])
-	
-	def factor_op(self) -> Token:
-		op = self.ct
-		self.eat(op, [TokenType.MULTIPLY, TokenType.DIVIDE, TokenType.INT_DIVIDE])
-		return op
-	
-	def term_op(self) -> Token:
-		op = self.ct
-		self.eat(op, [TokenType.ADD, TokenType.SUBTRACT])
-		return op
-	
-	def num(self) -> Num:
-		n = self.ct
-		self.eat(n, [TokenType.INTEGER_CONST, TokenType.REAL_CONST])
-		return Num(token=n)
-	
-	def unary(self) -> Unary:
-		op = self.ct
-		self.eat(op, [TokenType.ADD, TokenType.SUBTRACT])
-		return Unary(token=op, expr=self.expr())
+		"""
+		expr: term ((ADD | SUBTRACT) term)*
+		term: operand ((MULTIPLY | DIVIDE | INT_DIVIDE) operand)*
+		operand: (ADD | SUBTRACT) expr | INTEGER_CONST | REAL_CONST | LPAREN expr RPAREN | ID | empty
+		
+		precedence climbing over an explicit stack of open contexts (the whole expression, a
+		parenthesis or a unary operator), so nesting depth is not limited by python's recursion.
+		a unary operator applies to the whole expr after it, up to the end of its enclosing context,
+		and a missing operand is None
+		"""
+		lexer = self.lexer
+		nodes = self.nodes
+		# (opening token or None, operands, pending operators) per open context, innermost last
+		contexts: list[tuple[Token | None, list[Node | None], list[Token]]] = [(None, [], [])]
+		while True:
+			token = self.ct
+			token_type = token.token_type
+			if token_type in UNARY_OPERATORS or token_type == TokenType.LPAREN:
+				self.last_end = lexer.token_end
+				self.ct = lexer.next_token()
+				contexts.append((token, [], []))
+				continue
+			if token_type in OPERAND_TYPES:
+				if token_type == TokenType.ID:
+					operand = nodes.variable(token=token)
+				else:
+					operand = nodes.num(token=token)
+				self.last_end = lexer.token_end
+				self.ct = lexer.next_token()
+			else:
+				operand = nodes.missing
+			contexts[-1][1].append(operand)
+			
+			while True:
+				token = self.ct
+				precedence = BINARY_PRECEDENCE.get(token.token_type)
+				opener, operands, operators = contexts[-1]
+				if precedence is not None:
+					reduce(nodes=nodes, operands=operands, operators=operators, precedence=precedence)
+					operators.append(token)
+					self.last_end = lexer.token_end
+					self.ct = lexer.next_token()
+					break
+				# no operator follows, so the innermost context ends here
+				reduce(nodes=nodes, operands=operands, operators=operators, precedence=0)
+				node = operands[0]
+				contexts.pop()
+				if opener is None: return node
+				if opener.token_type == TokenType.LPAREN:
+					self.eat(self.ct, [TokenType.RPAREN])
+				else:
+					node = nodes.unary(token=opener, expr=node)
+				contexts[-1][1].append(node)
 	
 	def eat(self, token: Token, token_types: list[TokenType]):
 		token_type_set = set(token_types)
@@ -217,4 +278,5 @@ class Parser:
 				f"bad token type {token.token_type}, "
 				f"expecting {token_types}"
 			)
+		self.last_end = self.lexer.token_end
 		self.ct = self.lexer.next_token()
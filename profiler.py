@@ -0,0 +1,115 @@
+import time
+from typing import Callable
+
+# frames attribute time to the innermost of these, anything outside them counts toward the program
+CONTEXT_NODE_TYPES = ('program', 'procedure')
+# a call runs its callee's body inside the call's visit, so it opens the callee's procedure context
+CALL_NODE_TYPES = ('procedure_call',)
+
+
+class NodeStats:
+	def __init__(self):
+		self.count = 0
+		# nanoseconds, self excludes time spent in child visits, total includes it
+		self.self_time = 0
+		self.total_time = 0
+	
+	def as_dict(self) -> dict:
+		return {'count': self.count, 'self': self.self_time / 1e9, 'total': self.total_time / 1e9}
+
+
+class Profiler:
+	"""
+	visit counts and self/total time per node type, per program or procedure and per call stack.
+	attach with NodeVisitor.profile(), which shadows visit on that one instance: visitors that are not
+	being profiled run the plain class visit and pay nothing. a node type visited recursively, such as
+	nested BinOps, only adds the outermost visit to its total so totals never exceed wall time
+	"""
+	
+	def __init__(self):
+		self.node_types: dict[str, NodeStats] = {}
+		self.contexts: dict[str, NodeStats] = {}
+		# collapsed stack 'program:main;block;compound' -> self nanoseconds
+		self.stacks: dict[str, int] = {}
+		# one [node type, path, start, child time, context, opens context] per visit in progress
+		self.frames: list[list] = []
+		# visits in progress per node type and per context, for counting recursive totals once
+		self.active: dict[str, int] = {}
+		self.active_contexts: dict[str, int] = {}
+	
+	def instrument(self, visitor) -> Callable:
+		visit = type(visitor).visit
+		
+		def profiled_visit(node):
+			self.enter(node=node)
+			try:
+				return visit(visitor, node)
+			finally:
+				self.exit()
+		
+		return profiled_visit
+	
+	def enter(self, node):
+		node_type = node.node_type
+		if node_type in CONTEXT_NODE_TYPES:
+			label = f'{node_type}:{node.name}'
+		elif node_type in CALL_NODE_TYPES:
+			label = f'procedure:{node.name}'
+		else:
+			label = node_type
+		opens_context = label != node_type or not self.frames
+		if self.frames:
+			parent = self.frames[-1]
+			path = f'{parent[1]};{label}'
+			context = label if opens_context else parent[4]
+		else:
+			path = context = label
+		self.active[node_type] = self.active.get(node_type, 0) + 1
+		if opens_context: self.active_contexts[context] = self.active_contexts.get(context, 0) + 1
+		self.frames.append([node_type, path, time.perf_counter_ns(), 0, context, opens_context])
+	
+	def exit(self):
+		end = time.perf_counter_ns()
+		node_type, path, start, child_time, context, opens_context = self.frames.pop()
+		elapsed = end - start
+		self_time = elapsed - child_time
+		if self.frames: self.frames[-1][3] += elapsed
+		self.active[node_type] -= 1
+		
+		stats = self.node_types.get(node_type) or self.node_types.setdefault(node_type, NodeStats())
+		stats.count += 1
+		stats.self_time += self_time
+		if not self.active[node_type]: stats.total_time += elapsed
+		
+		stats = self.contexts.get(context) or self.contexts.setdefault(context, NodeStats())
+		stats.count += 1
+		stats.self_time += self_time
+		if opens_context:
+			self.active_contexts[context] -= 1
+			if not self.active_contexts[context]: stats.total_time += elapsed
+		
+		self.stacks[path] = self.stacks.get(path, 0) + self_time
+	
+	def report(self) -> dict:
+		"""
+		times in seconds, node types and procedures sorted by self time, highest first
+		"""
+		def ranked(table: dict[str, NodeStats]) -> dict:
+			items = sorted(table.items(), key=lambda item: item[1].self_time, reverse=True)
+			return {name: stats.as_dict() for name, stats in items}
+		
+		return {'node_types': ranked(table=self.node_types), 'procedures': ranked(table=self.contexts)}
+	
+	def format_report(self) -> str:
+		lines = []
+		for title, table in self.report().items():
+			lines.append(f"{title:<24} {'visits':>10} {'self ms':>10} {'total ms':>10}")
+			for name, stats in table.items():
+				lines.append(f"  {name:<22} {stats['count']:>10} {stats['self'] * 1000:>10.3f} {stats['total'] * 1000:>10.3f}")
+		return '\n'.join(lines)
+	
+	def collapsed_stacks(self) -> str:
+		"""
+		one 'frame;frame;frame microseconds' line per stack, the input format of flamegraph.pl and speedscope
+		"""
+		return ''.join(f'{path} {self_time // 1000}\n' for path, self_time in self.stacks.items() if self_time >= 1000)
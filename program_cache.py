@@ -0,0 +1,110 @@
+import hashlib
+import os
+import struct
+import sys
+import tempfile
+
+import serialization
+from syntax_tree import Program
+
+# bump whenever the parser, analyzer or syntax_tree classes change what a cached program holds
+INTERPRETER_VERSION = '6'
+DEFAULT_CACHE_DIR = os.path.join(
+	os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+	'pascal-interpreter'
+)
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+CACHE_SUFFIX = '.program'
+
+
+class ProgramCache:
+	"""
+	analyzed programs serialized into cache_dir, keyed by a hash of the source and interpreter version.
+	entries are written to a temp file and renamed into place so concurrent writers never expose a
+	partial file, and the least recently used entries are evicted once the directory outgrows max_size
+	"""
+	
+	def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_size: int = DEFAULT_MAX_SIZE):
+		self.cache_dir = cache_dir
+		self.max_size = max_size
+	
+	def key(self, text: str) -> str:
+		version = f'{INTERPRETER_VERSION}:{sys.version_info.major}.{sys.version_info.minor}'
+		digest = hashlib.sha256(version.encode())
+		digest.update(text.encode())
+		return digest.hexdigest()
+	
+	def path(self, text: str) -> str:
+		return os.path.join(self.cache_dir, self.key(text=text) + CACHE_SUFFIX)
+	
+	def load(self, text: str) -> Program | None:
+		path = self.path(text=text)
+		try:
+			program_node = serialization.load_file(path=path)
+		except FileNotFoundError:
+			return None
+		except Exception:
+			# unreadable or truncated by something other than this class, drop it
+			self.remove(path=path)
+			return None
+		try:
+			# the mtime is the recency used by evict()
+			os.utime(path)
+		except OSError:
+			pass
+		return program_node
+	
+	def store(self, text: str, program_node: Program):
+		"""
+		best effort, a program that cannot be cached is simply not cached
+		"""
+		try:
+			data = serialization.dumps(program_node=program_node)
+		except (TypeError, ValueError, OverflowError, struct.error):
+			# something the format cannot hold, such as an offset past the int32 operands
+			return
+		try:
+			os.makedirs(self.cache_dir, exist_ok=True)
+			fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+			try:
+				with os.fdopen(fd, 'wb') as fp:
+					fp.write(data)
+				os.replace(temp_path, self.path(text=text))
+			except BaseException:
+				self.remove(path=temp_path)
+				raise
+		except OSError:
+			return
+		self.evict()
+	
+	def entries(self) -> list[os.DirEntry]:
+		try:
+			with os.scandir(self.cache_dir) as it:
+				return [entry for entry in it if entry.name.endswith(CACHE_SUFFIX)]
+		except FileNotFoundError:
+			return []
+	
+	def evict(self):
+		sized_entries = []
+		for entry in self.entries():
+			try:
+				stat = entry.stat()
+			except FileNotFoundError:
+				continue
+			sized_entries.append((stat.st_mtime, stat.st_size, entry.path))
+		total_size = sum(size for _, size, _ in sized_entries)
+		for _, size, path in sorted(sized_entries):
+			if total_size <= self.max_size: break
+			self.remove(path=path)
+			total_size -= size
+	
+	def clear(self):
+		for entry in self.entries():
+			self.remove(path=entry.path)
+	
+	@staticmethod
+	def remove(path: str):
+		try:
+			os.remove(path)
+		except FileNotFoundError:
+			pass
@@ -0,0 +1,125 @@
+import ast
+import types
+
+from lexer import TokenType
+
+from syntax_tree import (
+	NodeVisitor,
+	Program,
+	Block,
+	VariableDeclaration,
+	Procedure,
+	Variable,
+	Compound,
+	AssignmentStatement,
+	BinOp,
+	Num,
+	Unary,
+	ToReal,
+	NoOp
+)
+
+from interpreter import Interpreter, calls_procedures
+
+BINARY_OPERATORS: dict[TokenType, type[ast.operator]] = {
+	TokenType.ADD: ast.Add,
+	TokenType.SUBTRACT: ast.Sub,
+	TokenType.MULTIPLY: ast.Mult,
+	TokenType.DIVIDE: ast.Div,
+	TokenType.INT_DIVIDE: ast.FloorDiv,
+}
+
+UNARY_OPERATORS: dict[TokenType, type[ast.unaryop]] = {
+	TokenType.ADD: ast.UAdd,
+	TokenType.SUBTRACT: ast.USub,
+}
+
+
+class PythonCompiler(NodeVisitor):
+	"""
+	lowers a program to a python module whose top level assigns straight into the state dict,
+	so CPython's eval loop does the arithmetic. procedure calls are not compiled, PythonInterpreter
+	always runs programs with calls on the tree engine
+	"""
+	
+	def compile(self, program_node: Program) -> types.CodeType:
+		module = ast.Module(body=self.visit(node=program_node), type_ignores=[])
+		ast.fix_missing_locations(module)
+		return compile(module, filename=f'<pascal {program_node.name}>', mode='exec')
+	
+	def visit_program(self, program: Program) -> list[ast.stmt]:
+		return self.visit(node=program.block_node)
+	
+	def visit_block(self, block: Block) -> list[ast.stmt]:
+		for node in block.declarations:
+			self.visit(node=node)
+		return self.visit(node=block.compound) or [ast.Pass()]
+	
+	def visit_variable_declaration(self, variable_declaration: VariableDeclaration):
+		pass
+	
+	def visit_procedure(self, procedure: Procedure):
+		# runs only when called, and PythonInterpreter never compiles a program with calls
+		pass
+	
+	def visit_compound(self, compound: Compound) -> list[ast.stmt]:
+		statements: list[ast.stmt] = []
+		for node in compound.children:
+			statements.extend(self.visit(node=node))
+		return statements
+	
+	def visit_assignment_statement(self, assignment_statement: AssignmentStatement) -> list[ast.stmt]:
+		target = ast.Name(id=assignment_statement.variable.token.value, ctx=ast.Store())
+		return [ast.Assign(targets=[target], value=self.visit(node=assignment_statement.expr))]
+	
+	def visit_bin_op(self, bin_op_node: BinOp) -> ast.expr:
+		return ast.BinOp(
+			left=self.visit(node=bin_op_node.left),
+			op=BINARY_OPERATORS[bin_op_node.op.token_type](),
+			right=self.visit(node=bin_op_node.right)
+		)
+	
+	def visit_variable(self, variable: Variable) -> ast.expr:
+		return ast.Name(id=variable.token.value, ctx=ast.Load())
+	
+	def visit_unary(self, unary: Unary) -> ast.expr:
+		return ast.UnaryOp(
+			op=UNARY_OPERATORS[unary.token.token_type](),
+			operand=self.visit(node=unary.expr)
+		)
+	
+	def visit_to_real(self, to_real: ToReal) -> ast.expr:
+		# there are no builtins to call float() from, adding 0.0 converts an int the same way
+		return ast.BinOp(left=self.visit(node=to_real.expr), op=ast.Add(), right=ast.Constant(value=0.0))
+	
+	def visit_num(self, num: Num) -> ast.expr:
+		return ast.Constant(value=num.value)
+	
+	def visit_noop(self, noop: NoOp) -> list[ast.stmt]:
+		return []
+
+
+def run(code: types.CodeType, state: dict[str, int | float]):
+	"""
+	executes compiled code with state as its namespace; the code object can be run any number of times
+	"""
+	try:
+		# no builtins, an unassigned pascal variable must not resolve to a python builtin
+		exec(code, {'__builtins__': {}}, state)
+	except NameError as e:
+		raise NameError(e.name) from None
+
+
+class PythonInterpreter:
+	def __init__(self):
+		self.state: dict[str, int | float] = {}
+	
+	def interpret(self, program_node: Program):
+		if calls_procedures(program_node=program_node):
+			# the module namespace is one flat dict, calls need the activation records of the tree engine
+			interpreter = Interpreter()
+			interpreter.visit(node=program_node)
+			self.state = interpreter.state
+		else:
+			run(code=PythonCompiler().compile(program_node=program_node), state=self.state)
+		print(self.state)
@@ -0,0 +1,348 @@
+import array
+import enum
+
+from lexer import TokenType
+
+from syntax_tree import (
+	Node,
+	NodeVisitor,
+	Program,
+	Block,
+	VariableDeclaration,
+	Procedure,
+	Variable,
+	Compound,
+	AssignmentStatement,
+	BinOp,
+	Num,
+	Unary,
+	ToReal,
+	NoOp
+)
+
+from interpreter import Interpreter, calls_procedures
+
+# every instruction is four ints wide: opcode, destination register, operand a, operand b
+INSTRUCTION_WIDTH = 4
+
+
+class Opcode(enum.IntEnum):
+	LOAD_CONST = 0  # r[dst] = k[a]
+	MOVE = 1  # r[dst] = r[a]
+	NEG = 2  # r[dst] = -r[a]
+	POS = 3  # r[dst] = +r[a]
+	RAISE_NAME = 4  # raise NameError(k[a])
+	TO_REAL = 5  # r[dst] = float(r[a])
+	
+	ADD = 10  # r[dst] = r[a] + r[b]
+	SUBTRACT = 11
+	MULTIPLY = 12
+	DIVIDE = 13
+	INT_DIVIDE = 14
+	
+	# superinstructions with a constant right operand, e.g. var := var op const: r[dst] = r[a] op k[b]
+	ADD_CONST = 20
+	SUBTRACT_CONST = 21
+	MULTIPLY_CONST = 22
+	DIVIDE_CONST = 23
+	INT_DIVIDE_CONST = 24
+	
+	# constant left operand: r[dst] = k[a] op r[b]
+	CONST_ADD = 30
+	CONST_SUBTRACT = 31
+	CONST_MULTIPLY = 32
+	CONST_DIVIDE = 33
+	CONST_INT_DIVIDE = 34
+
+
+# token type -> (register op register, register op const, const op register)
+BINARY_OPCODES: dict[TokenType, tuple[Opcode, Opcode, Opcode]] = {
+	TokenType.ADD: (Opcode.ADD, Opcode.ADD_CONST, Opcode.CONST_ADD),
+	TokenType.SUBTRACT: (Opcode.SUBTRACT, Opcode.SUBTRACT_CONST, Opcode.CONST_SUBTRACT),
+	TokenType.MULTIPLY: (Opcode.MULTIPLY, Opcode.MULTIPLY_CONST, Opcode.CONST_MULTIPLY),
+	TokenType.DIVIDE: (Opcode.DIVIDE, Opcode.DIVIDE_CONST, Opcode.CONST_DIVIDE),
+	TokenType.INT_DIVIDE: (Opcode.INT_DIVIDE, Opcode.INT_DIVIDE_CONST, Opcode.CONST_INT_DIVIDE),
+}
+
+UNARY_OPCODES: dict[TokenType, Opcode] = {
+	TokenType.ADD: Opcode.POS,
+	TokenType.SUBTRACT: Opcode.NEG,
+}
+
+
+class Bytecode:
+	def __init__(self):
+		self.code = array.array('i')
+		self.constants: list[int | float | str] = []
+		# register -> variable name, None for temporaries
+		self.register_names: list[str | None] = []
+	
+	def emit(self, opcode: Opcode, dst: int = 0, a: int = 0, b: int = 0):
+		self.code.extend((opcode, dst, a, b))
+	
+	def export_state(self, registers: list) -> dict[str, int | float]:
+		return {
+			name: value for name, value in zip(self.register_names, registers)
+			if name is not None and value is not None
+		}
+
+
+class RegisterCompiler(NodeVisitor):
+	"""
+	compiles a program to register bytecode. variables live in fixed registers and only the
+	outermost operation of an assignment writes the variable, nested results go to temporaries.
+	procedure calls are not compiled, RegisterInterpreter always runs programs with calls on the
+	tree engine
+	"""
+	
+	def __init__(self):
+		self.bytecode = Bytecode()
+		self.constant_indexes: dict[tuple[type, int | float | str], int] = {}
+		self.variable_registers: dict[str, int] = {}
+		self.free_temps: list[int] = []
+		self.used_temps: list[int] = []
+		self.destination = 0
+	
+	def compile(self, program_node: Program) -> Bytecode:
+		self.visit(node=program_node)
+		return self.bytecode
+	
+	def constant(self, value: int | float | str) -> int:
+		# keyed by type too, 1 and 1.0 are equal but must stay distinct constants
+		key = (type(value), value)
+		index = self.constant_indexes.get(key)
+		if index is None:
+			index = len(self.bytecode.constants)
+			self.bytecode.constants.append(value)
+			self.constant_indexes[key] = index
+		return index
+	
+	def new_register(self, name: str | None) -> int:
+		self.bytecode.register_names.append(name)
+		return len(self.bytecode.register_names) - 1
+	
+	def temp(self) -> int:
+		register = self.free_temps.pop() if self.free_temps else self.new_register(name=None)
+		self.used_temps.append(register)
+		return register
+	
+	def expression(self, node: Node, destination: int):
+		self.destination = destination
+		self.visit(node=node)
+	
+	def operand(self, node: Node) -> tuple[bool, int]:
+		"""
+		returns (is_constant, constant index or register) for an operand of an operation
+		"""
+		if isinstance(node, Num): return True, self.constant(node.value)
+		if isinstance(node, Variable): return False, self.variable_register(variable=node)
+		register = self.temp()
+		self.expression(node=node, destination=register)
+		return False, register
+	
+	def variable_register(self, variable: Variable) -> int:
+		var_name = variable.token.value
+		register = self.variable_registers.get(var_name)
+		if register is None:
+			# code is straight-line, so a variable without a register is never assigned
+			# at this point and the read fails exactly here at runtime
+			self.bytecode.emit(Opcode.RAISE_NAME, a=self.constant(var_name))
+			return self.temp()
+		return register
+	
+	def visit_program(self, program: Program):
+		self.visit(node=program.block_node)
+	
+	def visit_block(self, block: Block):
+		for node in block.declarations:
+			self.visit(node=node)
+		self.visit(node=block.compound)
+	
+	def visit_variable_declaration(self, variable_declaration: VariableDeclaration):
+		pass
+	
+	def visit_procedure(self, procedure: Procedure):
+		# runs only when called, and RegisterInterpreter never compiles a program with calls
+		pass
+	
+	def visit_compound(self, compound: Compound):
+		for node in compound.children:
+			self.visit(node=node)
+	
+	def visit_assignment_statement(self, assignment_statement: AssignmentStatement):
+		var_name = assignment_statement.variable.token.value
+		register = self.variable_registers.get(var_name)
+		if register is None: register = self.new_register(name=var_name)
+		self.expression(node=assignment_statement.expr, destination=register)
+		self.variable_registers[var_name] = register
+		self.free_temps.extend(self.used_temps)
+		self.used_temps.clear()
+	
+	def visit_bin_op(self, bin_op_node: BinOp):
+		destination = self.destination
+		register_op, register_const_op, const_register_op = BINARY_OPCODES[bin_op_node.op.token_type]
+		left_is_constant, left = self.operand(node=bin_op_node.left)
+		right_is_constant, right = self.operand(node=bin_op_node.right)
+		if left_is_constant and right_is_constant:
+			register = self.temp()
+			self.bytecode.emit(Opcode.LOAD_CONST, register, left)
+			self.bytecode.emit(register_const_op, destination, register, right)
+		elif right_is_constant:
+			self.bytecode.emit(register_const_op, destination, left, right)
+		elif left_is_constant:
+			self.bytecode.emit(const_register_op, destination, left, right)
+		else:
+			self.bytecode.emit(register_op, destination, left, right)
+	
+	def visit_variable(self, variable: Variable):
+		destination = self.destination
+		self.bytecode.emit(Opcode.MOVE, destination, self.variable_register(variable=variable))
+	
+	def visit_unary(self, unary: Unary):
+		self.emit_unary(opcode=UNARY_OPCODES[unary.token.token_type], expr=unary.expr)
+	
+	def visit_to_real(self, to_real: ToReal):
+		self.emit_unary(opcode=Opcode.TO_REAL, expr=to_real.expr)
+	
+	def emit_unary(self, opcode: Opcode, expr: Node):
+		destination = self.destination
+		is_constant, operand = self.operand(node=expr)
+		if is_constant:
+			register = self.temp()
+			self.bytecode.emit(Opcode.LOAD_CONST, register, operand)
+			operand = register
+		self.bytecode.emit(opcode, destination, operand)
+	
+	def visit_num(self, num: Num):
+		self.bytecode.emit(Opcode.LOAD_CONST, self.destination, self.constant(num.value))
+	
+	def visit_noop(self, noop: NoOp):
+		pass
+
+
+def run(bytecode: Bytecode, registers: list):
+	# opcodes as plain int locals, the fastest thing to compare against in the loop
+	LOAD_CONST = Opcode.LOAD_CONST.value
+	MOVE = Opcode.MOVE.value
+	NEG = Opcode.NEG.value
+	POS = Opcode.POS.value
+	RAISE_NAME = Opcode.RAISE_NAME.value
+	TO_REAL = Opcode.TO_REAL.value
+	ADD = Opcode.ADD.value
+	SUBTRACT = Opcode.SUBTRACT.value
+	MULTIPLY = Opcode.MULTIPLY.value
+	DIVIDE = Opcode.DIVIDE.value
+	INT_DIVIDE = Opcode.INT_DIVIDE.value
+	ADD_CONST = Opcode.ADD_CONST.value
+	SUBTRACT_CONST = Opcode.SUBTRACT_CONST.value
+	MULTIPLY_CONST = Opcode.MULTIPLY_CONST.value
+	DIVIDE_CONST = Opcode.DIVIDE_CONST.value
+	INT_DIVIDE_CONST = Opcode.INT_DIVIDE_CONST.value
+	CONST_ADD = Opcode.CONST_ADD.value
+	CONST_SUBTRACT = Opcode.CONST_SUBTRACT.value
+	CONST_MULTIPLY = Opcode.CONST_MULTIPLY.value
+	CONST_DIVIDE = Opcode.CONST_DIVIDE.value
+	CONST_INT_DIVIDE = Opcode.CONST_INT_DIVIDE.value
+	code = bytecode.code
+	k = bytecode.constants
+	r = registers
+	end = len(code)
+	pc = 0
+	while pc < end:
+		op = code[pc]
+		if op == ADD_CONST:
+			r[code[pc + 1]] = r[code[pc + 2]] + k[code[pc + 3]]
+		elif op == MULTIPLY_CONST:
+			r[code[pc + 1]] = r[code[pc + 2]] * k[code[pc + 3]]
+		elif op == ADD:
+			r[code[pc + 1]] = r[code[pc + 2]] + r[code[pc + 3]]
+		elif op == MULTIPLY:
+			r[code[pc + 1]] = r[code[pc + 2]] * r[code[pc + 3]]
+		elif op == SUBTRACT:
+			r[code[pc + 1]] = r[code[pc + 2]] - r[code[pc + 3]]
+		elif op == SUBTRACT_CONST:
+			r[code[pc + 1]] = r[code[pc + 2]] - k[code[pc + 3]]
+		elif op == MOVE:
+			r[code[pc + 1]] = r[code[pc + 2]]
+		elif op == LOAD_CONST:
+			r[code[pc + 1]] = k[code[pc + 2]]
+		elif op == DIVIDE:
+			r[code[pc + 1]] = r[code[pc + 2]] / r[code[pc + 3]]
+		elif op == INT_DIVIDE:
+			r[code[pc + 1]] = r[code[pc + 2]] // r[code[pc + 3]]
+		elif op == DIVIDE_CONST:
+			r[code[pc + 1]] = r[code[pc + 2]] / k[code[pc + 3]]
+		elif op == INT_DIVIDE_CONST:
+			r[code[pc + 1]] = r[code[pc + 2]] // k[code[pc + 3]]
+		elif op == CONST_ADD:
+			r[code[pc + 1]] = k[code[pc + 2]] + r[code[pc + 3]]
+		elif op == CONST_SUBTRACT:
+			r[code[pc + 1]] = k[code[pc + 2]] - r[code[pc + 3]]
+		elif op == CONST_MULTIPLY:
+			r[code[pc + 1]] = k[code[pc + 2]] * r[code[pc + 3]]
+		elif op == CONST_DIVIDE:
+			r[code[pc + 1]] = k[code[pc + 2]] / r[code[pc + 3]]
+		elif op == CONST_INT_DIVIDE:
+			r[code[pc + 1]] = k[code[pc + 2]] // r[code[pc + 3]]
+		elif op == NEG:
+			r[code[pc + 1]] = -r[code[pc + 2]]
+		elif op == POS:
+			r[code[pc + 1]] = +r[code[pc + 2]]
+		elif op == TO_REAL:
+			r[code[pc + 1]] = float(r[code[pc + 2]])
+		elif op == RAISE_NAME:
+			raise NameError(k[code[pc + 2]])
+		else:
+			raise RuntimeError(f"bad opcode {op} at {pc}")
+		pc += INSTRUCTION_WIDTH
+
+
+def disassemble(bytecode: Bytecode) -> str:
+	def register(index: int) -> str:
+		name = bytecode.register_names[index] if index < len(bytecode.register_names) else None
+		return f'r{index}' if name is None else f'r{index}({name})'
+	
+	def constant(index: int) -> str:
+		return f'k{index}({bytecode.constants[index]!r})'
+	
+	lines = []
+	code = bytecode.code
+	for pc in range(0, len(code), INSTRUCTION_WIDTH):
+		opcode, dst, a, b = Opcode(code[pc]), code[pc + 1], code[pc + 2], code[pc + 3]
+		if opcode == Opcode.LOAD_CONST:
+			operands = f'{register(dst)}, {constant(a)}'
+		elif opcode == Opcode.RAISE_NAME:
+			operands = constant(a)
+		elif opcode in {Opcode.MOVE, Opcode.NEG, Opcode.POS, Opcode.TO_REAL}:
+			operands = f'{register(dst)}, {register(a)}'
+		elif opcode.name.endswith('_CONST'):
+			operands = f'{register(dst)}, {register(a)}, {constant(b)}'
+		elif opcode.name.startswith('CONST_'):
+			operands = f'{register(dst)}, {constant(a)}, {register(b)}'
+		else:
+			operands = f'{register(dst)}, {register(a)}, {register(b)}'
+		lines.append(f'{pc // INSTRUCTION_WIDTH:04d} {opcode.name:<18} {operands}')
+	return '\n'.join(lines)
+
+
+class RegisterInterpreter:
+	def __init__(self):
+		self.state: dict[str, int | float] = {}
+	
+	def interpret(self, program_node: Program):
+		if calls_procedures(program_node=program_node):
+			# registers are named after globals only and the code is straight-line, calls need the tree engine
+			interpreter = Interpreter()
+			try:
+				interpreter.visit(node=program_node)
+			finally:
+				self.state = interpreter.state
+			print(self.state)
+			return
+		bytecode = RegisterCompiler().compile(program_node=program_node)
+		registers = [None] * len(bytecode.register_names)
+		try:
+			run(bytecode=bytecode, registers=registers)
+		finally:
+			self.state = bytecode.export_state(registers=registers)
+		print(self.state)
@@ -3,6 +3,7 @@ import typing
 from lexer import TokenType
 
 from symbols import (
+	Symbol,
 	BuiltinTypeSymbol,
 	VarSymbol,
 	ProcedureSymbol,
@@ -18,20 +19,49 @@ from syntax_tree import (
 	Type,
 	Procedure,
 	Compound,
+	Node,
+	ProcedureCall,
 	AssignmentStatement,
 	BinOp,
 	Unary,
 	Num,
 	NoOp,
+	TypedBinOp,
+	IntAdd,
+	IntSubtract,
+	IntMultiply,
+	IntDivide,
+	RealAdd,
+	RealSubtract,
+	RealMultiply,
+	RealDivide,
+	ToReal,
 )
 
+# (result type, operator) -> the node running just that operation
+TYPED_BIN_OPS: dict[tuple[str, TokenType], type[TypedBinOp]] = {
+	('integer', TokenType.ADD): IntAdd,
+	('integer', TokenType.SUBTRACT): IntSubtract,
+	('integer', TokenType.MULTIPLY): IntMultiply,
+	('integer', TokenType.INT_DIVIDE): IntDivide,
+	('real', TokenType.ADD): RealAdd,
+	('real', TokenType.SUBTRACT): RealSubtract,
+	('real', TokenType.MULTIPLY): RealMultiply,
+	('real', TokenType.DIVIDE): RealDivide,
+}
+
 
 class SemanticAnalyzer(NodeVisitor):
 	def __init__(self):
 		self.current_scope: SymbolTable | None = None
+		# what the last analyze() found about calls, for keeping purity up to date under edits
+		self.purity: PurityClassifier | None = None
 	
 	def analyze(self, program_node: Program):
 		self.visit(node=program_node)
+		TypeSpecializer().visit(node=program_node)
+		self.purity = PurityClassifier()
+		self.purity.classify(program_node=program_node)
 	
 	def visit_program(self, program_node: Program):
 		self.current_scope = SymbolTable(
@@ -39,9 +69,11 @@ class SemanticAnalyzer(NodeVisitor):
 			scope_level=1,
 			enclosing_scope=self.current_scope
 		)
+		self.current_scope.open()
+		program_node.symbol_table = self.current_scope
 		self.visit(node=program_node.block_node)
 		print(self.current_scope)
-		self.current_scope = self.current_scope.enclosing_scope
+		self.current_scope = self.current_scope.close()
 	
 	def visit_block(self, block_node: Block):
 		for node in block_node.declarations: self.visit(node=node)
@@ -57,7 +89,7 @@ class SemanticAnalyzer(NodeVisitor):
 			type_symbol=type_symbol
 		)
 		existing = self.current_scope.local_lookup(variable_name)
-		if existing:
+		if existing is not None:
 			raise Exception(f"error: duplicate identifier {variable_name} in {self.current_scope.machine_name()}")
 		self.current_scope.add(var_symbol)
 	
@@ -74,12 +106,15 @@ class SemanticAnalyzer(NodeVisitor):
 	def visit_procedure(self, procedure: Procedure):
 		procedure_name = procedure.name
 		procedure_symbol = ProcedureSymbol(name=procedure_name, params=[])
+		procedure_symbol.procedure_node = procedure
 		self.current_scope.add(procedure_symbol)
 		self.current_scope = SymbolTable(
 			scope_name=procedure.name,
 			scope_level=self.current_scope.scope_level + 1,
 			enclosing_scope=self.current_scope
 		)
+		self.current_scope.open()
+		procedure.symbol_table = self.current_scope
 		for param in procedure.params:
 			type_symbol = self.current_scope.lookup(name=param.type_node.token.token_type.value)
 			type_symbol = typing.cast(BuiltinTypeSymbol, type_symbol)
@@ -92,31 +127,308 @@ class SemanticAnalyzer(NodeVisitor):
 		
 		self.visit(procedure.block_node)
 		print(self.current_scope)
-		self.current_scope = self.current_scope.enclosing_scope
+		self.current_scope = self.current_scope.close()
 	
 	def visit_compound(self, compound_node: Compound):
 		for node in compound_node.children:
 			self.visit(node=node)
 	
+	def visit_procedure_call(self, procedure_call: ProcedureCall):
+		name = procedure_call.name
+		symbol = self.current_scope.lookup(name=name)
+		if symbol is None:
+			raise NameError(f"{name} in {self.current_scope.scope_name}@{self.current_scope.scope_level}")
+		if not isinstance(symbol, ProcedureSymbol):
+			raise Exception(f"error: {name} is not a procedure in {self.current_scope.machine_name()}")
+		params = symbol.params
+		if len(procedure_call.args) != len(params):
+			raise Exception(
+				f"error: {name} takes {len(params)} arguments, got {len(procedure_call.args)} "
+				f"in {self.current_scope.machine_name()}"
+			)
+		for n, (arg, param) in enumerate(zip(procedure_call.args, params), start=1):
+			arg_type = self.visit(node=arg)
+			# an integer argument widens to a real parameter, never the other way round
+			if param.type_symbol.name == 'integer' and arg_type.name != 'integer':
+				raise Exception(
+					f"error: argument {n} of {name} is {arg_type.name}, expected {param.type_symbol.name} "
+					f"in {self.current_scope.machine_name()}"
+				)
+		procedure_call.procedure_symbol = symbol
+	
 	def visit_assignment_statement(self, assignment_statement: AssignmentStatement):
 		var_name = assignment_statement.variable.token.value
 		symbol = self.current_scope.lookup(name=var_name)
 		if symbol is None:
 			raise NameError(var_name)
-		self.visit(node=assignment_statement.expr)
+		self.resolve(variable_node=assignment_statement.variable, symbol=symbol)
+		expr_type = self.visit(node=assignment_statement.expr)
+		if symbol.type_symbol.name == 'integer' and expr_type.name != 'integer':
+			raise Exception(
+				f"error: cannot assign {expr_type.name} to integer {var_name} "
+				f"in {self.current_scope.machine_name()}"
+			)
 	
-	def visit_bin_op(self, bin_op_node: BinOp):
-		self.visit(bin_op_node.left)
-		self.visit(bin_op_node.right)
+	def visit_bin_op(self, bin_op_node: BinOp) -> BuiltinTypeSymbol:
+		left_type = self.visit(bin_op_node.left)
+		right_type = self.visit(bin_op_node.right)
+		op = bin_op_node.op.token_type
+		if op == TokenType.INT_DIVIDE and (left_type.name != 'integer' or right_type.name != 'integer'):
+			raise Exception(
+				f"error: div takes integers, got {left_type.name} div {right_type.name} "
+				f"in {self.current_scope.machine_name()}"
+			)
+		if op == TokenType.DIVIDE or left_type.name == 'real' or right_type.name == 'real':
+			bin_op_node.type_symbol = self.current_scope.lookup('real')
+		else:
+			bin_op_node.type_symbol = left_type
+		return bin_op_node.type_symbol
 	
-	def visit_variable(self, variable_node: Variable):
+	def visit_variable(self, variable_node: Variable) -> BuiltinTypeSymbol:
 		var_name = variable_node.token.value
 		symbol = self.current_scope.lookup(name=var_name)
 		if symbol is None:
 			raise NameError(f"{var_name} in {self.current_scope.scope_name}@{self.current_scope.scope_level}")
+		self.resolve(variable_node=variable_node, symbol=symbol)
+		return symbol.type_symbol
+	
+	def resolve(self, variable_node: Variable, symbol: Symbol):
+		if not isinstance(symbol, VarSymbol):
+			raise Exception(f"error: {symbol.name} is not a variable in {self.current_scope.machine_name()}")
+		variable_node.scope_level = symbol.scope_level
+		variable_node.slot = symbol.slot
+		variable_node.type_symbol = symbol.type_symbol
+	
+	def visit_unary(self, unary: Unary) -> BuiltinTypeSymbol:
+		unary.type_symbol = self.visit(unary.expr)
+		return unary.type_symbol
+	
+	def visit_num(self, num_node: Num) -> BuiltinTypeSymbol:
+		num_node.type_symbol = self.current_scope.lookup('integer' if type(num_node.value) is int else 'real')
+		return num_node.type_symbol
+	
+	def visit_noop(self, noop_node: NoOp):
+		pass
+
+
+class TypeSpecializer(NodeVisitor):
+	"""
+	rewrites an analyzed tree by the types the analyzer inferred: every BinOp becomes the TypedBinOp
+	for its operation and result type, and integer expressions stored in real variables or params
+	are wrapped in ToReal, so a real variable only ever holds a float. visit the program or, after a
+	local reparse, just the new procedure or compound
+	"""
+	
+	def visit_program(self, program_node: Program):
+		self.visit(node=program_node.block_node)
+	
+	def visit_block(self, block_node: Block):
+		for node in block_node.declarations: self.visit(node=node)
+		self.visit(node=block_node.compound)
+	
+	def visit_variable_declaration(self, variable_declaration: VariableDeclaration):
+		pass
+	
+	def visit_procedure(self, procedure: Procedure):
+		self.visit(node=procedure.block_node)
+	
+	def visit_compound(self, compound_node: Compound):
+		for node in compound_node.children: self.visit(node=node)
+	
+	def visit_procedure_call(self, procedure_call: ProcedureCall):
+		procedure_call.args = [
+			self.promote(expr=self.visit(node=arg), type_symbol=param.type_symbol)
+			for arg, param in zip(procedure_call.args, procedure_call.procedure_symbol.params)
+		]
+	
+	def visit_assignment_statement(self, assignment_statement: AssignmentStatement):
+		expr = self.visit(node=assignment_statement.expr)
+		assignment_statement.expr = self.promote(expr=expr, type_symbol=assignment_statement.variable.type_symbol)
+	
+	@staticmethod
+	def promote(expr: Node, type_symbol: BuiltinTypeSymbol) -> Node:
+		if type_symbol.name == 'real' and expr.type_symbol.name == 'integer':
+			return ToReal(expr=expr, type_symbol=type_symbol)
+		return expr
+	
+	def visit_bin_op(self, bin_op_node: BinOp) -> TypedBinOp:
+		typed_bin_op = TYPED_BIN_OPS[bin_op_node.type_symbol.name, bin_op_node.op.token_type]
+		return typed_bin_op(
+			left=self.visit(node=bin_op_node.left),
+			op=bin_op_node.op,
+			right=self.visit(node=bin_op_node.right),
+			type_symbol=bin_op_node.type_symbol
+		)
+	
+	def visit_variable(self, variable_node: Variable) -> Variable:
+		return variable_node
+	
+	def visit_unary(self, unary: Unary) -> Unary:
+		unary.expr = self.visit(node=unary.expr)
+		return unary
+	
+	def visit_num(self, num_node: Num) -> Num:
+		return num_node
+	
+	def visit_noop(self, noop_node: NoOp):
+		pass
+
+
+class PurityClassifier(NodeVisitor):
+	"""
+	marks a Procedure pure when neither it nor anything it calls reads or writes a variable outside
+	its own activations. the language has no functions, var params or output, so such a call leaves
+	nothing behind and depends on its arguments alone. reads count as well as writes: a read of a
+	non-local could raise or divide by zero differently from one call to the next. runs on an
+	analyzed tree, after every call is resolved. keeps what it found, so after a local reparse
+	reclassify() and replace() redo only the edited procedure and its callers
+	"""
+	
+	def __init__(self):
+		self.current: Procedure | None = None
+		# lowest scope level each procedure's own statements touch, and the procedures they call
+		self.own: dict[Procedure, int] = {}
+		self.callees: dict[Procedure, set[Procedure]] = {}
+		self.callers: dict[Procedure, set[Procedure]] = {}
+		# lowest scope level a procedure touches through its calls as well
+		self.lowest: dict[Procedure, int] = {}
+	
+	def classify(self, program_node: Program):
+		self.visit(node=program_node)
+		self.settle(procedures=set(self.own))
+	
+	def reclassify(self, procedure: Procedure):
+		"""
+		after statements of procedure were reparsed: rescans its statements, the procedures nested in
+		it are unchanged
+		"""
+		for callee in self.callees[procedure]: self.callers[callee].discard(procedure)
+		self.callees[procedure] = set()
+		self.own[procedure] = procedure.symbol_table.scope_level
+		self.current = procedure
+		self.visit(node=procedure.block_node.compound)
+		self.current = None
+		self.settle(procedures=self.reaching(procedures={procedure}))
+	
+	def replace(self, old: Procedure, new: Procedure):
+		"""
+		after old was reparsed into new: forgets old and the procedures nested in it, scans the new
+		ones and hands the calls of old to new
+		"""
+		old_procedures = set(nested_procedures(procedure=old))
+		callers = self.callers[old] - old_procedures
+		for procedure in old_procedures: self.forget(procedure=procedure)
+		self.visit(node=new)
+		for caller in callers:
+			self.callees[caller].add(new)
+			self.callers[new].add(caller)
+		self.settle(procedures=self.reaching(procedures=set(nested_procedures(procedure=new))))
+	
+	def forget(self, procedure: Procedure):
+		for callee in self.callees.pop(procedure):
+			self.callers[callee].discard(procedure)
+		for caller in self.callers.pop(procedure):
+			if caller in self.callees: self.callees[caller].discard(procedure)
+		del self.own[procedure]
+		self.lowest.pop(procedure, None)
+	
+	def reaching(self, procedures: set[Procedure]) -> set[Procedure]:
+		"""
+		procedures and everything calling into them, directly or not: all whose purity they decide
+		"""
+		found = set(procedures)
+		pending = list(procedures)
+		while pending:
+			for caller in self.callers[pending.pop()]:
+				if caller not in found:
+					found.add(caller)
+					pending.append(caller)
+		return found
+	
+	def settle(self, procedures: set[Procedure]):
+		"""
+		recomputes the reach and purity of procedures, the reach of every other procedure is up to date
+		"""
+		for procedure in procedures: self.lowest[procedure] = self.own[procedure]
+		# a callee's reach is the caller's too; levels only go down, so this settles
+		changed = True
+		while changed:
+			changed = False
+			for procedure in procedures:
+				lowest = min(
+					(self.escapes(procedure=callee) for callee in self.callees[procedure]),
+					default=self.lowest[procedure]
+				)
+				if lowest < self.lowest[procedure]:
+					self.lowest[procedure] = lowest
+					changed = True
+		for procedure in procedures:
+			procedure.pure = self.lowest[procedure] >= procedure.symbol_table.scope_level
+	
+	def escapes(self, procedure: Procedure) -> int:
+		"""
+		the lowest level a call of procedure touches outside its own activation, which are fresh per call
+		"""
+		lowest = self.lowest[procedure]
+		return lowest if lowest < procedure.symbol_table.scope_level else procedure.symbol_table.scope_level
+	
+	def visit_program(self, program_node: Program):
+		self.visit(node=program_node.block_node)
+	
+	def visit_block(self, block_node: Block):
+		for node in block_node.declarations: self.visit(node=node)
+		self.visit(node=block_node.compound)
+	
+	def visit_variable_declaration(self, variable_declaration: VariableDeclaration):
+		pass
+	
+	def visit_procedure(self, procedure: Procedure):
+		enclosing = self.current
+		self.current = procedure
+		self.own[procedure] = procedure.symbol_table.scope_level
+		self.callees[procedure] = set()
+		self.callers.setdefault(procedure, set())
+		self.visit(node=procedure.block_node)
+		self.current = enclosing
+	
+	def visit_compound(self, compound_node: Compound):
+		for node in compound_node.children: self.visit(node=node)
+	
+	def visit_procedure_call(self, procedure_call: ProcedureCall):
+		if self.current is not None:
+			callee = procedure_call.procedure_symbol.procedure_node
+			self.callees[self.current].add(callee)
+			self.callers.setdefault(callee, set()).add(self.current)
+		for arg in procedure_call.args: self.visit(node=arg)
+	
+	def visit_assignment_statement(self, assignment_statement: AssignmentStatement):
+		self.visit(node=assignment_statement.variable)
+		self.visit(node=assignment_statement.expr)
+	
+	def visit_bin_op(self, bin_op_node: BinOp):
+		self.visit(node=bin_op_node.left)
+		self.visit(node=bin_op_node.right)
+	
+	def visit_variable(self, variable_node: Variable):
+		if self.current is not None and variable_node.scope_level < self.own[self.current]:
+			self.own[self.current] = variable_node.scope_level
 	
 	def visit_unary(self, unary: Unary):
-		self.visit(unary.expr)
+		self.visit(node=unary.expr)
+	
+	def visit_num(self, num_node: Num):
+		pass
 	
 	def visit_noop(self, noop_node: NoOp):
 		pass
+
+
+def nested_procedures(procedure: Procedure):
+	"""
+	procedure and every procedure declared inside it, at any depth
+	"""
+	pending = [procedure]
+	while pending:
+		procedure = pending.pop()
+		yield procedure
+		pending.extend(node for node in procedure.block_node.declarations if isinstance(node, Procedure))
@@ -0,0 +1,737 @@
+import array
+import contextlib
+import enum
+import gc
+import mmap
+import struct
+import sys
+from typing import Callable, Sequence
+
+from lexer import Token, TokenType, TOKEN_TYPES, TOKEN_CODES, SHARED_TOKENS
+
+from symbols import (
+	Symbol,
+	BuiltinTypeSymbol,
+	VarSymbol,
+	ProcedureSymbol,
+	SymbolTable
+)
+
+from syntax_tree import (
+	Node,
+	Program,
+	Block,
+	VariableDeclaration,
+	Procedure,
+	Param,
+	Variable,
+	Type,
+	Compound,
+	ProcedureCall,
+	AssignmentStatement,
+	BinOp,
+	TypedBinOp,
+	IntAdd,
+	IntSubtract,
+	IntMultiply,
+	IntDivide,
+	RealAdd,
+	RealSubtract,
+	RealMultiply,
+	RealDivide,
+	Unary,
+	ToReal,
+	Num,
+	NoOp
+)
+
+MAGIC = b'PSAT'
+# bump whenever the records below change
+FORMAT_VERSION = 1
+# magic, version, byte order, innermost open scope, then the element count of every section
+HEADER = struct.Struct('<4sHBxi8Q')
+# sections in file order with their array typecodes, each starts at a multiple of 8 bytes
+SECTIONS = (
+	('kinds', 'B'),
+	('operands', 'i'),
+	('reals', 'd'),
+	('string_offsets', 'i'),
+	('string_bytes', 'B'),
+	('symbol_kinds', 'B'),
+	('symbol_operands', 'i'),
+	('scope_operands', 'i'),
+)
+BYTE_ORDERS = ('little', 'big')
+# stands for None wherever an operand is an index, a level, a slot or a source offset
+NONE = -1
+
+INT32_MIN = -2 ** 31
+INT32_MAX = 2 ** 31 - 1
+
+
+class Record(enum.IntEnum):
+	"""
+	one per node, in post-order: a record's children are the records just before it
+	"""
+	NONE = 0
+	# a node already written, shared such as the Type of `var a, b : integer`
+	REF = 1
+	PROGRAM = 2
+	BLOCK = 3
+	VARIABLE_DECLARATION = 4
+	PROCEDURE = 5
+	PARAM = 6
+	VARIABLE = 7
+	TYPE = 8
+	COMPOUND = 9
+	PROCEDURE_CALL = 10
+	ASSIGNMENT_STATEMENT = 11
+	BIN_OP = 12
+	UNARY = 13
+	TO_REAL = 14
+	NUM = 15
+	NOOP = 16
+	INT_ADD = 17
+	INT_SUBTRACT = 18
+	INT_MULTIPLY = 19
+	INT_DIVIDE = 20
+	REAL_ADD = 21
+	REAL_SUBTRACT = 22
+	REAL_MULTIPLY = 23
+	REAL_DIVIDE = 24
+
+
+RECORDS: dict[type[Node], Record] = {
+	Program: Record.PROGRAM,
+	Block: Record.BLOCK,
+	VariableDeclaration: Record.VARIABLE_DECLARATION,
+	Procedure: Record.PROCEDURE,
+	Param: Record.PARAM,
+	Variable: Record.VARIABLE,
+	Type: Record.TYPE,
+	Compound: Record.COMPOUND,
+	ProcedureCall: Record.PROCEDURE_CALL,
+	AssignmentStatement: Record.ASSIGNMENT_STATEMENT,
+	BinOp: Record.BIN_OP,
+	Unary: Record.UNARY,
+	ToReal: Record.TO_REAL,
+	Num: Record.NUM,
+	NoOp: Record.NOOP,
+	IntAdd: Record.INT_ADD,
+	IntSubtract: Record.INT_SUBTRACT,
+	IntMultiply: Record.INT_MULTIPLY,
+	IntDivide: Record.INT_DIVIDE,
+	RealAdd: Record.REAL_ADD,
+	RealSubtract: Record.REAL_SUBTRACT,
+	RealMultiply: Record.REAL_MULTIPLY,
+	RealDivide: Record.REAL_DIVIDE,
+}
+TYPED_BIN_OPS: dict[Record, type[TypedBinOp]] = {
+	record: node_class for node_class, record in RECORDS.items() if issubclass(node_class, TypedBinOp)
+}
+# the child nodes written before each node, by class so the writer needs no isinstance chain
+CHILDREN: dict[type[Node], Callable[[Node], Sequence[Node | None]]] = {
+	Program: lambda node: (node.block_node,),
+	Block: lambda node: (*node.declarations, node.compound),
+	VariableDeclaration: lambda node: (node.var_node, node.type_node),
+	Procedure: lambda node: (*node.params, node.block_node),
+	Param: lambda node: (node.var_node, node.type_node),
+	Variable: lambda node: (),
+	Type: lambda node: (),
+	Compound: lambda node: node.children,
+	ProcedureCall: lambda node: node.args,
+	AssignmentStatement: lambda node: (node.variable, node.expr),
+	Unary: lambda node: (node.expr,),
+	ToReal: lambda node: (node.expr,),
+	Num: lambda node: (),
+	NoOp: lambda node: (),
+	**{node_class: lambda node: (node.left, node.right) for node_class in RECORDS if issubclass(node_class, BinOp)},
+}
+
+
+class Value(enum.IntEnum):
+	"""
+	how a token value is stored: a tag operand followed by the value itself or its index
+	"""
+	INT = 0
+	REAL = 1
+	STRING = 2
+	# an int outside 32 bits, as its decimal string
+	BIG_INT = 3
+
+
+class SymbolKind(enum.IntEnum):
+	BUILTIN_TYPE = 0
+	VAR = 1
+	PROCEDURE = 2
+
+
+# tokens that carry a value of their own, every other type is one of lexer.SHARED_TOKENS
+VALUE_TOKEN_TYPES = frozenset({TokenType.ID, TokenType.INTEGER_CONST, TokenType.REAL_CONST})
+
+
+class ProgramWriter:
+	"""
+	flattens an analyzed Program into the sections of the binary format. the tree is walked with an
+	explicit stack, so depth is bounded by memory rather than the recursion limit. every operand is
+	an int32: names and other strings index a deduplicated string table, reals index an array of
+	doubles, symbols are their symbol_id and scopes are numbered enclosing scope first.
+	
+	operands per record, children come first in post-order and are not repeated:
+	
+	PROGRAM               name, scope
+	BLOCK                 child count (declarations then compound)
+	PROCEDURE             name, param count, scope, start, end, pure
+	VARIABLE              name, scope level, slot, type symbol
+	TYPE                  token
+	COMPOUND              child count, start, end
+	PROCEDURE_CALL        name, arg count, symbol, token
+	BIN_OP, UNARY         token, type symbol (typed bin ops and TO_REAL too)
+	NUM                   token, type symbol
+	REF                   index of the node among the records written so far
+	
+	a token is its lexer.TOKEN_CODES code, followed by its value as a Value tag plus operand for the
+	VALUE_TOKEN_TYPES
+	"""
+	
+	def __init__(self):
+		self.kinds = array.array('B')
+		self.operands = array.array('i')
+		self.reals = array.array('d')
+		self.strings: list[str] = []
+		self.string_index: dict[str, int] = {}
+		# id of every node written -> its index, for REF records
+		self.written: dict[int, int] = {}
+		self.scopes: dict[SymbolTable, int] = {}
+		self.symbols: list[Symbol] = []
+	
+	def write(self, program_node: Program) -> bytes:
+		if program_node.symbol_table is not None:
+			self.symbols = program_node.symbol_table.bindings.symbols
+			innermost = program_node.symbol_table.bindings.innermost
+		else:
+			innermost = None
+		stack: list[tuple[Node | None, bool]] = [(program_node, False)]
+		while stack:
+			node, expanded = stack.pop()
+			if expanded:
+				self.written[id(node)] = len(self.written)
+				self.record(node=node)
+				continue
+			if node is None:
+				self.kinds.append(Record.NONE)
+				continue
+			index = self.written.get(id(node))
+			if index is not None:
+				self.kinds.append(Record.REF)
+				self.operands.append(index)
+				continue
+			stack.append((node, True))
+			stack.extend([(child, False) for child in reversed(CHILDREN[type(node)](node))])
+		innermost_id = NONE if innermost is None else self.scope(scope=innermost)
+		symbol_kinds, symbol_operands = self.symbol_sections()
+		scope_operands = self.scope_section()
+		# last, the sections before add the names of symbols and scopes
+		string_offsets, string_bytes = self.string_sections()
+		sections = [
+			self.kinds,
+			self.operands,
+			self.reals,
+			string_offsets,
+			string_bytes,
+			symbol_kinds,
+			symbol_operands,
+			scope_operands,
+		]
+		return pack(sections=sections, innermost=innermost_id)
+	
+	def record(self, node: Node):
+		record = RECORDS[type(node)]
+		self.kinds.append(record)
+		operands = self.operands
+		if record == Record.VARIABLE:
+			operands.extend((
+				self.string(text=node.token.value),
+				NONE if node.scope_level is None else node.scope_level,
+				NONE if node.slot is None else node.slot,
+				self.symbol(symbol=node.type_symbol)
+			))
+		elif record == Record.NUM:
+			self.token(token=node.token)
+			operands.append(self.symbol(symbol=node.type_symbol))
+		elif record in TYPED_BIN_OPS or record == Record.BIN_OP:
+			self.token(token=node.op)
+			operands.append(self.symbol(symbol=node.type_symbol))
+		elif record == Record.UNARY or record == Record.TO_REAL:
+			self.token(token=node.token)
+			operands.append(self.symbol(symbol=node.type_symbol))
+		elif record == Record.COMPOUND:
+			operands.extend((len(node.children), span(offset=node.start), span(offset=node.end)))
+		elif record == Record.PROCEDURE_CALL:
+			operands.extend((self.string(text=node.name), len(node.args), self.symbol(symbol=node.procedure_symbol)))
+			self.token(token=node.token)
+		elif record == Record.TYPE:
+			self.token(token=node.token)
+		elif record == Record.BLOCK:
+			operands.append(len(node.declarations) + 1)
+		elif record == Record.PROCEDURE:
+			operands.extend((
+				self.string(text=node.name),
+				len(node.params),
+				self.scope(scope=node.symbol_table),
+				span(offset=node.start),
+				span(offset=node.end),
+				int(node.pure)
+			))
+		elif record == Record.PROGRAM:
+			operands.extend((self.string(text=node.name), self.scope(scope=node.symbol_table)))
+	
+	def string(self, text: str) -> int:
+		index = self.string_index.get(text)
+		if index is None:
+			index = self.string_index[text] = len(self.strings)
+			self.strings.append(text)
+		return index
+	
+	def token(self, token: Token):
+		self.operands.append(TOKEN_CODES[token.token_type])
+		if token.token_type in VALUE_TOKEN_TYPES: self.value(value=token.value)
+	
+	def value(self, value: int | float | str):
+		if type(value) is int:
+			if INT32_MIN <= value <= INT32_MAX:
+				self.operands.extend((Value.INT, value))
+			else:
+				self.operands.extend((Value.BIG_INT, self.string(text=str(value))))
+		elif type(value) is float:
+			self.operands.extend((Value.REAL, len(self.reals)))
+			self.reals.append(value)
+		elif type(value) is str:
+			self.operands.extend((Value.STRING, self.string(text=value)))
+		else:
+			raise TypeError(f"cannot serialize a token value of type {type(value).__name__}")
+	
+	def symbol(self, symbol: Symbol | None) -> int:
+		if symbol is None: return NONE
+		symbol_id = symbol.symbol_id
+		if symbol_id is None or symbol_id >= len(self.symbols) or self.symbols[symbol_id] is not symbol:
+			raise ValueError(f"{symbol} does not belong to the program's symbol tables")
+		return symbol_id
+	
+	def scope(self, scope: SymbolTable | None) -> int:
+		"""
+		numbers scope and, before it, every scope enclosing it
+		"""
+		if scope is None: return NONE
+		chain = []
+		while scope is not None and scope not in self.scopes:
+			chain.append(scope)
+			scope = scope.enclosing_scope
+		for scope in reversed(chain): self.scopes[scope] = len(self.scopes)
+		return self.scopes[chain[0]] if chain else self.scopes[scope]
+	
+	def string_sections(self) -> tuple[array.array, bytes]:
+		offsets = array.array('i', [0])
+		encoded = []
+		size = 0
+		for text in self.strings:
+			data = text.encode('utf-8')
+			encoded.append(data)
+			size += len(data)
+			offsets.append(size)
+		return offsets, b''.join(encoded)
+	
+	def symbol_sections(self) -> tuple[array.array, array.array]:
+		"""
+		operands per symbol, in symbol_id order: name and type symbol, then scope level and slot for a
+		variable or the procedure record, param count and param symbols for a procedure
+		"""
+		kinds = array.array('B')
+		operands = array.array('i')
+		for symbol in self.symbols:
+			operands.extend((self.string(text=symbol.name), self.symbol(symbol=symbol.type_symbol)))
+			if isinstance(symbol, VarSymbol):
+				kinds.append(SymbolKind.VAR)
+				operands.extend((
+					NONE if symbol.scope_level is None else symbol.scope_level,
+					NONE if symbol.slot is None else symbol.slot
+				))
+			elif isinstance(symbol, ProcedureSymbol):
+				kinds.append(SymbolKind.PROCEDURE)
+				# a procedure no longer in the tree, replaced by a reparse, has no record to point at
+				operands.append(self.written.get(id(symbol.procedure_node), NONE))
+				operands.append(len(symbol.params))
+				operands.extend(self.symbol(symbol=param) for param in symbol.params)
+			elif isinstance(symbol, BuiltinTypeSymbol):
+				kinds.append(SymbolKind.BUILTIN_TYPE)
+			else:
+				raise TypeError(f"cannot serialize {type(symbol).__name__}")
+		return kinds, operands
+	
+	def scope_section(self) -> array.array:
+		"""
+		operands per scope: name, level, enclosing scope, then the symbols in insertion order and the
+		slots, each as a count followed by symbol ids
+		"""
+		operands = array.array('i')
+		for scope in self.scopes:
+			operands.extend((
+				self.string(text=scope.scope_name),
+				scope.scope_level,
+				NONE if scope.enclosing_scope is None else self.scopes[scope.enclosing_scope],
+				len(scope.symbols)
+			))
+			operands.extend(self.symbol(symbol=symbol) for symbol in scope.symbols.values())
+			operands.append(len(scope.slots))
+			operands.extend(self.symbol(symbol=symbol) for symbol in scope.slots)
+		return operands
+
+
+def span(offset: int | None) -> int:
+	return NONE if offset is None else offset
+
+
+def pack(sections: list[array.array | bytes], innermost: int) -> bytes:
+	header = HEADER.pack(
+		MAGIC, FORMAT_VERSION, BYTE_ORDERS.index(sys.byteorder), innermost, *(len(section) for section in sections)
+	)
+	parts = [header]
+	size = len(header)
+	for section in sections:
+		padding = -size % 8
+		data = section if isinstance(section, bytes) else section.tobytes()
+		parts.append(b'\0' * padding)
+		parts.append(data)
+		size += padding + len(data)
+	return b''.join(parts)
+
+
+def dumps(program_node: Program) -> bytes:
+	"""
+	the program, its analysis results and its symbol tables in the binary format
+	"""
+	with collection_paused():
+		return ProgramWriter().write(program_node=program_node)
+
+
+class ProgramReader:
+	"""
+	rebuilds the Program dumps() wrote from any buffer: bytes, an mmap or a memoryview. the arrays
+	are read through memoryview casts of the buffer, only the nodes, symbols and strings are new objects
+	"""
+	
+	def __init__(self):
+		self.strings: list[str] = []
+		self.reals: memoryview | None = None
+		self.symbols: list[Symbol] = []
+		self.scopes: list[SymbolTable] = []
+		self.nodes: list[Node] = []
+		self.value_codes = frozenset(TOKEN_CODES[token_type] for token_type in VALUE_TOKEN_TYPES)
+		self.value_tokens: dict[tuple[int, int, int], Token] = {}
+	
+	def read(self, buffer) -> Program:
+		with memoryview(buffer) as view:
+			sections = unpack(view=view)
+			try:
+				kinds, operands, self.reals, string_offsets, string_bytes, symbol_kinds, symbol_operands, scope_operands = sections[1:]
+				self.strings = [
+					sys.intern(str(string_bytes[string_offsets[n]:string_offsets[n + 1]], 'utf-8'))
+					for n in range(len(string_offsets) - 1)
+				]
+				procedure_records = self.read_symbols(kinds=symbol_kinds, operands=symbol_operands)
+				self.read_scopes(operands=scope_operands, innermost=sections[0])
+				program_node = self.read_nodes(kinds=kinds, operands=operands)
+			finally:
+				for section in sections[1:]: section.release()
+		for symbol, record in procedure_records:
+			symbol.procedure_node = self.nodes[record]
+		return program_node
+	
+	def read_symbols(self, kinds: memoryview, operands: memoryview) -> list[tuple[ProcedureSymbol, int]]:
+		"""
+		returns the procedure symbols and the records of their procedures, which are read later
+		"""
+		symbols = self.symbols
+		# type symbols and params may come after the symbols referring to them
+		type_ids = []
+		param_ids = []
+		procedure_records = []
+		position = 0
+		for kind in kinds:
+			name = self.strings[operands[position]]
+			type_ids.append(operands[position + 1])
+			position += 2
+			if kind == SymbolKind.VAR:
+				symbol = VarSymbol(name=name, type_symbol=None)
+				symbol.scope_level = none_if_missing(value=operands[position])
+				symbol.slot = none_if_missing(value=operands[position + 1])
+				position += 2
+			elif kind == SymbolKind.PROCEDURE:
+				symbol = ProcedureSymbol(name=name, params=[])
+				if operands[position] != NONE: procedure_records.append((symbol, operands[position]))
+				count = operands[position + 1]
+				param_ids.append((symbol, operands[position + 2:position + 2 + count].tolist()))
+				position += 2 + count
+			else:
+				symbol = BuiltinTypeSymbol(name=name)
+			symbol.symbol_id = len(symbols)
+			symbols.append(symbol)
+		for symbol, type_id in zip(symbols, type_ids):
+			if type_id != NONE: symbol.type_symbol = symbols[type_id]
+		for symbol, ids in param_ids:
+			symbol.params.extend(symbols[symbol_id] for symbol_id in ids)
+		return procedure_records
+	
+	def read_scopes(self, operands: memoryview, innermost: int):
+		symbols = self.symbols
+		position = 0
+		while position < len(operands):
+			name, level, enclosing, count = operands[position:position + 4]
+			position += 4
+			scope = SymbolTable(
+				scope_name=self.strings[name],
+				scope_level=level,
+				enclosing_scope=None if enclosing == NONE else self.scopes[enclosing]
+			)
+			# replaces the builtins the constructor adds to a global scope with the stored ones
+			scope.symbols = {}
+			for symbol_id in operands[position:position + count]:
+				symbol = symbols[symbol_id]
+				scope.symbols[symbol.name] = symbol
+			position += count
+			count = operands[position]
+			scope.slots = [symbols[symbol_id] for symbol_id in operands[position + 1:position + 1 + count]]
+			position += 1 + count
+			scope.bindings.symbols = symbols
+			self.scopes.append(scope)
+		if innermost != NONE:
+			scope = self.scopes[innermost]
+			scope.bindings.rebuild(scope=scope)
+			scope.bindings.innermost = scope
+	
+	def read_nodes(self, kinds: memoryview, operands: memoryview) -> Program:
+		"""
+		the expression and assignment records, nearly all of a program, skip the constructors and set
+		the attributes they would, in the same order: keep them in step with syntax_tree
+		"""
+		# record kinds as plain int locals, the fastest thing to compare against in the loop
+		VARIABLE = Record.VARIABLE.value
+		NUM = Record.NUM.value
+		BIN_OP = Record.BIN_OP.value
+		FIRST_TYPED = Record.INT_ADD.value
+		ASSIGNMENT_STATEMENT = Record.ASSIGNMENT_STATEMENT.value
+		UNARY = Record.UNARY.value
+		TO_REAL = Record.TO_REAL.value
+		REF = Record.REF.value
+		NONE_RECORD = Record.NONE.value
+		typed_bin_ops = {record.value: (node_class, node_class.typed_node_type) for record, node_class in TYPED_BIN_OPS.items()}
+		new = object.__new__
+		nodes = self.nodes
+		strings = self.strings
+		# a NONE index picks the trailing None
+		symbols = [*self.symbols, None]
+		shared_tokens = [SHARED_TOKENS[token_type] for token_type in TOKEN_TYPES]
+		# tokens are never modified, so one per identifier or literal is enough
+		id_tokens: dict[int, Token] = {}
+		stack: list[Node | None] = []
+		push = stack.append
+		pop_node = stack.pop
+		position = 0
+		for kind in kinds:
+			if kind == VARIABLE:
+				name = operands[position]
+				token = id_tokens.get(name)
+				if token is None: token = id_tokens[name] = Token(token_type=TokenType.ID, value=strings[name])
+				scope_level = operands[position + 1]
+				slot = operands[position + 2]
+				node = new(Variable)
+				node.node_type = 'variable'
+				node.token = token
+				node.scope_level = None if scope_level == NONE else scope_level
+				node.slot = None if slot == NONE else slot
+				node.type_symbol = symbols[operands[position + 3]]
+				position += 4
+			elif kind >= FIRST_TYPED or kind == BIN_OP:
+				code = operands[position]
+				if code in self.value_codes:
+					op, position = self.token(operands=operands, position=position)
+				else:
+					op = shared_tokens[code]
+					position += 1
+				right = pop_node()
+				if kind == BIN_OP:
+					node = new(BinOp)
+					node.node_type = 'bin_op'
+				else:
+					node_class, node_type = typed_bin_ops[kind]
+					node = new(node_class)
+					node.node_type = node_type
+				node.left = pop_node()
+				node.op = op
+				node.right = right
+				node.type_symbol = symbols[operands[position]]
+				position += 1
+			elif kind == NUM:
+				token, position = self.token(operands=operands, position=position)
+				node = new(Num)
+				node.node_type = 'num'
+				node.token = token
+				node.value = token.value
+				node.type_symbol = symbols[operands[position]]
+				position += 1
+			elif kind == ASSIGNMENT_STATEMENT:
+				expr = pop_node()
+				node = new(AssignmentStatement)
+				node.node_type = 'assignment_statement'
+				node.variable = pop_node()
+				node.expr = expr
+			elif kind == UNARY or kind == TO_REAL:
+				token, position = self.token(operands=operands, position=position)
+				node = new(Unary if kind == UNARY else ToReal)
+				node.node_type = 'unary' if kind == UNARY else 'to_real'
+				node.token = token
+				node.expr = pop_node()
+				node.type_symbol = symbols[operands[position]]
+				position += 1
+			elif kind == REF:
+				push(nodes[operands[position]])
+				position += 1
+				continue
+			elif kind == NONE_RECORD:
+				push(None)
+				continue
+			else:
+				node, position = self.read_statement(kind=kind, operands=operands, position=position, stack=stack)
+			nodes.append(node)
+			push(node)
+		if len(stack) != 1 or not isinstance(stack[0], Program): raise ValueError('records do not form one program')
+		return stack[0]
+	
+	def read_statement(self, kind: int, operands: memoryview, position: int, stack: list) -> tuple[Node, int]:
+		"""
+		the records that are few per program, built through their constructors
+		"""
+		strings = self.strings
+		if kind == Record.COMPOUND:
+			count, start, end = operands[position:position + 3]
+			node = Compound()
+			node.children = pop(stack=stack, count=count)
+			node.start = none_if_missing(value=start)
+			node.end = none_if_missing(value=end)
+			return node, position + 3
+		if kind == Record.PROCEDURE_CALL:
+			name, count, symbol_id = operands[position:position + 3]
+			token, end = self.token(operands=operands, position=position + 3)
+			node = ProcedureCall(name=strings[name], args=pop(stack=stack, count=count), token=token)
+			if symbol_id != NONE: node.procedure_symbol = self.symbols[symbol_id]
+			return node, end
+		if kind == Record.VARIABLE_DECLARATION:
+			type_node = stack.pop()
+			return VariableDeclaration(var_node=stack.pop(), type_node=type_node), position
+		if kind == Record.TYPE:
+			token, end = self.token(operands=operands, position=position)
+			return Type(token=token), end
+		if kind == Record.PARAM:
+			type_node = stack.pop()
+			return Param(var_node=stack.pop(), type_node=type_node), position
+		if kind == Record.BLOCK:
+			*declarations, compound = pop(stack=stack, count=operands[position])
+			return Block(declarations=declarations, compound_node=compound), position + 1
+		if kind == Record.PROCEDURE:
+			name, count, scope, start, end, pure = operands[position:position + 6]
+			block_node = stack.pop()
+			node = Procedure(name=strings[name], params=pop(stack=stack, count=count), block_node=block_node)
+			node.symbol_table = None if scope == NONE else self.scopes[scope]
+			node.pure = bool(pure)
+			node.start = none_if_missing(value=start)
+			node.end = none_if_missing(value=end)
+			return node, position + 6
+		if kind == Record.PROGRAM:
+			name, scope = operands[position:position + 2]
+			node = Program(name=strings[name], block_node=stack.pop())
+			node.symbol_table = None if scope == NONE else self.scopes[scope]
+			return node, position + 2
+		if kind == Record.NOOP:
+			return NoOp(), position
+		raise ValueError(f"bad record kind {kind}")
+	
+	def token(self, operands: memoryview, position: int) -> tuple[Token, int]:
+		"""
+		the token at position and the position after it
+		"""
+		code = operands[position]
+		if code not in self.value_codes: return SHARED_TOKENS[TOKEN_TYPES[code]], position + 1
+		tag = operands[position + 1]
+		value = operands[position + 2]
+		key = (code, tag, value)
+		token = self.value_tokens.get(key)
+		if token is None:
+			if tag == Value.REAL: value = self.reals[value]
+			elif tag == Value.STRING: value = self.strings[value]
+			elif tag == Value.BIG_INT: value = int(self.strings[value])
+			token = self.value_tokens[key] = Token(token_type=TOKEN_TYPES[code], value=value)
+		return token, position + 3
+
+
+def unpack(view: memoryview) -> list:
+	"""
+	[innermost scope, section views...], the views share the buffer and must be released
+	"""
+	if view.nbytes < HEADER.size: raise ValueError('too short for a serialized program')
+	magic, version, byte_order, innermost, *counts = HEADER.unpack_from(view)
+	if magic != MAGIC: raise ValueError('not a serialized program')
+	if version != FORMAT_VERSION: raise ValueError(f'format version {version}, expected {FORMAT_VERSION}')
+	if BYTE_ORDERS[byte_order] != sys.byteorder: raise ValueError(f'written on a {BYTE_ORDERS[byte_order]}-endian machine')
+	sections = [innermost]
+	offset = HEADER.size
+	with view.cast('B') as data:
+		try:
+			for (_, typecode), count in zip(SECTIONS, counts):
+				offset += -offset % 8
+				size = count * array.array(typecode).itemsize
+				if offset + size > data.nbytes: raise ValueError('truncated serialized program')
+				with data[offset:offset + size] as section:
+					sections.append(section.cast(typecode))
+				offset += size
+		except BaseException:
+			for section in sections[1:]: section.release()
+			raise
+	return sections
+
+
+@contextlib.contextmanager
+def collection_paused():
+	"""
+	a program is hundreds of thousands of objects created at once and none of them garbage, a
+	collection in between would only rescan them
+	"""
+	enabled = gc.isenabled()
+	gc.disable()
+	try:
+		yield
+	finally:
+		if enabled: gc.enable()
+
+
+def pop(stack: list, count: int) -> list:
+	if not count: return []
+	items = stack[-count:]
+	del stack[-count:]
+	return items
+
+
+def none_if_missing(value: int) -> int | None:
+	return None if value == NONE else value
+
+
+def loads(buffer) -> Program:
+	with collection_paused():
+		return ProgramReader().read(buffer=buffer)
+
+
+def load_file(path: str) -> Program:
+	"""
+	maps the file instead of reading it, the pages are only touched while the program is rebuilt
+	"""
+	with open(path, 'rb') as fp, mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as data:
+		return loads(buffer=data)
@@ -2,6 +2,8 @@ class Symbol:
 	def __init__(self, name: str, type_symbol: 'BuiltinTypeSymbol' = None):
 		self.name: str = name
 		self.type_symbol: BuiltinTypeSymbol = type_symbol
+		# stable index into ScopeBindings.symbols, set when first added to a SymbolTable
+		self.symbol_id: int | None = None
 	
 	def __str__(self):
 		class_name = self.__class__.__name__
@@ -22,24 +24,69 @@ class BuiltinTypeSymbol(Symbol):
 class VarSymbol(Symbol):
 	def __init__(self, name: str, type_symbol: BuiltinTypeSymbol):
 		super().__init__(name=name, type_symbol=type_symbol)
+		# where the variable lives at runtime, set when it is added to a SymbolTable
+		self.scope_level: int | None = None
+		self.slot: int | None = None
 
 
 class ProcedureSymbol(Symbol):
 	def __init__(self, name: str, params: list[VarSymbol]):
 		super().__init__(name=name)
 		self.params: list[VarSymbol] = params
+		# the syntax_tree.Procedure declaring it, what a call runs, set by the semantic analyzer
+		self.procedure_node = None
 	
 	def __str__(self):
 		class_name = self.__class__.__name__
 		return f'{class_name}({self.name}|None [{' '.join(str(p) for p in self.params)}])'
 
 
+class ScopeBindings:
+	"""
+	shared by every scope of one program: name -> stack of visible bindings, innermost last.
+	entering a scope pushes its symbols and leaving pops them, so the innermost open scope finds
+	any name with one dict lookup however deeply it is nested
+	"""
+	
+	def __init__(self):
+		self.stacks: dict[str, list[Symbol]] = {}
+		# every symbol ever added, indexed by symbol_id
+		self.symbols: list[Symbol] = []
+		self.innermost: SymbolTable | None = None
+	
+	def push(self, symbol: Symbol):
+		stack = self.stacks.get(symbol.name)
+		if stack is None:
+			self.stacks[symbol.name] = [symbol]
+		else:
+			stack.append(symbol)
+	
+	def pop(self, name: str):
+		stack = self.stacks[name]
+		stack.pop()
+		if not stack: del self.stacks[name]
+	
+	def rebuild(self, scope: 'SymbolTable | None'):
+		"""
+		makes the stacks those of scope's chain, for reopening a scope after its children were left
+		"""
+		self.stacks.clear()
+		chain = []
+		while scope is not None:
+			chain.append(scope)
+			scope = scope.enclosing_scope
+		for scope in reversed(chain):
+			for symbol in scope.symbols.values(): self.push(symbol=symbol)
+
+
 class SymbolTable:
 	def __init__(self, scope_name: str, scope_level: int, enclosing_scope: 'SymbolTable'):
 		self.symbols: dict[str, Symbol] = {}
+		self.slots: list[VarSymbol] = []
 		self.scope_name = scope_name
 		self.scope_level = scope_level
 		self.enclosing_scope: SymbolTable = enclosing_scope
+		self.bindings: ScopeBindings = enclosing_scope.bindings if enclosing_scope is not None else ScopeBindings()
 		if self.scope_level == 1: self.add_builtins()
 	
 	def add_builtins(self):
@@ -63,14 +110,51 @@ class SymbolTable:
 		)
 		return f"{self.scope_name}@{self.scope_level}.{enclosing_name}"
 	
+	def open(self):
+		"""
+		makes this the innermost scope, its lookups then go through the flat bindings
+		"""
+		bindings = self.bindings
+		if bindings.innermost is not self.enclosing_scope: bindings.rebuild(scope=self.enclosing_scope)
+		for symbol in self.symbols.values(): bindings.push(symbol=symbol)
+		bindings.innermost = self
+	
+	def close(self) -> 'SymbolTable':
+		"""
+		leaves this scope and returns the enclosing one, which becomes the innermost again
+		"""
+		bindings = self.bindings
+		if bindings.innermost is self:
+			for name in self.symbols: bindings.pop(name=name)
+			bindings.innermost = self.enclosing_scope
+		return self.enclosing_scope
+	
 	def add(self, symbol: Symbol):
+		if isinstance(symbol, VarSymbol):
+			symbol.scope_level = self.scope_level
+			symbol.slot = len(self.slots)
+			self.slots.append(symbol)
+		bindings = self.bindings
+		if symbol.symbol_id is None:
+			symbol.symbol_id = len(bindings.symbols)
+			bindings.symbols.append(symbol)
+		if bindings.innermost is self:
+			if symbol.name in self.symbols: bindings.pop(name=symbol.name)
+			bindings.push(symbol=symbol)
 		self.symbols[symbol.name] = symbol
 	
-	def lookup(self, name: str) -> Symbol:
-		s = self.symbols.get(name, None)
-		if s: return s
-		if self.enclosing_scope: return self.enclosing_scope.lookup(name)
-		return s
+	def lookup(self, name: str) -> Symbol | None:
+		bindings = self.bindings
+		if bindings.innermost is self:
+			stack = bindings.stacks.get(name)
+			return stack[-1] if stack else None
+		# not open, e.g. inspected after analysis: walk the chain
+		scope = self
+		while scope is not None:
+			symbol = scope.symbols.get(name)
+			if symbol is not None: return symbol
+			scope = scope.enclosing_scope
+		return None
 	
-	def local_lookup(self, name: str) -> Symbol:
+	def local_lookup(self, name: str) -> Symbol | None:
 		return self.symbols.get(name, None)
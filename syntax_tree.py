@@ -1,5 +1,7 @@
-from typing import Union
-from lexer import Token
+from typing import Callable, Union
+from lexer import Token, TokenType, SHARED_TOKENS
+from symbols import BuiltinTypeSymbol, ProcedureSymbol, SymbolTable
+from profiler import Profiler
 
 
 class Node:
@@ -8,10 +10,44 @@ class Node:
 
 
 class NodeVisitor:
+	# node class -> unbound visit_* function, built lazily and shared by all instances of a visitor class
+	dispatch_table: dict[type[Node], Callable] = {}
+	
+	def __init_subclass__(cls, **kwargs):
+		super().__init_subclass__(**kwargs)
+		cls.dispatch_table = {}
+	
 	def visit(self, node: Node):
-		node_type = node.node_type
-		visit_method = getattr(self, f'visit_{node_type}')
-		return visit_method(node)
+		try:
+			visit_method = self.dispatch_table[node.__class__]
+		except KeyError:
+			visit_method = self.resolve_visit_method(node=node)
+		return visit_method(self, node)
+	
+	def profile(self, profiler: Profiler | None):
+		"""
+		routes this instance's visits through profiler, None restores the plain class visit
+		"""
+		if profiler is None:
+			self.__dict__.pop('visit', None)
+		else:
+			self.visit = profiler.instrument(visitor=self)
+	
+	def resolve_visit_method(self, node: Node) -> Callable:
+		visitor_class = self.__class__
+		method_name = f'visit_{node.node_type}'
+		visit_method = getattr(visitor_class, method_name, None)
+		generic_node_type = getattr(node, 'generic_node_type', None)
+		if visit_method is None and generic_node_type is not None:
+			# a specialized node visitors may treat as the node it specializes
+			visit_method = getattr(visitor_class, f'visit_{generic_node_type}', None)
+		if visit_method is None:
+			raise AttributeError(
+				f"{visitor_class.__name__} has no {method_name} "
+				f"for {node.__class__.__name__} nodes"
+			)
+		visitor_class.dispatch_table[node.__class__] = visit_method
+		return visit_method
 
 
 class Program(Node):
@@ -19,6 +55,7 @@ class Program(Node):
 		super().__init__(node_type='program')
 		self.name: str = name
 		self.block_node: Block = block_node
+		self.symbol_table: SymbolTable | None = None
 
 
 class Block(Node):
@@ -41,6 +78,12 @@ class Procedure(Node):
 		self.name: str = name
 		self.params: list[Param] = params
 		self.block_node: Block = block_node
+		self.symbol_table: SymbolTable | None = None
+		# no effect outside its own activations, so a repeated call may be skipped, set by the semantic analyzer
+		self.pure = False
+		# source span from PROCEDURE to the END of its block, set by the parser
+		self.start: int | None = None
+		self.end: int | None = None
 
 
 class Param(Node):
@@ -54,6 +97,10 @@ class Variable(Node):
 	def __init__(self, token: Token):
 		super().__init__(node_type='variable')
 		self.token: Token = token
+		# resolved by the semantic analyzer
+		self.scope_level: int | None = None
+		self.slot: int | None = None
+		self.type_symbol: BuiltinTypeSymbol | None = None
 
 
 class Type(Node):
@@ -66,11 +113,24 @@ class Compound(Node):
 	def __init__(self):
 		super().__init__(node_type='compound')
 		self.children: list[Node] = []
+		# source span from BEGIN to END, set by the parser
+		self.start: int | None = None
+		self.end: int | None = None
 	
 	def add_child(self, node: Node):
 		self.children.append(node)
 
 
+class ProcedureCall(Node):
+	def __init__(self, name: str, args: list[Node], token: Token):
+		super().__init__(node_type='procedure_call')
+		self.name: str = name
+		self.args: list[Node] = args
+		self.token: Token = token
+		# resolved by the semantic analyzer
+		self.procedure_symbol: ProcedureSymbol | None = None
+
+
 class AssignmentStatement(Node):
 	def __init__(self, variable: 'Variable', expr: Node):
 		super().__init__(node_type='assignment_statement')
@@ -84,6 +144,55 @@ class BinOp(Node):
 		self.left: Node = left
 		self.op: Token = op
 		self.right: Node = right
+		# integer or real, inferred by the semantic analyzer like for every expression node
+		self.type_symbol: BuiltinTypeSymbol | None = None
+
+
+class TypedBinOp(BinOp):
+	"""
+	a BinOp whose operand types the analyzer proved, one subclass per operation and result type.
+	engines that know the subclass run its one operation directly, the others visit it as a bin_op
+	"""
+	
+	generic_node_type = 'bin_op'
+	typed_node_type: str
+	
+	def __init__(self, left: Node, op: Token, right: Node, type_symbol: BuiltinTypeSymbol):
+		super().__init__(left=left, op=op, right=right)
+		self.node_type = self.typed_node_type
+		self.type_symbol = type_symbol
+
+
+class IntAdd(TypedBinOp):
+	typed_node_type = 'int_add'
+
+
+class IntSubtract(TypedBinOp):
+	typed_node_type = 'int_subtract'
+
+
+class IntMultiply(TypedBinOp):
+	typed_node_type = 'int_multiply'
+
+
+class IntDivide(TypedBinOp):
+	typed_node_type = 'int_divide'
+
+
+class RealAdd(TypedBinOp):
+	typed_node_type = 'real_add'
+
+
+class RealSubtract(TypedBinOp):
+	typed_node_type = 'real_subtract'
+
+
+class RealMultiply(TypedBinOp):
+	typed_node_type = 'real_multiply'
+
+
+class RealDivide(TypedBinOp):
+	typed_node_type = 'real_divide'
 
 
 class Unary(Node):
@@ -91,6 +200,22 @@ class Unary(Node):
 		super().__init__(node_type='unary')
 		self.token: Token = token
 		self.expr: Node = expr
+		self.type_symbol: BuiltinTypeSymbol | None = None
+
+
+class ToReal(Unary):
+	"""
+	integer -> real promotion the analyzer puts where an integer expression is stored in a real
+	variable or parameter. its token is a unary plus, so engines that do not know it pass the value on
+	as it is
+	"""
+	
+	generic_node_type = 'unary'
+	
+	def __init__(self, expr: Node, type_symbol: BuiltinTypeSymbol):
+		super().__init__(token=SHARED_TOKENS[TokenType.ADD], expr=expr)
+		self.node_type = 'to_real'
+		self.type_symbol = type_symbol
 
 
 class Num(Node):
@@ -98,8 +223,81 @@ class Num(Node):
 		super().__init__(node_type='num')
 		self.token: Token = token
 		self.value: int = token.value
+		self.type_symbol: BuiltinTypeSymbol | None = None
 
 
 class NoOp(Node):
 	def __init__(self):
 		super().__init__(node_type='noop')
+
+
+class NodeBuilder:
+	"""
+	the node constructors the parser calls, arena.Arena offers the same methods returning int handles
+	"""
+	
+	# stands in for an operand the parser found nothing for
+	missing = None
+	
+	@staticmethod
+	def program(name: str, block_node: Block) -> Program:
+		return Program(name=name, block_node=block_node)
+	
+	@staticmethod
+	def block(declarations: list[VariableDeclaration | Procedure], compound_node: Compound) -> Block:
+		return Block(declarations=declarations, compound_node=compound_node)
+	
+	@staticmethod
+	def variable_declaration(var_node: Variable, type_node: Type) -> VariableDeclaration:
+		return VariableDeclaration(var_node=var_node, type_node=type_node)
+	
+	@staticmethod
+	def procedure(name: str, params: list[Param], block_node: Block, start: int, end: int) -> Procedure:
+		procedure_node = Procedure(name=name, params=params, block_node=block_node)
+		procedure_node.start = start
+		procedure_node.end = end
+		return procedure_node
+	
+	@staticmethod
+	def param(var_node: Variable, type_node: Type) -> Param:
+		return Param(var_node=var_node, type_node=type_node)
+	
+	@staticmethod
+	def variable(token: Token) -> Variable:
+		return Variable(token=token)
+	
+	@staticmethod
+	def type(token: Token) -> Type:
+		return Type(token=token)
+	
+	@staticmethod
+	def compound(children: list[Node], start: int, end: int) -> Compound:
+		compound_node = Compound()
+		for node in children: compound_node.add_child(node)
+		compound_node.start = start
+		compound_node.end = end
+		return compound_node
+	
+	@staticmethod
+	def procedure_call(name: str, args: list[Node], token: Token) -> ProcedureCall:
+		return ProcedureCall(name=name, args=args, token=token)
+	
+	@staticmethod
+	def assignment_statement(variable: Variable, expr: Node) -> AssignmentStatement:
+		return AssignmentStatement(variable=variable, expr=expr)
+	
+	@staticmethod
+	def bin_op(left: Node, op: Token, right: Node) -> BinOp:
+		return BinOp(left=left, op=op, right=right)
+	
+	@staticmethod
+	def unary(token: Token, expr: Node) -> Unary:
+		return Unary(token=token, expr=expr)
+	
+	@staticmethod
+	def num(token: Token) -> Num:
+		return Num(token=token)
+	
+	@staticmethod
+	def noop() -> NoOp:
+		return NoOp()
@@ -0,0 +1,93 @@
+import contextlib
+import io
+import unittest
+
+from parser import Parser
+from semantic_analyzer import SemanticAnalyzer
+from interpreter import Interpreter
+from arena import Arena
+from arena_interpreter import ArenaAnalyzer, ArenaInterpreter
+from syntax_tree import Node, Program, Procedure, ProcedureCall
+
+NESTED_CALLS = """program t;
+var total, n : integer; r : real;
+procedure add(k : integer);
+begin total := total + k end;
+procedure countdown(k : integer);
+var half : real;
+  procedure step(m : integer);
+  var unused : integer;
+  begin half := m / 2; r := r + half; add(m) end;
+begin step(k); step(k - 1); add(k) end;
+procedure square(k : integer);
+var s : integer;
+begin s := k * k end;
+begin
+  total := 0; r := 0; n := 3;
+  countdown(n); square(n); add(n + 1)
+end.
+"""
+
+
+def nodes(node: Node) -> list[Node]:
+	found = []
+	pending = [node]
+	while pending:
+		current = pending.pop()
+		found.append(current)
+		pending.extend(child for child in vars(current).values() if isinstance(child, Node))
+		for value in vars(current).values():
+			if isinstance(value, list): pending.extend(child for child in value if isinstance(child, Node))
+	return found
+
+
+def run(program_node: Program) -> dict:
+	interpreter = Interpreter()
+	interpreter.visit(node=program_node)
+	return interpreter.state
+
+
+class ArenaTest(unittest.TestCase):
+	def setUp(self):
+		# the analyzers print every scope they leave
+		self.enterContext(contextlib.redirect_stdout(io.StringIO()))
+		self.program_node = Parser(text=NESTED_CALLS).parse()
+		SemanticAnalyzer().analyze(program_node=self.program_node)
+	
+	def test_round_trip_runs_like_the_original(self):
+		rebuilt = Arena.from_node(program_node=self.program_node).to_node()
+		self.assertIsNot(rebuilt, self.program_node)
+		self.assertEqual(run(program_node=rebuilt), run(program_node=self.program_node))
+	
+	def test_round_trip_keeps_purity(self):
+		rebuilt = Arena.from_node(program_node=self.program_node).to_node()
+		original = {node.name: node.pure for node in nodes(node=self.program_node) if isinstance(node, Procedure)}
+		found = {node.name: node.pure for node in nodes(node=rebuilt) if isinstance(node, Procedure)}
+		self.assertEqual(found, original)
+		self.assertTrue(found['square'])
+		self.assertFalse(found['add'])
+	
+	def test_rebuilt_calls_run_rebuilt_procedures(self):
+		rebuilt = Arena.from_node(program_node=self.program_node).to_node()
+		procedures = {id(node) for node in nodes(node=rebuilt) if isinstance(node, Procedure)}
+		calls = [node for node in nodes(node=rebuilt) if isinstance(node, ProcedureCall)]
+		self.assertEqual(len(calls), 7)
+		for call in calls: self.assertIn(id(call.procedure_symbol.procedure_node), procedures)
+		# the tree the arena was written from keeps its own
+		originals = {id(node) for node in nodes(node=self.program_node) if isinstance(node, Procedure)}
+		for call in nodes(node=self.program_node):
+			if isinstance(call, ProcedureCall): self.assertIn(id(call.procedure_symbol.procedure_node), originals)
+	
+	def test_arena_analysis_matches_the_tree(self):
+		arena = Arena()
+		Parser(text=NESTED_CALLS, arena=arena).parse()
+		ArenaAnalyzer(arena=arena).analyze()
+		interpreter = ArenaInterpreter(arena=arena)
+		interpreter.interpret()
+		expected = run(program_node=self.program_node)
+		self.assertEqual(interpreter.state, expected)
+		self.assertEqual(run(program_node=arena.to_node()), expected)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,130 @@
+import contextlib
+import io
+import unittest
+
+from parser import Parser
+from semantic_analyzer import SemanticAnalyzer
+from interpreter import ActivationPool, Interpreter
+from closure_compiler import ClosureCompiler, ClosureInterpreter
+from python_compiler import PythonInterpreter
+from register_vm import RegisterInterpreter
+from arena import Arena
+from arena_interpreter import ArenaAnalyzer, ArenaInterpreter
+from syntax_tree import AssignmentStatement, ProcedureCall, Program
+
+# q reaches x one level out and total two levels out, r calls its sibling q from one level deeper
+STATIC_LINKS = """program s;
+var total : integer; r : real;
+procedure outer(k : integer);
+var x : integer;
+  procedure q(m : integer);
+  begin x := x + m; total := total + x end;
+  procedure deeper(m : integer);
+  var y : integer;
+    procedure r2;
+    begin q(m * 10); y := x end;
+  begin y := 0; r2; total := total + y end;
+begin x := k; q(1); deeper(2); r := x / 4 end;
+begin total := 0; outer(1); outer(3) end.
+"""
+
+
+def analyze(text: str) -> Program:
+	program_node = Parser(text=text).parse()
+	SemanticAnalyzer().analyze(program_node=program_node)
+	return program_node
+
+
+def run(program_node: Program, memoize: bool = True) -> dict:
+	interpreter = Interpreter(memoize=memoize)
+	interpreter.visit(node=program_node)
+	return interpreter.state
+
+
+class ProcedureCallTest(unittest.TestCase):
+	def setUp(self):
+		# the analyzers and engines print every scope they leave and the final state
+		self.enterContext(contextlib.redirect_stdout(io.StringIO()))
+	
+	def test_static_links_reach_enclosing_records(self):
+		# outer(1): x 2 total 2, x 22 total 24 y 22 total 46, r 5.5; outer(3): x 4 total 50, x 24 total 74 + 24
+		self.assertEqual(run(program_node=analyze(text=STATIC_LINKS)), {'total': 98, 'r': 6.0})
+	
+	def test_engines_agree_with_the_tree_engine(self):
+		expected = run(program_node=analyze(text=STATIC_LINKS))
+		for engine in [ClosureInterpreter, PythonInterpreter, RegisterInterpreter]:
+			interpreter = engine()
+			interpreter.interpret(program_node=analyze(text=STATIC_LINKS))
+			self.assertEqual(interpreter.state, expected, engine.__name__)
+		arena = Arena()
+		Parser(text=STATIC_LINKS, arena=arena).parse()
+		ArenaAnalyzer(arena=arena).analyze()
+		interpreter = ArenaInterpreter(arena=arena)
+		interpreter.interpret()
+		self.assertEqual(interpreter.state, expected)
+	
+	def test_compilers_reject_calls(self):
+		with self.assertRaises(AttributeError):
+			ClosureCompiler().compile(program_node=analyze(text=STATIC_LINKS))
+	
+	def test_released_records_are_blank(self):
+		pool = ActivationPool(size=3)
+		link = [None]
+		record = pool.acquire(static_link=link)
+		self.assertEqual(record, [link, None, None, None])
+		record[1:] = [1, 2.5, 3]
+		pool.release(record=record)
+		reused = pool.acquire(static_link=None)
+		self.assertIs(reused, record)
+		self.assertEqual(reused, [None, None, None, None])
+	
+	def test_unassigned_local_reads_fresh_on_every_call(self):
+		# t is assigned after it is read, a reused record that kept it would add the previous call's t
+		text = """program u;
+var total : integer;
+procedure p(n : integer);
+var t : integer;
+begin total := total + n; t := total end;
+begin total := 0; p(1); p(2); p(3) end.
+"""
+		self.assertEqual(run(program_node=analyze(text=text), memoize=False), {'total': 6})
+	
+	def test_statement_is_assignment_only_before_assign(self):
+		text = """program a;
+var p2 : integer;
+procedure p;
+begin p2 := p2 + 1 end;
+begin p2 := 1; p; p2 := p2 * 5; p() end.
+"""
+		program_node = analyze(text=text)
+		children = program_node.block_node.compound.children
+		self.assertEqual(
+			[type(child) for child in children],
+			[AssignmentStatement, ProcedureCall, AssignmentStatement, ProcedureCall]
+		)
+		self.assertEqual(run(program_node=program_node), {'p2': 11})
+	
+	def test_names_must_be_used_as_declared(self):
+		declarations = 'var v : integer;\nprocedure p;\nbegin v := 1 end;\n'
+		with self.assertRaisesRegex(Exception, 'p is not a variable'):
+			analyze(text=f'program e;\n{declarations}begin p := 1 end.\n')
+		with self.assertRaisesRegex(Exception, 'v is not a procedure'):
+			analyze(text=f'program e;\n{declarations}begin v end.\n')
+		with self.assertRaises(NameError):
+			analyze(text=f'program e;\n{declarations}begin w(1) end.\n')
+	
+	def test_argument_count_and_types(self):
+		declarations = 'var r : real;\nprocedure p(n : integer; x : real);\nbegin r := n + x end;\n'
+		with self.assertRaisesRegex(Exception, 'p takes 2 arguments, got 1'):
+			analyze(text=f'program e;\n{declarations}begin p(1) end.\n')
+		with self.assertRaisesRegex(Exception, 'argument 1 of p is real, expected integer'):
+			analyze(text=f'program e;\n{declarations}begin p(1.5, 2) end.\n')
+		# an integer argument widens to a real parameter
+		program_node = analyze(text=f'program e;\n{declarations}begin p(1, 2) end.\n')
+		state = run(program_node=program_node)
+		self.assertEqual(state, {'r': 3})
+		self.assertIsInstance(state['r'], float)
+
+
+if __name__ == '__main__':
+	unittest.main()
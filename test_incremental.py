@@ -0,0 +1,123 @@
+import contextlib
+import io
+import random
+import unittest
+
+from parser import Parser
+from semantic_analyzer import SemanticAnalyzer
+from interpreter import Interpreter
+from incremental import IncrementalParser
+from syntax_tree import Program, Procedure
+
+SIBLINGS = """program t;
+var g : integer;
+procedure a(n : integer);
+begin g := n end;
+procedure b(n : integer);
+begin g := n + 1 end;
+begin a(1) end.
+"""
+
+# c's body can only see the global b, a's own b is declared after it
+SHADOWED = """program t;
+var g : integer;
+procedure b(n : integer);
+begin g := n end;
+procedure a(n : integer);
+var x : integer;
+  procedure c(m : integer);
+  begin g := m + 1 end;
+  procedure b(n : integer);
+  begin g := n * 100 end;
+begin b(n); c(n) end;
+begin a(2) end.
+"""
+
+
+def full_parse(text: str) -> Program:
+	program_node = Parser(text=text).parse()
+	SemanticAnalyzer().analyze(program_node=program_node)
+	return program_node
+
+
+def run(program_node: Program) -> dict:
+	interpreter = Interpreter()
+	interpreter.visit(node=program_node)
+	return interpreter.state
+
+
+def purity(program_node: Program) -> dict[str, bool]:
+	found = {}
+	pending = list(program_node.block_node.declarations)
+	while pending:
+		node = pending.pop()
+		if isinstance(node, Procedure):
+			found[node.name] = node.pure
+			pending.extend(node.block_node.declarations)
+	return found
+
+
+class IncrementalParserTest(unittest.TestCase):
+	def setUp(self):
+		# the analyzer prints every scope it leaves
+		self.enterContext(contextlib.redirect_stdout(io.StringIO()))
+	
+	def edit(self, text: str, old: str, new: str, after: str = '') -> tuple[IncrementalParser, str]:
+		incremental = IncrementalParser(text=text)
+		start = text.index(old, text.index(after))
+		incremental.edit(start=start, end=start + len(old), replacement=new)
+		return incremental, text[:start] + new + text[start + len(old):]
+	
+	def assert_matches_full_parse(self, incremental: IncrementalParser, text: str):
+		self.assertEqual(incremental.text, text)
+		expected = full_parse(text=text)
+		self.assertEqual(run(program_node=incremental.program), run(program_node=expected))
+		self.assertEqual(purity(program_node=incremental.program), purity(program_node=expected))
+	
+	def test_call_to_later_sibling_fails_like_a_full_parse(self):
+		incremental = IncrementalParser(text=SIBLINGS)
+		start = SIBLINGS.index('g := n end')
+		with self.assertRaises(NameError) as local:
+			incremental.edit(start=start, end=start + len('g := n'), replacement='b(n)')
+		text = SIBLINGS[:start] + 'b(n)' + SIBLINGS[start + len('g := n'):]
+		with self.assertRaises(NameError) as full:
+			full_parse(text=text)
+		self.assertEqual(str(local.exception), str(full.exception))
+	
+	def test_call_to_earlier_sibling_reparses_locally(self):
+		incremental, text = self.edit(text=SIBLINGS, old='g := n + 1', new='a(n * 3)')
+		self.assertLess(incremental.reparsed_length, len(text))
+		self.assertEqual(run(program_node=incremental.program), {'g': 1})
+		self.assert_matches_full_parse(incremental=incremental, text=text)
+	
+	def test_call_resolves_to_the_procedure_declared_before_it(self):
+		incremental, text = self.edit(text=SHADOWED, old='g := m + 1', new='b(m)')
+		# the global b, a full parse never sees a's own b from inside c
+		self.assertEqual(run(program_node=incremental.program), {'g': 2})
+		self.assert_matches_full_parse(incremental=incremental, text=text)
+	
+	def test_statement_edit_reparses_locally(self):
+		incremental, text = self.edit(text=SHADOWED, old='b(n); c(n)', new='c(n); b(n)')
+		self.assertLess(incremental.reparsed_length, len(text))
+		self.assertEqual(run(program_node=incremental.program), {'g': 200})
+		self.assert_matches_full_parse(incremental=incremental, text=text)
+	
+	def test_edit_sequence_matches_full_parse(self):
+		rng = random.Random(12)
+		bodies = ['g := n', 'g := n + 1']
+		template = 'program t;\nvar g : integer;\nprocedure a(n : integer);\nvar x : integer;\nbegin {} end;\n'
+		template += 'procedure b(n : integer);\nbegin {} end;\nbegin g := 0; a(1); b(2) end.\n'
+		choices = [['g := n', 'x := n * 2', 'g := g + n'], ['g := n + 1', 'a(n)', 'g := g * 2', 'a(g)']]
+		incremental = IncrementalParser(text=template.format(*bodies))
+		for _ in range(40):
+			which = rng.randrange(2)
+			new = rng.choice(choices[which])
+			text = incremental.text
+			start = text.index('begin ', text.index(f'procedure {"ab"[which]}(')) + len('begin ')
+			incremental.edit(start=start, end=start + len(bodies[which]), replacement=new)
+			bodies[which] = new
+			self.assert_matches_full_parse(incremental=incremental, text=template.format(*bodies))
+
+
+if __name__ == '__main__':
+	unittest.main()
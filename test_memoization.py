@@ -0,0 +1,96 @@
+import contextlib
+import io
+import unittest
+
+from parser import Parser
+from semantic_analyzer import SemanticAnalyzer
+from interpreter import Interpreter, MemoTable
+from syntax_tree import Node, Program, Procedure
+
+PURITY = """program m;
+var total : integer;
+procedure local(n : integer);
+var t : integer;
+begin t := n * n end;
+procedure reads(n : integer);
+var t : integer;
+begin t := total + n end;
+procedure caller(n : integer);
+begin local(n); reads(n) end;
+procedure outer(n : integer);
+var x : integer;
+  procedure inner(m : integer);
+  begin x := x + m end;
+begin x := n; inner(1); inner(x) end;
+begin total := 1; local(2); local(2); caller(3); outer(4); outer(4); local(2) end.
+"""
+
+
+def analyze(text: str) -> Program:
+	program_node = Parser(text=text).parse()
+	SemanticAnalyzer().analyze(program_node=program_node)
+	return program_node
+
+
+def procedures(node: Node) -> dict[str, Procedure]:
+	found = {}
+	pending = list(node.block_node.declarations)
+	while pending:
+		current = pending.pop()
+		if isinstance(current, Procedure):
+			found[current.name] = current
+			pending.extend(current.block_node.declarations)
+	return found
+
+
+class MemoizationTest(unittest.TestCase):
+	def setUp(self):
+		# the analyzer prints every scope it leaves
+		self.enterContext(contextlib.redirect_stdout(io.StringIO()))
+	
+	def test_purity_follows_what_calls_touch(self):
+		purity = {name: procedure.pure for name, procedure in procedures(node=analyze(text=PURITY)).items()}
+		# inner writes outer's local, which is fresh per call of outer
+		self.assertEqual(purity, {'local': True, 'reads': False, 'caller': False, 'outer': True, 'inner': False})
+	
+	def test_memoized_runs_match_plain_runs(self):
+		program_node = analyze(text=PURITY)
+		plain = Interpreter(memoize=False)
+		plain.visit(node=program_node)
+		memoized = Interpreter()
+		memoized.visit(node=program_node)
+		self.assertEqual(memoized.state, plain.state)
+		hits = {symbol.name: memo.hits for symbol, memo in memoized.memos.items()}
+		# local(2) three times from the program, local(3) once through caller
+		self.assertEqual(hits, {'local': 2, 'outer': 1})
+	
+	def test_calls_that_raise_are_not_remembered(self):
+		text = """program z;
+var total : integer;
+procedure divide(n : integer);
+var t : integer;
+begin t := 1 div n end;
+begin total := 0; divide(0) end.
+"""
+		program_node = analyze(text=text)
+		interpreter = Interpreter()
+		for _ in range(2):
+			with self.assertRaises(ZeroDivisionError):
+				interpreter.visit(node=program_node)
+		memo, = interpreter.memos.values()
+		self.assertEqual(len(memo.entries), 0)
+		self.assertEqual(memo.hits, 0)
+	
+	def test_memo_table_drops_the_least_recently_used(self):
+		memo = MemoTable(size=2)
+		memo.add(key=(1, int))
+		memo.add(key=(2, int))
+		self.assertTrue(memo.lookup(key=(1, int)))
+		memo.add(key=(3, int))
+		self.assertFalse(memo.lookup(key=(2, int)))
+		self.assertTrue(memo.lookup(key=(1, int)))
+		self.assertEqual((memo.hits, memo.misses), (2, 1))
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,108 @@
+import contextlib
+import io
+import unittest
+
+from parser import Parser
+from semantic_analyzer import SemanticAnalyzer
+from interpreter import Interpreter
+from profiler import Profiler
+
+TWO_PROCEDURES = """program c;
+var total : integer;
+procedure p(n : integer);
+var t : integer;
+begin
+  t := n * 2;
+  total := total + t
+end;
+procedure q(n : integer);
+begin
+  total := total - n;
+  p(n + 1)
+end;
+begin
+  total := 0;
+  p(1);
+  q(2);
+  q(3)
+end.
+"""
+
+NESTED_EXPRESSIONS = """program e;
+var a, b : integer;
+begin
+  a := 1 + 2 * (3 - 4);
+  b := a * (a * (a - 1))
+end.
+"""
+
+
+class ProfilerTest(unittest.TestCase):
+	def profile(self, text: str) -> Profiler:
+		program_node = Parser(text=text).parse()
+		with contextlib.redirect_stdout(io.StringIO()):
+			SemanticAnalyzer().analyze(program_node=program_node)
+		profiler = Profiler()
+		interpreter = Interpreter(memoize=False)
+		interpreter.profile(profiler=profiler)
+		interpreter.visit(node=program_node)
+		return profiler
+	
+	def test_calls_open_the_callee_context(self):
+		profiler = self.profile(text=TWO_PROCEDURES)
+		stacks = set(profiler.stacks)
+		self.assertIn('program:c;block;compound;procedure:p;block;compound;assignment_statement', stacks)
+		self.assertIn('program:c;block;compound;procedure:q;block;compound;assignment_statement', stacks)
+		self.assertIn('program:c;block;compound;procedure:q;block;compound;procedure:p;block;compound', stacks)
+		self.assertFalse(any('procedure_call' in path for path in stacks))
+	
+	def test_callee_bodies_count_toward_their_procedure(self):
+		profiler = self.profile(text=TWO_PROCEDURES)
+		procedures = profiler.report()['procedures']
+		# p runs 2 assignments per call and is called 3 times, q runs 1 per call and is called twice
+		assignments = profiler.node_types['assignment_statement'].count
+		self.assertEqual(assignments, 1 + 3 * 2 + 2 * 1)
+		# program, block, the variable declaration, the main compound and its one assignment
+		self.assertEqual(procedures['program:c']['count'], 6)
+		self.assertGreater(procedures['procedure:q']['total'], procedures['procedure:q']['self'])
+		self.assertEqual(profiler.node_types['procedure_call'].count, 5)
+		# declarations and calls share one context per procedure
+		self.assertEqual(set(procedures), {'program:c', 'procedure:p', 'procedure:q'})
+	
+	def test_only_the_profiled_instance_pays(self):
+		interpreter = Interpreter()
+		interpreter.profile(profiler=Profiler())
+		self.assertIn('visit', vars(interpreter))
+		self.assertNotIn('visit', vars(Interpreter()))
+		interpreter.profile(profiler=None)
+		self.assertNotIn('visit', vars(interpreter))
+	
+	def test_counts_match_the_tree(self):
+		profiler = self.profile(text=NESTED_EXPRESSIONS)
+		counts = {name: stats.count for name, stats in profiler.node_types.items()}
+		# BinOps run as the typed operations the analyzer specialized them to
+		self.assertEqual(counts['int_multiply'], 3)
+		self.assertEqual(counts['int_subtract'], 2)
+		self.assertEqual(counts['int_add'], 1)
+		self.assertEqual(counts['assignment_statement'], 2)
+		# the three reads of a, assigned variables are not visited
+		self.assertEqual(counts['variable'], 3)
+		self.assertEqual(counts['num'], 5)
+		self.assertEqual(set(profiler.report()['procedures']), {'program:e'})
+	
+	def test_recursive_totals_stay_within_wall_time(self):
+		profiler = self.profile(text=NESTED_EXPRESSIONS)
+		program_total = profiler.node_types['program'].total_time
+		# the nested multiplications add only the outermost visit to the total
+		multiply = profiler.node_types['int_multiply']
+		self.assertLessEqual(multiply.total_time, program_total)
+		self.assertLessEqual(multiply.self_time, multiply.total_time)
+		self.assertLessEqual(sum(stats.self_time for stats in profiler.node_types.values()), program_total)
+		for line in profiler.collapsed_stacks().splitlines():
+			path, micros = line.rsplit(' ', 1)
+			self.assertTrue(path.startswith('program:e'))
+			self.assertGreaterEqual(int(micros), 1)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,79 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from parser import Parser
+from semantic_analyzer import SemanticAnalyzer
+from interpreter import Interpreter
+from program_cache import ProgramCache, CACHE_SUFFIX
+from syntax_tree import Program
+
+PROGRAM = """program c;
+var total : integer; r : real;
+procedure add(n : integer);
+begin total := total + n; r := total / 2 end;
+begin total := 1; add(2); add(total * 3) end.
+"""
+
+
+def analyze(text: str) -> Program:
+	program_node = Parser(text=text).parse()
+	SemanticAnalyzer().analyze(program_node=program_node)
+	return program_node
+
+
+def run(program_node: Program) -> dict:
+	interpreter = Interpreter()
+	interpreter.visit(node=program_node)
+	return interpreter.state
+
+
+class ProgramCacheTest(unittest.TestCase):
+	def setUp(self):
+		# the analyzer prints every scope it leaves
+		self.enterContext(contextlib.redirect_stdout(io.StringIO()))
+		self.cache_dir = self.enterContext(tempfile.TemporaryDirectory())
+		self.cache = ProgramCache(cache_dir=self.cache_dir)
+	
+	def test_hit_runs_like_a_fresh_analysis(self):
+		self.assertIsNone(self.cache.load(text=PROGRAM))
+		self.cache.store(text=PROGRAM, program_node=analyze(text=PROGRAM))
+		cached = self.cache.load(text=PROGRAM)
+		self.assertIsNotNone(cached)
+		self.assertEqual(run(program_node=cached), run(program_node=analyze(text=PROGRAM)))
+		self.assertEqual(run(program_node=cached), {'total': 12, 'r': 6.0})
+	
+	def test_key_follows_the_source(self):
+		self.cache.store(text=PROGRAM, program_node=analyze(text=PROGRAM))
+		edited = PROGRAM.replace('add(2)', 'add(5)')
+		self.assertNotEqual(self.cache.key(text=edited), self.cache.key(text=PROGRAM))
+		self.assertIsNone(self.cache.load(text=edited))
+	
+	def test_unreadable_entry_is_dropped(self):
+		self.cache.store(text=PROGRAM, program_node=analyze(text=PROGRAM))
+		path = self.cache.path(text=PROGRAM)
+		with open(path, 'r+b') as fp: fp.truncate(40)
+		self.assertIsNone(self.cache.load(text=PROGRAM))
+		self.assertFalse(os.path.exists(path))
+	
+	def test_eviction_keeps_the_most_recent_entries(self):
+		texts = [PROGRAM.replace('add(2)', f'add({n})') for n in range(4)]
+		for n, text in enumerate(texts):
+			self.cache.store(text=text, program_node=analyze(text=text))
+			# mtimes are the recency, keep them apart on coarse filesystem clocks
+			os.utime(self.cache.path(text=text), (n * 10, n * 10))
+		self.cache.max_size = 2 * os.path.getsize(self.cache.path(text=texts[0]))
+		self.cache.evict()
+		names = sorted(entry.name for entry in self.cache.entries())
+		self.assertEqual(names, sorted(self.cache.key(text=text) + CACHE_SUFFIX for text in texts[2:]))
+	
+	def test_clear(self):
+		self.cache.store(text=PROGRAM, program_node=analyze(text=PROGRAM))
+		self.cache.clear()
+		self.assertEqual(self.cache.entries(), [])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,102 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from parser import Parser
+from semantic_analyzer import SemanticAnalyzer
+from interpreter import Interpreter
+import serialization
+from syntax_tree import Node, Program, Procedure, ProcedureCall
+
+PROGRAM = """program b;
+var total : integer; r : real;
+procedure add(n : integer; x : real);
+var t : real;
+  procedure twice(m : integer);
+  begin t := t + m * 2 end;
+begin t := x; twice(n); total := total + n; r := r + t / 4 end;
+procedure square(n : integer);
+var s : integer;
+begin s := n * n end;
+begin total := 0; r := 0.5; add(1, 2); add(total + 2, -1.25); square(7) end.
+"""
+
+
+def analyze(text: str) -> Program:
+	program_node = Parser(text=text).parse()
+	SemanticAnalyzer().analyze(program_node=program_node)
+	return program_node
+
+
+def run(program_node: Program) -> dict:
+	interpreter = Interpreter()
+	interpreter.visit(node=program_node)
+	return interpreter.state
+
+
+def nodes(node: Node) -> list[Node]:
+	found = []
+	pending = [node]
+	while pending:
+		current = pending.pop()
+		found.append(current)
+		for value in vars(current).values():
+			if isinstance(value, Node): pending.append(value)
+			elif isinstance(value, list): pending.extend(child for child in value if isinstance(child, Node))
+	return found
+
+
+class SerializationTest(unittest.TestCase):
+	def setUp(self):
+		# the analyzer prints every scope it leaves
+		self.enterContext(contextlib.redirect_stdout(io.StringIO()))
+		self.program_node = analyze(text=PROGRAM)
+		self.data = serialization.dumps(program_node=self.program_node)
+	
+	def test_loaded_program_runs_like_the_original(self):
+		loaded = serialization.loads(buffer=self.data)
+		self.assertEqual(run(program_node=loaded), run(program_node=self.program_node))
+	
+	def test_nodes_and_analysis_survive(self):
+		loaded = serialization.loads(buffer=self.data)
+		original = nodes(node=self.program_node)
+		found = nodes(node=loaded)
+		self.assertEqual(
+			sorted(type(node).__name__ for node in found),
+			sorted(type(node).__name__ for node in original)
+		)
+		procedures = {node.name: node for node in found if isinstance(node, Procedure)}
+		for node in original:
+			if isinstance(node, Procedure):
+				self.assertEqual(procedures[node.name].pure, node.pure)
+				self.assertEqual((procedures[node.name].start, procedures[node.name].end), (node.start, node.end))
+		# calls run the loaded procedures, not the ones that were written
+		for node in found:
+			if isinstance(node, ProcedureCall):
+				self.assertIs(node.procedure_symbol.procedure_node, procedures[node.name])
+	
+	def test_rewriting_a_loaded_program_gives_the_same_bytes(self):
+		self.assertEqual(serialization.dumps(program_node=serialization.loads(buffer=self.data)), self.data)
+	
+	def test_load_file_maps_the_file(self):
+		with tempfile.TemporaryDirectory() as directory:
+			path = os.path.join(directory, 'b.program')
+			with open(path, 'wb') as fp: fp.write(self.data)
+			self.assertEqual(run(program_node=serialization.load_file(path=path)), run(program_node=self.program_node))
+	
+	def test_foreign_data_is_rejected(self):
+		with self.assertRaisesRegex(ValueError, 'not a serialized program'):
+			serialization.loads(buffer=b'XXXX' + self.data[4:])
+		with self.assertRaisesRegex(ValueError, 'format version'):
+			version = (serialization.FORMAT_VERSION + 1).to_bytes(2, 'little')
+			serialization.loads(buffer=self.data[:4] + version + self.data[6:])
+		with self.assertRaisesRegex(ValueError, 'truncated'):
+			serialization.loads(buffer=self.data[:len(self.data) // 2])
+		with self.assertRaisesRegex(ValueError, 'too short'):
+			serialization.loads(buffer=self.data[:8])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,88 @@
+import contextlib
+import io
+import unittest
+
+from parser import Parser
+from semantic_analyzer import SemanticAnalyzer
+from interpreter import Interpreter
+from closure_compiler import ClosureInterpreter
+from python_compiler import PythonInterpreter
+from register_vm import RegisterInterpreter
+from optimizer import ConstantFolder
+from syntax_tree import IntAdd, IntMultiply, Num, Program, RealAdd, RealDivide, RealMultiply, ToReal
+
+MIXED = """program t;
+var i, j : integer; r, s : real;
+begin
+  i := 1 + 2;
+  r := i / 2;
+  s := i + 1.5;
+  r := i * 2;
+  j := i div 2 * 3;
+  s := r * 0.5 - (j - 1)
+end.
+"""
+
+
+def analyze(text: str) -> Program:
+	program_node = Parser(text=text).parse()
+	SemanticAnalyzer().analyze(program_node=program_node)
+	return program_node
+
+
+class TypeInferenceTest(unittest.TestCase):
+	def setUp(self):
+		# the analyzer and engines print every scope they leave and the final state
+		self.enterContext(contextlib.redirect_stdout(io.StringIO()))
+	
+	def test_operations_are_specialized_by_type(self):
+		first, second, third, fourth, *_ = analyze(text=MIXED).block_node.compound.children
+		self.assertIsInstance(first.expr, IntAdd)
+		self.assertIsInstance(second.expr, RealDivide)
+		self.assertIsInstance(third.expr, RealAdd)
+		# an integer product stored in a real is computed as an integer and promoted once
+		self.assertIsInstance(fourth.expr, ToReal)
+		self.assertIsInstance(fourth.expr.expr, IntMultiply)
+	
+	def test_real_variables_hold_floats(self):
+		interpreter = Interpreter()
+		interpreter.visit(node=analyze(text=MIXED))
+		self.assertEqual(interpreter.state, {'i': 3, 'j': 3, 'r': 6.0, 's': 1.0})
+		self.assertIs(type(interpreter.state['i']), int)
+		self.assertIs(type(interpreter.state['r']), float)
+		self.assertIs(type(interpreter.state['s']), float)
+	
+	def test_engines_agree_with_the_tree_engine(self):
+		expected = Interpreter()
+		expected.visit(node=analyze(text=MIXED))
+		for engine in [ClosureInterpreter, PythonInterpreter, RegisterInterpreter]:
+			interpreter = engine()
+			interpreter.interpret(program_node=analyze(text=MIXED))
+			self.assertEqual(interpreter.state, expected.state, engine.__name__)
+			for name, value in interpreter.state.items():
+				self.assertIs(type(value), type(expected.state[name]), f'{engine.__name__} {name}')
+	
+	def test_folding_keeps_types(self):
+		program_node = analyze(text='program f;\nvar r : real;\nbegin r := 2 * 3; r := r * (1 + 1) end.\n')
+		ConstantFolder().optimize(program_node=program_node)
+		first, second = program_node.block_node.compound.children
+		# the promotion folds into the constant
+		self.assertIsInstance(first.expr, Num)
+		self.assertIs(type(first.expr.value), float)
+		self.assertEqual(first.expr.type_symbol.name, 'real')
+		self.assertIsInstance(second.expr, RealMultiply)
+		interpreter = Interpreter()
+		interpreter.visit(node=program_node)
+		self.assertEqual(interpreter.state, {'r': 12.0})
+		self.assertIs(type(interpreter.state['r']), float)
+	
+	def test_type_errors(self):
+		declarations = 'var i : integer; r : real;\n'
+		with self.assertRaisesRegex(Exception, 'cannot assign real to integer i'):
+			analyze(text=f'program e;\n{declarations}begin i := 4 / 2 end.\n')
+		with self.assertRaisesRegex(Exception, 'div takes integers, got real div integer'):
+			analyze(text=f'program e;\n{declarations}begin r := 1.5; i := r div 2 end.\n')
+
+
+if __name__ == '__main__':
+	unittest.main()
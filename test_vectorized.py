@@ -0,0 +1,80 @@
+import contextlib
+import io
+import unittest
+
+from parser import Parser
+from semantic_analyzer import SemanticAnalyzer
+from interpreter import Interpreter
+from vectorized import VectorInterpreter, np
+from syntax_tree import Program
+
+DECLARATIONS = """var a, b, q : integer; x, y : real;
+procedure scale(k : integer);
+var t : real;
+begin t := k * x; y := y + t end;
+"""
+BODY = 'y := 0; scale(a); q := a div b; x := x / b; scale(q - 1)'
+INPUTS = {'a': [3, 7, -4, 10], 'b': [2, 0, 3, 5], 'x': [0.5, 1.5, 2, -1]}
+
+
+def analyze(text: str) -> Program:
+	program_node = Parser(text=text).parse()
+	SemanticAnalyzer().analyze(program_node=program_node)
+	return program_node
+
+
+def tree_lane(inputs: dict[str, list], lane: int) -> dict | Exception:
+	"""
+	the tree Interpreter's result for one input set, its inputs assigned before the body
+	"""
+	assignments = ''.join(f'{name} := {values[lane]}; ' for name, values in inputs.items())
+	interpreter = Interpreter()
+	try:
+		interpreter.visit(node=analyze(text=f'program v;\n{DECLARATIONS}begin {assignments}{BODY} end.\n'))
+	except ZeroDivisionError as e:
+		return e
+	return interpreter.state
+
+
+@unittest.skipIf(np is None, 'vectorized execution needs numpy')
+class VectorInterpreterTest(unittest.TestCase):
+	def setUp(self):
+		# the analyzer prints every scope it leaves
+		self.enterContext(contextlib.redirect_stdout(io.StringIO()))
+		self.program_node = analyze(text=f'program v;\n{DECLARATIONS}begin {BODY} end.\n')
+	
+	def test_lanes_follow_the_tree_engine(self):
+		interpreter = VectorInterpreter(inputs=INPUTS)
+		interpreter.visit(node=self.program_node)
+		for lane in range(len(INPUTS['a'])):
+			expected = tree_lane(inputs=INPUTS, lane=lane)
+			found = interpreter.lane(index=lane)
+			if isinstance(expected, Exception):
+				self.assertIs(type(found), type(expected))
+			else:
+				self.assertEqual(found, expected)
+		self.assertEqual(interpreter.failed.tolist(), [False, True, False, False])
+	
+	def test_reruns_start_from_the_inputs(self):
+		interpreter = VectorInterpreter(inputs=INPUTS)
+		interpreter.visit(node=self.program_node)
+		first = [interpreter.lane(index=lane) for lane in (0, 2, 3)]
+		interpreter.inputs = {**INPUTS, 'b': [2, 1, 3, 5]}
+		interpreter.visit(node=self.program_node)
+		self.assertFalse(interpreter.failed.any())
+		self.assertEqual([interpreter.lane(index=lane) for lane in (0, 2, 3)], first)
+	
+	def test_unknown_inputs_are_rejected(self):
+		with self.assertRaises(NameError):
+			VectorInterpreter(inputs={**INPUTS, 'z': [1, 2, 3, 4]}).visit(node=self.program_node)
+
+
+@unittest.skipIf(np is not None, 'numpy is installed')
+class WithoutNumpyTest(unittest.TestCase):
+	def test_construction_names_the_dependency(self):
+		with self.assertRaisesRegex(ImportError, 'numpy'):
+			VectorInterpreter(inputs=INPUTS)
+
+
+if __name__ == '__main__':
+	unittest.main()
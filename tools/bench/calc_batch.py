@@ -0,0 +1,54 @@
+import argparse
+import io
+import random
+import time
+
+from tools.scratch.calc import DEFAULT_CACHE_SIZE, Interpreter, run_batch
+
+
+def expression(rng: random.Random, depth: int) -> str:
+	roll = rng.random()
+	if depth == 0 or roll < 0.3: return str(rng.randrange(1, 100000))
+	if roll < 0.4: return f'-{expression(rng=rng, depth=depth - 1)}'
+	if roll < 0.55: return f'({expression(rng=rng, depth=depth - 1)})'
+	left = expression(rng=rng, depth=depth - 1)
+	return f'{left} {rng.choice("+-*/")} {expression(rng=rng, depth=depth - 1)}'
+
+
+def interpreter_output(text: str) -> str:
+	"""
+	the previous uncached path: Tokenizer, Parser and Interpreter for every expression
+	"""
+	try:
+		return str(Interpreter(text=text).interpret())
+	except Exception as e:
+		return f"error: {type(e).__name__} {str(e)}"
+
+
+def main():
+	arg_parser = argparse.ArgumentParser(description='time calc.py batch mode on generated expressions')
+	arg_parser.add_argument('--lines', type=int, default=200000)
+	arg_parser.add_argument('--distinct', type=int, default=0, help='draw the lines from this many expressions, 0 for all distinct')
+	arg_parser.add_argument('--depth', type=int, default=5)
+	arg_parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE, help='0 evaluates every line')
+	arg_parser.add_argument('--seed', type=int, default=0)
+	args = arg_parser.parse_args()
+	
+	rng = random.Random(args.seed)
+	pool = [expression(rng=rng, depth=args.depth) for _ in range(args.distinct or args.lines)]
+	lines = [rng.choice(pool) + '\n' for _ in range(args.lines)] if args.distinct else [text + '\n' for text in pool]
+	out = io.StringIO()
+	start = time.perf_counter()
+	info = run_batch(lines=lines, out=out, cache_size=args.cache_size)
+	batch_time = time.perf_counter() - start
+	start = time.perf_counter()
+	expected = [interpreter_output(text=line.strip()) for line in lines]
+	interpreter_time = time.perf_counter() - start
+	assert out.getvalue() == '\n'.join(expected) + '\n'
+	print(f'{args.lines} lines, {info.misses} distinct, {info.hits} cache hits')
+	print(f'run_batch              {args.lines / batch_time:10.0f} lines/s')
+	print(f'Interpreter, uncached  {args.lines / interpreter_time:10.0f} lines/s')
+
+
+if __name__ == '__main__':
+	main()
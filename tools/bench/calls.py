@@ -0,0 +1,61 @@
+import io
+import contextlib
+import sys
+import time
+
+from parser import Parser
+from semantic_analyzer import SemanticAnalyzer
+from interpreter import Interpreter, ActivationPool, ActivationRecord
+
+
+def program(levels: int) -> str:
+	"""
+	p0 adds to a global, every p<k> calls p<k - 1> twice: one call of the top procedure makes
+	2 ** levels - 1 calls in all
+	"""
+	lines = ['program calls;', 'var total : integer;']
+	lines.append('procedure p0(n : integer);\nvar t : integer;\nbegin\n  t := n + 1;\n  total := total + t\nend;')
+	for k in range(1, levels):
+		lines.append(f'procedure p{k}(n : integer);\nbegin\n  p{k - 1}(n);\n  p{k - 1}(n + 1)\nend;')
+	lines.append(f'begin\n  total := 0;\n  p{levels - 1}(0)\nend.')
+	return '\n'.join(lines)
+
+
+class FreshPool(ActivationPool):
+	"""
+	builds a new record for every call, what calls cost without the free list
+	"""
+	
+	def acquire(self, static_link: ActivationRecord) -> ActivationRecord:
+		record = [None] * (self.size + 1)
+		record[0] = static_link
+		return record
+	
+	def release(self, record: ActivationRecord):
+		pass
+
+
+class FreshInterpreter(Interpreter):
+	pool_class = FreshPool
+
+
+def main():
+	sys.setrecursionlimit(10000)
+	levels = 20
+	calls = 2 ** levels - 1
+	program_node = Parser(text=program(levels=levels)).parse()
+	with contextlib.redirect_stdout(io.StringIO()):
+		SemanticAnalyzer().analyze(program_node=program_node)
+	for name, interpreter_class in [('pooled records', Interpreter), ('fresh records', FreshInterpreter)]:
+		interpreter = interpreter_class()
+		start = time.perf_counter()
+		interpreter.visit(node=program_node)
+		elapsed = time.perf_counter() - start
+		print(
+			f"{name:<16} {calls} calls in {elapsed:.2f}s  {calls / elapsed / 1000:7.1f}k calls/s  "
+			f"total {interpreter.state['total']}"
+		)
+
+
+if __name__ == '__main__':
+	main()
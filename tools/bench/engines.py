@@ -0,0 +1,81 @@
+import io
+import contextlib
+import timeit
+
+from parser import Parser
+from semantic_analyzer import SemanticAnalyzer
+from interpreter import Interpreter
+from closure_compiler import ClosureCompiler
+from python_compiler import PythonCompiler
+from register_vm import RegisterCompiler
+import python_compiler
+import register_vm
+from tools.bench.generator import program
+
+
+def tree_runner(program_node):
+	def run():
+		interpreter = Interpreter()
+		interpreter.visit(node=program_node)
+		return interpreter.state
+	
+	return run
+
+
+def closure_runner(program_node):
+	compiled = ClosureCompiler().compile(program_node=program_node)
+	
+	def run():
+		state = {}
+		compiled(state)
+		return state
+	
+	return run
+
+
+def python_runner(program_node):
+	code = PythonCompiler().compile(program_node=program_node)
+	
+	def run():
+		state = {}
+		python_compiler.run(code=code, state=state)
+		return state
+	
+	return run
+
+
+def register_runner(program_node):
+	bytecode = RegisterCompiler().compile(program_node=program_node)
+	
+	def run():
+		registers = [None] * len(bytecode.register_names)
+		register_vm.run(bytecode=bytecode, registers=registers)
+		return bytecode.export_state(registers=registers)
+	
+	return run
+
+
+RUNNERS = {
+	'tree': tree_runner,
+	'closure': closure_runner,
+	'python': python_runner,
+	'register': register_runner,
+}
+
+
+def main():
+	program_node = Parser(text=program(statement_count=500, depth=4)).parse()
+	with contextlib.redirect_stdout(io.StringIO()):
+		SemanticAnalyzer().analyze(program_node=program_node)
+	runs = {name: runner(program_node) for name, runner in RUNNERS.items()}
+	expected = runs['tree']()
+	for name, run in runs.items():
+		assert run() == expected, name
+	tree_time = min(timeit.repeat(runs['tree'], number=20, repeat=5))
+	for name, run in runs.items():
+		run_time = min(timeit.repeat(run, number=20, repeat=5))
+		print(f"{name:<10} {run_time * 1000 / 20:8.3f}ms per run  {tree_time / run_time:6.2f}x vs tree")
+
+
+if __name__ == '__main__':
+	main()
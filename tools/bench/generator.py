@@ -0,0 +1,66 @@
+import random
+
+
+def expression(rng: random.Random, names: list[str], depth: int) -> str:
+	if depth == 0 or rng.random() < 0.2:
+		if names and rng.random() < 0.6: return rng.choice(names)
+		return str(rng.randint(1, 9))
+	if rng.random() < 0.3:
+		# only ever doubling keeps values bounded once each statement divides them down again
+		return f'{expression(rng, names, depth - 1)} * 2'
+	op = rng.choice(['+', '-'])
+	return f'({expression(rng, names, depth - 1)} {op} {expression(rng, names, depth - 1)})'
+
+
+def statements(
+	rng: random.Random, names: list[str], count: int, depth: int, comment_density: float, indent: str
+) -> list[str]:
+	body = []
+	for _ in range(count):
+		statement = f'{indent}{rng.choice(names)} := {expression(rng, names, depth)} div 64'
+		if rng.random() < comment_density: statement += f' {{ statement {len(body)} }}'
+		body.append(statement)
+	return body
+
+
+def procedure(
+	rng: random.Random, names: list[str], level: int, nesting: int, count: int, depth: int,
+	comment_density: float
+) -> list[str]:
+	"""
+	procedure p<level> with a parameter and a local of its own, declaring p<level + 1> inside it
+	"""
+	indent = '  ' * level
+	param, local = f'a{level}', f'l{level}'
+	names = names + [param, local]
+	lines = [f'{indent}procedure p{level}({param} : integer);', f'{indent}var {local} : integer;']
+	if level < nesting:
+		lines.extend(procedure(rng, names, level + 1, nesting, count, depth, comment_density))
+	lines.append(f'{indent}begin')
+	body = [f'{indent}  {local} := {param}']
+	body.extend(statements(rng, names, count, depth, comment_density, indent=indent + '  '))
+	lines.append(';\n'.join(body))
+	lines.append(f'{indent}end;')
+	return lines
+
+
+def program(
+	statement_count: int = 500, depth: int = 4, variables: int = 8, nesting: int = 0,
+	comment_density: float = 0.0, seed: int = 0
+) -> str:
+	"""
+	a valid program whose integer variables stay bounded however long it runs. statement_count is
+	split evenly between the main body and the nesting procedures, and every statement is followed
+	by a comment with probability comment_density
+	"""
+	rng = random.Random(seed)
+	names = [f'v{n}' for n in range(variables)]
+	count = statement_count // (nesting + 1)
+	lines = ['program bench;', f"var {', '.join(names)} : integer;"]
+	if nesting: lines.extend(procedure(rng, names, 1, nesting, count, depth, comment_density))
+	lines.append('begin')
+	body = [f'  {name} := {n + 1}' for n, name in enumerate(names)]
+	body.extend(statements(rng, names, statement_count - count * nesting, depth, comment_density, indent='  '))
+	lines.append(';\n'.join(body))
+	lines.append('end.')
+	return '\n'.join(lines)
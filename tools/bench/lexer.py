@@ -0,0 +1,57 @@
+import argparse
+import timeit
+
+from lexer import Lexer, Token, TokenType, scan, tokenize
+from tools.bench.generator import program
+
+
+class ScanLexer(Lexer):
+	"""
+	the previous Lexer: every token goes through scan()'s tuple and gets a new Token, and next_token
+	unpacks a (token, start, end) tuple even when nothing was peeked
+	"""
+	
+	def next_token(self) -> Token:
+		self.peak_depth = 0
+		if self.lookahead:
+			token, self.token_start, self.token_end = self.lookahead.popleft()
+		else:
+			token, self.token_start, self.token_end = self._next_token()
+		return token
+	
+	def _next_token(self) -> tuple[Token, int, int]:
+		token_type, value, start, self.pos = scan(self.text, self.pos, self.end_pos)
+		return Token(token_type=token_type, value=value), start, self.pos
+
+
+def lex(lexer_class: type[Lexer], text: str) -> int:
+	lexer = lexer_class(text=text)
+	count = 1
+	while lexer.next_token().token_type != TokenType.EOF:
+		count += 1
+	return count
+
+
+def main():
+	arg_parser = argparse.ArgumentParser(description='time Lexer.next_token and tokenize on a generated program')
+	arg_parser.add_argument('--statements', type=int, default=20000)
+	arg_parser.add_argument('--comments', type=float, default=0.1, help='chance of a comment after each statement')
+	arg_parser.add_argument('--repeat', type=int, default=5)
+	args = arg_parser.parse_args()
+	
+	text = program(statement_count=args.statements, depth=4, variables=8, nesting=2, comment_density=args.comments)
+	count = lex(lexer_class=Lexer, text=text)
+	assert count == lex(lexer_class=ScanLexer, text=text) == len(tokenize(text))
+	runs = {
+		'scan tuples, a Token each': lambda: lex(lexer_class=ScanLexer, text=text),
+		'Lexer.next_token': lambda: lex(lexer_class=Lexer, text=text),
+		'tokenize': lambda: tokenize(text),
+	}
+	print(f'{len(text)} characters, {count} tokens')
+	for name, run in runs.items():
+		seconds = min(timeit.repeat(run, number=1, repeat=args.repeat))
+		print(f'{name:<28} {seconds * 1000:8.1f}ms  {seconds * 1e9 / count:6.0f}ns/token  {count / seconds / 1e6:5.2f}M tokens/s')
+
+
+if __name__ == '__main__':
+	main()
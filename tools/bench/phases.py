@@ -0,0 +1,130 @@
+import argparse
+import contextlib
+import io
+import json
+import statistics
+import sys
+import time
+from typing import Callable
+
+from lexer import Lexer, TokenType
+from parser import Parser
+from semantic_analyzer import SemanticAnalyzer
+from interpreter import Interpreter
+from tools.bench.generator import program
+
+DEFAULT_THRESHOLD = 0.10
+
+
+def lex(text: str):
+	lexer = Lexer(text=text)
+	while lexer.next_token().token_type != TokenType.EOF:
+		pass
+
+
+def parse(text: str):
+	return Parser(text=text).parse()
+
+
+def analyzed(text: str):
+	program_node = parse(text=text)
+	SemanticAnalyzer().analyze(program_node=program_node)
+	return program_node
+
+
+# phase name -> (setup building the input from the source, the timed call on that input)
+PHASES: dict[str, tuple[Callable, Callable]] = {
+	'lex': (lambda text: text, lex),
+	'parse': (lambda text: text, parse),
+	'analyze': (parse, lambda program_node: SemanticAnalyzer().analyze(program_node=program_node)),
+	'interpret': (analyzed, lambda program_node: Interpreter().visit(node=program_node)),
+}
+
+
+def time_phase(setup: Callable, run: Callable, text: str, warmup: int, repeat: int) -> list[float]:
+	"""
+	seconds per run, setup is redone untimed before every run since analysis mutates the tree
+	"""
+	times = []
+	for n in range(warmup + repeat):
+		value = setup(text)
+		start = time.perf_counter()
+		run(value)
+		elapsed = time.perf_counter() - start
+		if n >= warmup: times.append(elapsed)
+	return times
+
+
+def measure(text: str, warmup: int, repeat: int) -> dict:
+	phases = {}
+	# the analyzer and interpreter print scopes and procedure visits as they go
+	with contextlib.redirect_stdout(io.StringIO()):
+		for name, (setup, run) in PHASES.items():
+			times = time_phase(setup=setup, run=run, text=text, warmup=warmup, repeat=repeat)
+			phases[name] = {'min': min(times), 'median': statistics.median(times), 'times': times}
+	return phases
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+	"""
+	returns one line per phase slower than baseline by more than threshold, compared on the minimum
+	which is the least noisy of the statistics
+	"""
+	regressions = []
+	if results['config'] != baseline['config']:
+		regressions.append(f"config differs from baseline: {results['config']} vs {baseline['config']}")
+		return regressions
+	for name, phase in results['phases'].items():
+		if name not in baseline['phases']: continue
+		ratio = phase['min'] / baseline['phases'][name]['min']
+		if ratio > 1 + threshold:
+			regressions.append(f'{name} regressed {(ratio - 1) * 100:.1f}% past the {threshold * 100:.0f}% threshold')
+	return regressions
+
+
+def main():
+	arg_parser = argparse.ArgumentParser(description='time each interpreter phase on a generated program')
+	arg_parser.add_argument('--statements', type=int, default=2000)
+	arg_parser.add_argument('--depth', type=int, default=4, help='expression depth')
+	arg_parser.add_argument('--variables', type=int, default=8)
+	arg_parser.add_argument('--nesting', type=int, default=2, help='procedure nesting depth')
+	arg_parser.add_argument('--comments', type=float, default=0.1, help='chance of a comment after each statement')
+	arg_parser.add_argument('--seed', type=int, default=0)
+	arg_parser.add_argument('--warmup', type=int, default=2)
+	arg_parser.add_argument('--repeat', type=int, default=7)
+	arg_parser.add_argument('--output', help='write the results as json to this file')
+	arg_parser.add_argument('--baseline', help='json results to compare against')
+	arg_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='allowed slow-down, 0.1 is 10%%')
+	args = arg_parser.parse_args()
+	
+	config = {
+		'statement_count': args.statements,
+		'depth': args.depth,
+		'variables': args.variables,
+		'nesting': args.nesting,
+		'comment_density': args.comments,
+		'seed': args.seed,
+	}
+	text = program(**config)
+	results = {
+		'config': config,
+		'python': sys.version.split()[0],
+		'bytes': len(text),
+		'phases': measure(text=text, warmup=args.warmup, repeat=args.repeat),
+	}
+	for name, phase in results['phases'].items():
+		print(f"{name:<10} min {phase['min'] * 1000:8.3f}ms  median {phase['median'] * 1000:8.3f}ms")
+	if args.output:
+		with open(args.output, 'w') as fp:
+			json.dump(results, fp, indent=2)
+	if args.baseline:
+		with open(args.baseline) as fp:
+			baseline = json.load(fp)
+		regressions = compare(results=results, baseline=baseline, threshold=args.threshold)
+		for regression in regressions:
+			print(regression, file=sys.stderr)
+		if regressions: sys.exit(1)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,60 @@
+import sys
+import timeit
+
+from lexer import Token, TokenType
+from syntax_tree import Node, BinOp, Num
+from interpreter import Interpreter
+
+
+class GetattrInterpreter(Interpreter):
+	"""
+	the previous NodeVisitor.visit: format the method name and getattr on every visit
+	"""
+	
+	def visit(self, node: Node):
+		node_type = node.node_type
+		visit_method = getattr(self, f'visit_{node_type}')
+		return visit_method(node)
+
+
+def balanced_tree(depth: int) -> Node:
+	if depth == 0: return Num(token=Token(token_type=TokenType.INTEGER_CONST, value=1))
+	return BinOp(
+		left=balanced_tree(depth - 1),
+		op=Token(token_type=TokenType.ADD, value=0),
+		right=balanced_tree(depth - 1)
+	)
+
+
+def left_deep_tree(depth: int) -> Node:
+	node = Num(token=Token(token_type=TokenType.INTEGER_CONST, value=1))
+	for _ in range(depth):
+		node = BinOp(
+			left=node,
+			op=Token(token_type=TokenType.MULTIPLY, value=0),
+			right=Num(token=Token(token_type=TokenType.INTEGER_CONST, value=1))
+		)
+	return node
+
+
+def main():
+	sys.setrecursionlimit(10000)
+	trees = {
+		'balanced depth 16': (balanced_tree(depth=16), 5),
+		'left-deep depth 2000': (left_deep_tree(depth=2000), 200),
+	}
+	for name, (tree, number) in trees.items():
+		old = GetattrInterpreter()
+		new = Interpreter()
+		assert old.visit(tree) == new.visit(tree)
+		old_time = min(timeit.repeat(lambda: old.visit(tree), number=number, repeat=5))
+		new_time = min(timeit.repeat(lambda: new.visit(tree), number=number, repeat=5))
+		print(
+			f"{name}: getattr {old_time * 1000 / number:.2f}ms  "
+			f"dispatch table {new_time * 1000 / number:.2f}ms  "
+			f"speed-up {old_time / new_time:.2f}x"
+		)
+
+
+if __name__ == '__main__':
+	main()
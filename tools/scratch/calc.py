@@ -1,6 +1,19 @@
+import argparse
 import enum
+import functools
+import re
+import sys
 import traceback
 
+DEFAULT_CACHE_SIZE = 65536
+# results are written in chunks of this many lines
+OUTPUT_CHUNK = 4096
+
+NUMBER = re.compile(r'\d+')
+# every token of a line in one pass, anything else as a single character the fast path rejects
+LEXEMES = re.compile(r'\d+|\S')
+OPERATORS = frozenset('+-*/()')
+
 
 class TokenType(enum.Enum):
 	INTEGER = 'integer'
@@ -13,6 +26,16 @@ class TokenType(enum.Enum):
 	EOF = 'EOF'
 
 
+SINGLE_CHAR_TOKENS: dict[str, TokenType] = {
+	'+': TokenType.ADD,
+	'-': TokenType.SUBTRACT,
+	'*': TokenType.MULTIPLY,
+	'/': TokenType.DIVIDE,
+	'(': TokenType.LPAREN,
+	')': TokenType.RPAREN,
+}
+
+
 class Token:
 	def __init__(self, token_type: TokenType, value: int):
 		self.type: TokenType = token_type
@@ -48,35 +71,19 @@ class Tokenizer:
 		return token
 	
 	def _next_token(self) -> Token:
-		if not self.pos_valid(): return Token(token_type=TokenType.EOF, value=0)
-		while self.pos_valid() and self.text[self.pos].isspace(): self.pos += 1
-		if not self.pos_valid(): return Token(token_type=TokenType.EOF, value=0)
-		c = self.text[self.pos]
-		if c.isdigit():
-			num = ''
-			while self.pos_valid() and self.text[self.pos].isdigit():
-				num += self.text[self.pos]
-				self.pos += 1
-			return Token(token_type=TokenType.INTEGER, value=int(num))
-		if c == '+':
-			self.pos += 1
-			return Token(token_type=TokenType.ADD, value=0)
-		if c == '-':
-			self.pos += 1
-			return Token(token_type=TokenType.SUBTRACT, value=0)
-		if c == '*':
-			self.pos += 1
-			return Token(token_type=TokenType.MULTIPLY, value=0)
-		if c == '/':
-			self.pos += 1
-			return Token(token_type=TokenType.DIVIDE, value=0)
-		if c == '(':
-			self.pos += 1
-			return Token(token_type=TokenType.LPAREN, value=0)
-		if c == ')':
-			self.pos += 1
-			return Token(token_type=TokenType.RPAREN, value=0)
-		raise SyntaxError()
+		text = self.text
+		pos = self.pos
+		while pos < len(text) and text[pos].isspace(): pos += 1
+		self.pos = pos
+		if pos >= len(text): return Token(token_type=TokenType.EOF, value=0)
+		token_type = SINGLE_CHAR_TOKENS.get(text[pos])
+		if token_type is not None:
+			self.pos = pos + 1
+			return Token(token_type=token_type, value=0)
+		match = NUMBER.match(text, pos)
+		if match is None: raise SyntaxError()
+		self.pos = match.end()
+		return Token(token_type=TokenType.INTEGER, value=int(match.group()))
 
 
 class Node:
@@ -217,7 +224,113 @@ class Interpreter(NodeVisitor):
 			return -self.visit(unary.expr)
 
 
-def main():
+class Fallback(Exception):
+	pass
+
+
+class FastEvaluator:
+	"""
+	evaluates an expression straight from its lexeme strings, without Token or Node objects, by the
+	same grammar as Parser. it computes while it parses, so it gives up with an exception wherever
+	Parser and Interpreter might not end in that same value: a bad character where Tokenizer would
+	scan it, a missing operand or parenthesis, or any error while computing
+	"""
+	
+	def __init__(self, text: str):
+		self.lexemes: list[str] = LEXEMES.findall(text)
+		self.lexemes.append('')
+		self.pos = 0
+		# Tokenizer scans the first token before parsing starts
+		self.check(lexeme=self.lexemes[0])
+	
+	@staticmethod
+	def check(lexeme: str):
+		if lexeme and lexeme not in OPERATORS and not lexeme[0].isdigit(): raise Fallback(lexeme)
+	
+	def advance(self) -> str:
+		self.pos += 1
+		lexeme = self.lexemes[self.pos]
+		# Tokenizer scans one token past every token it consumes
+		self.check(lexeme=lexeme)
+		return lexeme
+	
+	def term(self) -> int | float:
+		value = self.factor()
+		lexeme = self.lexemes[self.pos]
+		while lexeme == '+' or lexeme == '-':
+			self.advance()
+			right = self.factor()
+			value = value + right if lexeme == '+' else value - right
+			lexeme = self.lexemes[self.pos]
+		return value
+	
+	def factor(self) -> int | float:
+		value = self.operand()
+		lexeme = self.lexemes[self.pos]
+		while lexeme == '*' or lexeme == '/':
+			self.advance()
+			right = self.operand()
+			value = value * right if lexeme == '*' else value / right
+			lexeme = self.lexemes[self.pos]
+		return value
+	
+	def operand(self) -> int | float:
+		lexeme = self.lexemes[self.pos]
+		if lexeme == '+' or lexeme == '-':
+			# Parser.unary, the sign applies to a whole expression
+			self.advance()
+			value = self.term()
+			return -value if lexeme == '-' else value
+		if lexeme[:1].isdigit():
+			self.advance()
+			return int(lexeme)
+		if lexeme == '(':
+			self.advance()
+			value = self.term()
+			if self.lexemes[self.pos] != ')': raise Fallback(self.lexemes[self.pos])
+			self.advance()
+			return value
+		raise Fallback(lexeme)
+
+
+def evaluate(text: str) -> str:
+	"""
+	the output line for one expression, its result or the error it raised. FastEvaluator handles
+	valid expressions, Interpreter whatever it gives up on, which keeps its exact error messages
+	"""
+	try:
+		evaluator = FastEvaluator(text=text)
+		return str(evaluator.term())
+	except Exception:
+		pass
+	try:
+		return str(Interpreter(text=text).interpret())
+	except Exception as e:
+		return f"error: {type(e).__name__} {str(e)}"
+
+
+def run_batch(lines, out, cache_size: int = DEFAULT_CACHE_SIZE):
+	"""
+	one output line per input line, blank for a blank one. expressions have no variables, so the
+	output of each distinct text is computed once and kept in an LRU cache
+	"""
+	cached_evaluate = functools.lru_cache(maxsize=cache_size)(evaluate)
+	chunk = []
+	for line in lines:
+		text = line.strip()
+		chunk.append(cached_evaluate(text) if text else '')
+		if len(chunk) >= OUTPUT_CHUNK:
+			chunk.append('')
+			out.write('\n'.join(chunk))
+			chunk.clear()
+	if chunk:
+		chunk.append('')
+		out.write('\n'.join(chunk))
+	out.flush()
+	return cached_evaluate.cache_info()
+
+
+def repl():
 	while True:
 		text = ''
 		try:
@@ -237,4 +350,25 @@ def main():
 			print(f"error: {type(e).__name__} {str(e)}")
 
 
-main()
+def main():
+	arg_parser = argparse.ArgumentParser()
+	arg_parser.add_argument(
+		'filename', nargs='?',
+		help='evaluate one expression per line of this file, - for stdin, instead of prompting'
+	)
+	arg_parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE, help='distinct expressions to remember')
+	arg_parser.add_argument('--stats', action='store_true', help='report cache hits and misses on stderr')
+	args = arg_parser.parse_args()
+	if args.filename is None:
+		repl()
+		return
+	if args.filename == '-':
+		info = run_batch(lines=sys.stdin, out=sys.stdout, cache_size=args.cache_size)
+	else:
+		with open(args.filename) as fp:
+			info = run_batch(lines=fp, out=sys.stdout, cache_size=args.cache_size)
+	if args.stats: print(f'{info.hits} hits, {info.misses} misses, {info.currsize} cached', file=sys.stderr)
+
+
+if __name__ == '__main__':
+	main()
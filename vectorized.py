@@ -0,0 +1,178 @@
+from typing import Sequence
+
+from lexer import TokenType
+
+from syntax_tree import (
+	NodeVisitor,
+	Program,
+	Block,
+	VariableDeclaration,
+	Procedure,
+	Variable,
+	Compound,
+	ProcedureCall,
+	AssignmentStatement,
+	BinOp,
+	Num,
+	Unary,
+	ToReal,
+	NoOp
+)
+
+from symbols import VarSymbol
+
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+# per-lane error codes, index 0 is a lane that ran to the end
+LANE_ERRORS: tuple[type[Exception] | None, ...] = (None, ZeroDivisionError)
+ZERO_DIVISION = LANE_ERRORS.index(ZeroDivisionError)
+
+
+class VectorInterpreter(NodeVisitor):
+	"""
+	runs one analyzed program over many input sets at once: every variable holds an array with one
+	lane per input set and each BinOp/Unary is a single numpy operation across all lanes. inputs
+	map global variable names to initial values per lane, converted to int64 or float64 by the
+	declared type. a procedure call runs for all lanes at once as well, there are no branches that could
+	send lanes different ways. results follow the tree Interpreter lane by lane, except that int64
+	wraps around where python ints would grow. a division by zero marks only its own lanes as failed,
+	their values from then on are meaningless while the other lanes carry on
+	"""
+	
+	def __init__(self, inputs: dict[str, Sequence[int | float]], lanes: int | None = None):
+		if np is None: raise ImportError('vectorized execution needs numpy')
+		if lanes is None: lanes = len(next(iter(inputs.values()))) if inputs else 1
+		self.inputs = inputs
+		self.lanes = lanes
+		self.frames: list[list] = []
+		self.global_symbols: list[VarSymbol] = []
+		# LANE_ERRORS index of the first error per lane
+		self.errors = np.zeros(lanes, dtype=np.int8)
+	
+	@property
+	def state(self) -> dict[str, 'np.ndarray']:
+		if not self.frames: return {}
+		return {
+			symbol.name: np.broadcast_to(value, self.lanes)
+			for symbol, value in zip(self.global_symbols, self.frames[0])
+			if value is not None
+		}
+	
+	@property
+	def failed(self) -> 'np.ndarray':
+		return self.errors != 0
+	
+	def lane(self, index: int) -> dict[str, int | float] | Exception:
+		"""
+		what the tree Interpreter reports for one input set: the final state or the error raised
+		"""
+		error = LANE_ERRORS[self.errors[index]]
+		if error is not None: return error()
+		return {name: values[index].item() for name, values in self.state.items()}
+	
+	def interpret(self, program_node: Program):
+		self.visit(node=program_node)
+		print(self.state)
+	
+	def visit_program(self, program: Program):
+		# a run starts from the inputs alone, not from the frames and failed lanes of an earlier one
+		self.frames = []
+		self.errors = np.zeros(self.lanes, dtype=np.int8)
+		self.global_symbols = program.symbol_table.slots
+		frame = []
+		for symbol in self.global_symbols:
+			values = self.inputs.get(symbol.name)
+			if values is not None:
+				dtype = np.int64 if symbol.type_symbol.name == 'integer' else np.float64
+				values = np.asarray(values, dtype=dtype)
+			frame.append(values)
+		unknown = set(self.inputs) - {symbol.name for symbol in self.global_symbols}
+		if unknown: raise NameError(f"inputs for undeclared variables {', '.join(sorted(unknown))}")
+		self.frames = [frame]
+		# overflow to inf and inf - inf are not errors for python floats either
+		with np.errstate(over='ignore', invalid='ignore'):
+			return self.visit(node=program.block_node)
+	
+	def visit_block(self, block: Block):
+		for node in block.declarations:
+			self.visit(node)
+		return self.visit(node=block.compound)
+	
+	def visit_variable_declaration(self, variable_declaration: VariableDeclaration):
+		pass
+	
+	def visit_procedure(self, procedure: Procedure):
+		pass
+	
+	def visit_procedure_call(self, procedure_call: ProcedureCall):
+		procedure = procedure_call.procedure_symbol.procedure_node
+		args = [self.visit(node=arg) for arg in procedure_call.args]
+		level = procedure.symbol_table.scope_level
+		# frames is a display, one frame per scope level: the callee is declared in a scope enclosing
+		# the caller, so the frames below its level are already its static chain
+		frame = [None] * len(procedure.symbol_table.slots)
+		# params are the first symbols of a procedure's scope
+		frame[:len(args)] = args
+		caller_frames = self.frames[level - 1:]
+		self.frames[level - 1:] = [frame]
+		try:
+			self.visit(node=procedure.block_node)
+		finally:
+			self.frames[level - 1:] = caller_frames
+	
+	def visit_compound(self, compound: Compound):
+		for node in compound.children:
+			self.visit(node=node)
+	
+	def visit_assignment_statement(self, assignment_statement: AssignmentStatement):
+		variable = assignment_statement.variable
+		self.frames[variable.scope_level - 1][variable.slot] = self.visit(node=assignment_statement.expr)
+	
+	def visit_bin_op(self, bin_op_node: BinOp) -> 'np.ndarray':
+		left = self.visit(bin_op_node.left)
+		right = self.visit(bin_op_node.right)
+		match bin_op_node.op.token_type:
+			case TokenType.ADD:
+				return left + right
+			case TokenType.SUBTRACT:
+				return left - right
+			case TokenType.MULTIPLY:
+				return left * right
+			case TokenType.DIVIDE:
+				return np.true_divide(left, self.divisor(right=right))
+			case TokenType.INT_DIVIDE:
+				return np.floor_divide(left, self.divisor(right=right))
+	
+	def divisor(self, right: 'np.ndarray') -> 'np.ndarray':
+		"""
+		marks the lanes dividing by zero as failed and gives them a divisor of 1 so they stay quiet
+		"""
+		zero = right == 0
+		if not zero.any(): return right
+		self.errors[(self.errors == 0) & zero] = ZERO_DIVISION
+		return np.where(zero, 1, right)
+	
+	def visit_variable(self, variable: Variable) -> 'np.ndarray':
+		val = self.frames[variable.scope_level - 1][variable.slot]
+		# assignments apply to every lane, so a variable is unassigned in all of them or none
+		if val is None: raise NameError(variable.token.value)
+		return val
+	
+	def visit_unary(self, unary: Unary) -> 'np.ndarray':
+		if unary.token.token_type == TokenType.ADD:
+			return +self.visit(unary.expr)
+		if unary.token.token_type == TokenType.SUBTRACT:
+			return -self.visit(unary.expr)
+	
+	def visit_to_real(self, to_real: ToReal) -> 'np.ndarray':
+		return np.asarray(self.visit(to_real.expr), dtype=np.float64)
+	
+	def visit_num(self, num: Num) -> 'np.ndarray':
+		# 0-d so constant-only expressions divide through numpy as well
+		return np.asarray(num.value, dtype=np.int64 if type(num.value) is int else np.float64)
+	
+	def visit_noop(self, noop: NoOp):
+		pass